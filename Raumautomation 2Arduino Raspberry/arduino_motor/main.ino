@@ -16,6 +16,14 @@
  *   Beispiel: {"fan_speed": 128}  -> 50% Geschwindigkeit
  *             {"fan_speed": 255}  -> 100% Geschwindigkeit
  *             {"fan_speed": 0}    -> Stopp
+ * - Jede Zeile muss mit '\n' enden (Serial Monitor: "Neue Zeile")
+ *
+ * Binärprotokoll (optional, siehe pi_backend/protocol.py):
+ * - RX: {"proto": 1} -> Antwort {"proto": 1}; der Pi sendet danach Rahmen statt JSON
+ * - Rahmen: 0x00 + COBS(Typ, Nutzdaten, CRC-16 CCITT) + 0x00
+ *   - 0x10 Lüfterbefehl: uint8 Drehzahl (7 statt ~19 Bytes je Befehl)
+ * - JSON-Zeilen werden immer verstanden; Rahmen beginnen mit einem Byte < 0x20, Zeilen mit '{'
+ *   (der COBS-Code eines Lüfterbefehls ist höchstens 5, also nie '\r' oder '\n')
  * 
  * Sicherheitsfunktion (Watchdog):
  * - Wenn für 5 Sekunden kein gültiger Befehl empfangen wird, stoppt der Motor automatisch.
@@ -31,6 +39,107 @@ unsigned long lastCommandTime = 0; // Zeitstempel des letzten gültigen Befehls
 const long WATCHDOG_TIMEOUT = 5000; // 5 Sekunden Timeout in Millisekunden
 int currentSpeed = 0;              // Aktuelle Motorgeschwindigkeit (0-255)
 
+// Empfangspuffer für eine Zeile bzw. einen Rahmen
+const uint8_t RX_MAX = 64;
+uint8_t rxBuf[RX_MAX + 1];
+uint8_t rxLen = 0;
+
+const uint8_t MSG_FAN_SPEED = 0x10;
+
+// CRC-16/CCITT-FALSE (Polynom 0x1021, Start 0xFFFF), wie protocol.crc16() auf dem Pi
+uint16_t crc16(const uint8_t* data, uint8_t len) {
+  uint16_t crc = 0xFFFF;
+  for (uint8_t i = 0; i < len; i++) {
+    crc ^= (uint16_t)data[i] << 8;
+    for (uint8_t bit = 0; bit < 8; bit++) {
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+    }
+  }
+  return crc;
+}
+
+// COBS-Rahmen (ohne 0x00) dekodieren; -1 bei ungültigem Rahmen
+int cobsDecode(const uint8_t* in, uint8_t len, uint8_t* out) {
+  uint8_t readIndex = 0;
+  uint8_t writeIndex = 0;
+  while (readIndex < len) {
+    uint8_t code = in[readIndex++];
+    if (code == 0 || readIndex + code - 1 > len) {
+      return -1;
+    }
+    for (uint8_t i = 1; i < code; i++) {
+      out[writeIndex++] = in[readIndex++];
+    }
+    if (code < 0xFF && readIndex < len) {
+      out[writeIndex++] = 0;
+    }
+  }
+  return writeIndex;
+}
+
+// Geschwindigkeit anwenden und Watchdog zurücksetzen
+void setSpeed(int newSpeed) {
+  // Geschwindigkeit auf gültigen PWM-Bereich 0-255 begrenzen
+  currentSpeed = constrain(newSpeed, 0, 255);
+  analogWrite(PIN_ENABLE, currentSpeed);
+
+  // Watchdog Timer aktualisieren
+  lastCommandTime = millis();
+
+  // Debug Ausgabe (optional, kann entfernt werden wenn es den Pi stört)
+  // Serial.print("Set Speed to: ");
+  // Serial.println(currentSpeed);
+}
+
+void handleLine(String inputString) {
+  inputString.trim(); // Leerzeichen/Newlines entfernen
+
+  // Pi fragt nach dem Binärprotokoll
+  if (inputString.indexOf("\"proto\"") != -1) {
+    Serial.println(F("{\"proto\": 1}"));
+    return;
+  }
+
+  // Einfache Parsing-Logik strikt für {"fan_speed": WERT}
+  // Wir suchen nach dem Schlüssel "fan_speed", um es ohne schwere JSON-Libraries einfach zu halten
+  int keyIndex = inputString.indexOf("\"fan_speed\"");
+  
+  if (keyIndex != -1) {
+    // Finde den Doppelpunkt nach dem Schlüssel
+    int colonIndex = inputString.indexOf(':', keyIndex);
+    
+    if (colonIndex != -1) {
+      // Extrahiere den Zahlenteil: alles nach ':' und vor '}'
+      int braceIndex = inputString.indexOf('}', colonIndex);
+      
+      // Falls keine schließende Klammer, nimm den Rest des Strings
+      if (braceIndex == -1) {
+        braceIndex = inputString.length();
+      }
+
+      String valueString = inputString.substring(colonIndex + 1, braceIndex);
+      int newSpeed = valueString.toInt(); // String in Integer konvertieren
+
+      setSpeed(newSpeed);
+    }
+  }
+}
+
+void handleFrame(const uint8_t* frame, uint8_t len) {
+  uint8_t body[RX_MAX];
+  int bodyLen = cobsDecode(frame, len, body);
+  if (bodyLen < 3) {
+    return;
+  }
+  uint16_t crc = body[bodyLen - 2] | ((uint16_t)body[bodyLen - 1] << 8);
+  if (crc != crc16(body, bodyLen - 2)) {
+    return; // Übertragungsfehler: Befehl verwerfen, der Watchdog greift notfalls
+  }
+  if (body[0] == MSG_FAN_SPEED && bodyLen == 4) {
+    setSpeed(body[1]);
+  }
+}
+
 void setup() {
   // Serial-Kommunikation initialisieren
   Serial.begin(115200);
@@ -55,45 +164,25 @@ void setup() {
 }
 
 void loop() {
-  // 1. Auf eingehende Serial-Daten prüfen
-  if (Serial.available() > 0) {
-    String inputString = Serial.readStringUntil('\n'); // Ganze Zeile lesen
-    inputString.trim(); // Leerzeichen/Newlines entfernen
-
-    // Einfache Parsing-Logik strikt für {"fan_speed": WERT}
-    // Wir suchen nach dem Schlüssel "fan_speed", um es ohne schwere JSON-Libraries einfach zu halten
-    int keyIndex = inputString.indexOf("\"fan_speed\"");
-    
-    if (keyIndex != -1) {
-      // Finde den Doppelpunkt nach dem Schlüssel
-      int colonIndex = inputString.indexOf(':', keyIndex);
-      
-      if (colonIndex != -1) {
-        // Extrahiere den Zahlenteil: alles nach ':' und vor '}'
-        int braceIndex = inputString.indexOf('}', colonIndex);
-        
-        // Falls keine schließende Klammer, nimm den Rest des Strings
-        if (braceIndex == -1) {
-          braceIndex = inputString.length();
-        }
-
-        String valueString = inputString.substring(colonIndex + 1, braceIndex);
-        int newSpeed = valueString.toInt(); // String in Integer konvertieren
-
-        // Geschwindigkeit auf gültigen PWM-Bereich 0-255 begrenzen
-        newSpeed = constrain(newSpeed, 0, 255);
-
-        // Geschwindigkeit anwenden
-        currentSpeed = newSpeed;
-        analogWrite(PIN_ENABLE, currentSpeed);
-
-        // Watchdog Timer aktualisieren
-        lastCommandTime = millis();
-
-        // Debug Ausgabe (optional, kann entfernt werden wenn es den Pi stört)
-        // Serial.print("Set Speed to: ");
-        // Serial.println(currentSpeed);
-      }
+  // 1. Auf eingehende Serial-Daten prüfen (byteweise: Zeile bis '\n' oder Rahmen bis 0x00)
+  while (Serial.available() > 0) {
+    uint8_t b = Serial.read();
+    if (rxLen == 0 && (b == 0x00 || b == '\r' || b == '\n' || b == ' ')) {
+      continue;
+    }
+
+    bool textLine = (rxLen > 0 ? rxBuf[0] : b) >= 0x20;
+    if (textLine && b == '\n') {
+      rxBuf[rxLen] = 0;
+      handleLine(String((char*)rxBuf));
+      rxLen = 0;
+    } else if (!textLine && b == 0x00) {
+      handleFrame(rxBuf, rxLen);
+      rxLen = 0;
+    } else if (rxLen < RX_MAX) {
+      rxBuf[rxLen++] = b;
+    } else {
+      rxLen = 0; // Überlauf: verwerfen
     }
   }
 
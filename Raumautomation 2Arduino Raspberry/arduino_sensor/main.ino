@@ -23,6 +23,13 @@
  * - Baudrate: 115200
  * - TX: {"temp": 21.5, "hum": 45.2}
  * - RX: {"msg": "Regelung Aktiv"} -> Zeigt Nachricht auf LCD Zeile 4
+ *
+ * Binärprotokoll (optional, siehe pi_backend/protocol.py):
+ * - RX: {"proto": 1} -> Antwort {"proto": 1}, danach Messwerte als Rahmen statt JSON
+ * - Rahmen: 0x00 + COBS(Typ, Nutzdaten, CRC-16 CCITT) + 0x00
+ *   - 0x01 Messwert: int16 Temperatur, uint16 Feuchte, jeweils in Zehnteln (Little Endian)
+ *   - 0x02 Sensorfehler
+ * - 10 statt ~29 Bytes je Messwert; nach einem Reset wieder JSON, bis der Pi erneut fragt
  */
 
 #include <LiquidCrystal.h>
@@ -48,6 +55,57 @@ DHT dht(PIN_DHT, DHTTYPE);
 // --- Globale Variablen ---
 unsigned long lastReadTime = 0;
 const long READ_INTERVAL = 2000; // Lese Sensor alle 2 Sekunden
+bool binaryMode = false;          // Vom Pi per {"proto": 1} eingeschaltet
+
+const uint8_t MSG_READING = 0x01;
+const uint8_t MSG_SENSOR_ERROR = 0x02;
+
+// CRC-16/CCITT-FALSE (Polynom 0x1021, Start 0xFFFF), wie protocol.crc16() auf dem Pi
+uint16_t crc16(const uint8_t* data, uint8_t len) {
+  uint16_t crc = 0xFFFF;
+  for (uint8_t i = 0; i < len; i++) {
+    crc ^= (uint16_t)data[i] << 8;
+    for (uint8_t bit = 0; bit < 8; bit++) {
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+    }
+  }
+  return crc;
+}
+
+// COBS: ersetzt alle Nullbytes, damit 0x00 die Rahmen eindeutig trennt
+uint8_t cobsEncode(const uint8_t* in, uint8_t len, uint8_t* out) {
+  uint8_t codeIndex = 0;
+  uint8_t writeIndex = 1;
+  uint8_t code = 1;
+  for (uint8_t i = 0; i < len; i++) {
+    if (in[i] == 0) {
+      out[codeIndex] = code;
+      codeIndex = writeIndex++;
+      code = 1;
+    } else {
+      out[writeIndex++] = in[i];
+      code++;
+    }
+  }
+  out[codeIndex] = code;
+  return writeIndex;
+}
+
+// Sendet Typ + Nutzdaten (max. 8 Bytes) als Rahmen
+void sendFrame(uint8_t type, const uint8_t* payload, uint8_t len) {
+  uint8_t body[11];
+  uint8_t frame[14];
+  body[0] = type;
+  if (len > 0) memcpy(body + 1, payload, len);
+  uint16_t crc = crc16(body, len + 1);
+  body[len + 1] = crc & 0xFF;
+  body[len + 2] = crc >> 8;
+  // Führendes 0x00: der Pi erkennt daran den Rahmenanfang auch nach einer Textzeile
+  frame[0] = 0x00;
+  uint8_t frameLen = 1 + cobsEncode(body, len + 3, frame + 1);
+  frame[frameLen++] = 0x00;
+  Serial.write(frame, frameLen);
+}
 
 void setup() {
   // Initialize Serial
@@ -83,16 +141,28 @@ void loop() {
 
     // Prüfe ob Lesen fehlgeschlagen ist
     if (isnan(h) || isnan(t)) {
-      Serial.println(F("{\"error\": \"Failed to read from DHT sensor!\"}"));
+      if (binaryMode) {
+        sendFrame(MSG_SENSOR_ERROR, NULL, 0);
+      } else {
+        Serial.println(F("{\"error\": \"Failed to read from DHT sensor!\"}"));
+      }
       lcd.setCursor(6, 0); lcd.print("Err ");
       lcd.setCursor(6, 1); lcd.print("Err ");
     } else {
-      // Send JSON to Serial
-      Serial.print("{\"temp\": ");
-      Serial.print(t, 1);
-      Serial.print(", \"hum\": ");
-      Serial.print(h, 1);
-      Serial.println("}");
+      if (binaryMode) {
+        // Zehntel wie Serial.print(t, 1)
+        int16_t t10 = (int16_t)round(t * 10);
+        uint16_t h10 = (uint16_t)round(h * 10);
+        uint8_t payload[4] = { (uint8_t)(t10 & 0xFF), (uint8_t)(t10 >> 8), (uint8_t)(h10 & 0xFF), (uint8_t)(h10 >> 8) };
+        sendFrame(MSG_READING, payload, 4);
+      } else {
+        // Send JSON to Serial
+        Serial.print("{\"temp\": ");
+        Serial.print(t, 1);
+        Serial.print(", \"hum\": ");
+        Serial.print(h, 1);
+        Serial.println("}");
+      }
 
       // Aktualisiere Lokales Display (Reihen 0 und 1)
       lcd.setCursor(6, 0); 
@@ -107,6 +177,12 @@ void loop() {
     String inputString = Serial.readStringUntil('\n');
     inputString.trim();
 
+    // Pi fragt nach dem Binärprotokoll
+    if (inputString.indexOf("\"proto\"") != -1) {
+      Serial.println(F("{\"proto\": 1}"));
+      binaryMode = true;
+    }
+
     // Prüfe auf {"msg": "..."}
     // Einfaches eigenes Parsing
     int keyIndex = inputString.indexOf("\"msg\"");
@@ -0,0 +1,139 @@
+"""
+Messprozess: Serial-Kommunikation, PID-Regelung, Verlauf und Rollups.
+
+Läuft entweder im Webprozess (ACQUISITION=embedded, Standard) oder als eigener
+Prozess, der seinen Status in Shared-Memory-Slots veröffentlicht. Dann können
+beliebig viele Web-Worker den Status lesen, ohne die Ports selbst zu öffnen,
+und Last auf der Web-API kann die Regelschleife nicht mehr verzögern.
+
+Aufruf:
+    python acquisition.py
+    ACQUISITION=external python serve.py                     # ein Prozess, Thread-Pool
+    ACQUISITION=external gunicorn -w 4 -b 0.0.0.0:5001 app:app  # mehrere Worker
+"""
+import json
+import signal
+import threading
+import time
+
+from flask import Flask
+from events import format_event
+from models import init_db
+from rollup import RollupWorker
+from serial_manager import SerialManager
+from shared_state import SharedState
+
+# Wie oft der Daemon neue Einstellungen abholt bzw. Diagnosewerte veröffentlicht
+SETTINGS_POLL_INTERVAL = 0.1
+STATUS_INTERVAL = 5.0
+
+class Acquisition:
+    """
+    Alles, was genau einmal laufen darf: SerialManager und RollupWorker.
+    Die Web-API nutzt nur rooms(), resolve_room(), live(), stream(), update_settings() und stats();
+    AcquisitionClient bietet dieselben Methoden für den separaten Prozess.
+    'room_id' None steht für den Standardraum, eine unbekannte ID löst UnknownRoom aus.
+    """
+    def __init__(self, app: Flask):
+        self.serial_mgr = SerialManager(app)
+        # Verdichtet Rohdaten zu 1min/1h/1d Rollups und löscht alte Einträge
+        self.rollup_worker = RollupWorker(app)
+
+    def start(self):
+        self.serial_mgr.start()
+        self.rollup_worker.start()
+
+    def stop(self):
+        self.serial_mgr.stop()
+        self.rollup_worker.stop()
+
+    def rooms(self):
+        return self.serial_mgr.rooms_info()
+
+    def resolve_room(self, room_id=None):
+        """Raum-ID für Abfragen ohne Live-Status (Verlauf): Standardraum oder UnknownRoom."""
+        return self.serial_mgr.get_room(room_id).id
+
+    def live(self, room_id=None):
+        return self.serial_mgr.get_room(room_id).state.current
+
+    def stream(self, room_id=None):
+        # Aktuellen Stand sofort senden, danach nur noch Änderungen
+        room = self.serial_mgr.get_room(room_id)
+        return room.events.stream(initial=format_event('live', room.state.current.body))
+
+    def update_settings(self, target_temp=None, target_hum=None, control_mode=None, room_id=None):
+        state = self.serial_mgr.update_settings(target_temp, target_hum, control_mode, room_id)
+        return settings_of(state)
+
+    def stats(self):
+        return {
+            'history_writer': self.serial_mgr.history.stats(),
+            'rollup': self.rollup_worker.stats(),
+            'rooms': {room_id: room.stats() for room_id, room in self.serial_mgr.rooms.items()},
+            'devices': self.serial_mgr.registry.stats()
+        }
+
+def settings_of(state):
+    return {
+        'target_temp': state.target_temperature,
+        'target_hum': state.target_humidity,
+        'control_mode': state.control_mode
+    }
+
+def create_app():
+    app = Flask(__name__)
+    app.config.from_object('config')
+    init_db(app)
+    return app
+
+def main():
+    app = create_app()
+    acquisition = Acquisition(app)
+    serial_mgr = acquisition.serial_mgr
+    shared = SharedState(app.config['SHARED_STATE_DIR'], create=True, rooms=serial_mgr.rooms)
+
+    # Jede Status-Änderung und jeden Verlaufspunkt auch ins Shared Memory schreiben ('live-<raum>' usw.)
+    listeners = []
+    settings_versions = {}
+    for room_id, room in serial_mgr.rooms.items():
+        listener = lambda event, data, room_id=room_id: shared.publish(f"{event}-{room_id}", data)
+        room.events.add_listener(listener)
+        listeners.append((room, listener))
+        shared.publish(f"live-{room_id}", room.state.current.body)
+        with shared[f"settings-{room_id}"].locked():
+            settings_versions[room_id] = shared.publish(f"settings-{room_id}", settings_of(room.state.current))
+    shared.publish('status', acquisition.stats())
+
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+
+    acquisition.start()
+    print(f"Acquisition running, shared state in {app.config['SHARED_STATE_DIR']}")
+
+    last_status = time.monotonic()
+    while not stop_event.is_set():
+        # Von Web-Workern geschriebene Einstellungen übernehmen
+        for room_id, version in settings_versions.items():
+            slot = shared[f"settings-{room_id}"]
+            if slot.version() != version:
+                settings_versions[room_id], payload = slot.read()
+                settings = json.loads(payload)
+                acquisition.update_settings(settings.get('target_temp'), settings.get('target_hum'),
+                                            settings.get('control_mode'), room_id)
+
+        if time.monotonic() - last_status >= STATUS_INTERVAL:
+            last_status = time.monotonic()
+            shared.publish('status', acquisition.stats())
+
+        stop_event.wait(SETTINGS_POLL_INTERVAL)
+
+    print("Acquisition stopping...")
+    for room, listener in listeners:
+        room.events.listeners.remove(listener)
+    acquisition.stop()
+    shared.close()
+
+if __name__ == '__main__':
+    main()
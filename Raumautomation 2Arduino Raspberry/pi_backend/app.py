@@ -1,71 +1,144 @@
-from flask import Flask, jsonify, render_template_string, request
-from models import db, ClimateReading
-from serial_manager import SerialManager
+from flask import Flask, Response, jsonify, render_template_string, request
+from models import init_db
+from history import query_history, query_buckets, newest_reading_id, parse_timestamp, parse_resolution, HistoryQueryError
+from acquisition import Acquisition
+from shared_state import AcquisitionClient, AcquisitionUnavailable
+from room import UnknownRoom, configured_rooms
 from flask_cors import CORS
 import os
+import atexit
+import time
 
 app = Flask(__name__, static_folder='../pi_frontend', static_url_path='')
-CORS(app) # CORS für alle Domains aktivieren
+CORS(app, expose_headers=['X-Next-Cursor']) # CORS für alle Domains aktivieren
 
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///climate_data.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-db.init_app(app)
+# Datenbank, Aufbewahrung und Betriebsart (siehe config.py)
+app.config.from_object('config')
 
 # DB Tabellen erstellen
-with app.app_context():
-    db.create_all()
+init_db(app)
 
-# Initialisiere Serial Manager
-# Wir übergeben 'app', damit dieser Kontexte für den Datenbankzugriff erstellen kann
-serial_mgr = SerialManager(app)
-serial_mgr.start()
+if app.config['ACQUISITION'] == 'external':
+    # Serial, Regelung, Verlauf und Rollups laufen in acquisition.py,
+    # dieser Prozess liest nur den veröffentlichten Status
+    acquisition = AcquisitionClient(app.config['SHARED_STATE_DIR'], configured_rooms(app.config))
+else:
+    # Wir übergeben 'app', damit die Threads Kontexte für den Datenbankzugriff erstellen können
+    acquisition = Acquisition(app)
+    acquisition.start()
+    atexit.register(acquisition.stop)
 
 @app.route('/')
 def index():
     return app.send_static_file('index.html')
 
+def not_modified(etag):
+    """304-Antwort: der Client hat diesen Stand bereits, es wird nichts serialisiert."""
+    response = Response(status=304)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def with_etag(response, etag):
+    response.set_etag(etag)
+    # 'no-cache': Browser dürfen speichern, müssen aber per If-None-Match nachfragen
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/api/rooms', methods=['GET'])
+def get_rooms():
+    """Konfigurierte Räume; alle Endpunkte unten nehmen '?room=<id>', ohne gilt der Standardraum."""
+    return jsonify(acquisition.rooms())
+
 @app.route('/api/live', methods=['GET'])
 def get_live_data():
-    """Gibt den aktuellen Live-Status der Serial-Schleife zurück."""
-    return jsonify({
-        'temperature': serial_mgr.current_temp,
-        'humidity': serial_mgr.current_hum,
-        'fan_speed': serial_mgr.current_fan_speed,
-        'target_temperature': serial_mgr.target_temp,
-        'target_humidity': serial_mgr.target_hum,
-        'control_mode': serial_mgr.control_mode,
-        'active_sensor_port': serial_mgr.sensor_port,
-        'active_motor_port': serial_mgr.motor_port
-    })
+    """Gibt den aktuellen Live-Status eines Raums zurück (ETag = Raum und Status-Sequenznummer)."""
+    # Ein Schnappschuss: JSON und ETag wurden bei der Änderung schon erzeugt
+    state = acquisition.live(request.args.get('room'))
+    if request.if_none_match.contains(state.etag):
+        return not_modified(state.etag)
+    return with_etag(Response(state.body, mimetype='application/json'), state.etag)
+
+@app.route('/api/stream', methods=['GET'])
+def stream():
+    """
+    Server-Sent Events: 'live' bei jeder Status-Änderung, 'reading' bei jedem neuen Verlaufspunkt.
+    Ersetzt das Polling von /api/live und /api/history.
+    """
+    return Response(acquisition.stream(request.args.get('room')), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/api/history', methods=['GET'])
 def get_history():
-    """Gibt die letzten N Datensätze zurück."""
-    limit = request.args.get('limit', 100, type=int)
-    readings = ClimateReading.query.order_by(ClimateReading.timestamp.desc()).limit(limit).all()
-    
-    # Umkehren für chronologische Reihenfolge in Diagrammen
-    data = [r.to_dict() for r in readings][::-1]
-    return jsonify(data)
+    """
+    Gibt Datensätze chronologisch zurück (Standard: die letzten N).
+    Optional: 'from'/'to' (ISO-8601) für einen Zeitbereich und 'cursor' zum Blättern.
+    Der Cursor für die nächste Seite steht im Header 'X-Next-Cursor'.
+    Mit 'resolution' (z.B. '5m', '1h' oder Sekunden) werden Buckets mit min/max/Mittel geliefert.
+    Mit 'room' die Messwerte dieses Raums, sonst die des Standardraums.
+    """
+    limit = max(1, min(request.args.get('limit', 100, type=int), 5000))
+    room_id = acquisition.resolve_room(request.args.get('room'))
+    try:
+        start = parse_timestamp(request.args.get('from'))
+        end = parse_timestamp(request.args.get('to'))
+        resolution = parse_resolution(request.args.get('resolution', request.args.get('bucket')))
+    except HistoryQueryError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # ETag = neueste Zeilen-ID; bei Buckets bis "jetzt" zusätzlich der aktuelle Bucket,
+    # weil das Fenster auch ohne neue Zeilen weiterwandert
+    etag = f"history-{newest_reading_id()}"
+    if resolution and end is None:
+        etag += f"-{int(time.time()) // resolution}"
+    if request.if_none_match.contains(etag):
+        return not_modified(etag)
+
+    try:
+        if resolution:
+            return with_etag(jsonify(query_buckets(resolution, limit=limit, start=start, end=end,
+                                                   room_id=room_id)), etag)
+
+        readings, next_cursor = query_history(
+            limit=limit,
+            start=start,
+            end=end,
+            cursor=request.args.get('cursor'),
+            room_id=room_id
+        )
+    except HistoryQueryError as e:
+        return jsonify({"error": str(e)}), 400
+
+    response = jsonify([r.to_dict() for r in readings])
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return with_etag(response, etag)
+
+@app.route('/api/status', methods=['GET'])
+def get_status():
+    """Gibt Diagnosewerte der Hintergrund-Threads zurück (je Raum inkl. Jitter des Regeltakts)."""
+    return jsonify(acquisition.stats())
 
 @app.route('/api/settings', methods=['POST'])
 def update_settings():
-    """Aktualisiert die Einstellungen."""
+    """Aktualisiert die Einstellungen eines Raums."""
     data = request.json
-    if 'target_temp' in data:
-        serial_mgr.target_temp = float(data['target_temp'])
-    if 'target_hum' in data:
-        serial_mgr.target_hum = float(data['target_hum'])
-    if 'control_mode' in data:
-        serial_mgr.control_mode = data['control_mode']
+    settings = acquisition.update_settings(
+        target_temp=float(data['target_temp']) if 'target_temp' in data else None,
+        target_hum=float(data['target_hum']) if 'target_hum' in data else None,
+        control_mode=data.get('control_mode'),
+        room_id=request.args.get('room')
+    )
         
-    return jsonify({
-        "status": "success", 
-        "target_temp": serial_mgr.target_temp,
-        "target_hum": serial_mgr.target_hum,
-        "control_mode": serial_mgr.control_mode
-    })
+    return jsonify({"status": "success", **settings})
+
+@app.errorhandler(AcquisitionUnavailable)
+def acquisition_unavailable(e):
+    return jsonify({"error": str(e)}), 503
+
+@app.errorhandler(UnknownRoom)
+def unknown_room(e):
+    return jsonify({"error": str(e)}), 404
 
 if __name__ == '__main__':
     # Server starten
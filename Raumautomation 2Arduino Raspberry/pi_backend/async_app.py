@@ -0,0 +1,171 @@
+"""
+Alternatives Backend auf asyncio-Basis (Starlette + uvicorn + pyserial-asyncio).
+
+Gleicher Vertrag wie app.py für /api/rooms, /api/live, /api/history,
+/api/settings, /api/stream und /api/status. Serial, PID, Verlauf, Rollups und SSE laufen als
+Tasks in einer Event-Loop (siehe async_serial.py), so lassen sich Latenz und
+Speicherbedarf beider Varianten auf dem Pi direkt vergleichen.
+
+Aufruf (genau ein Prozess, sonst öffnet jeder Worker die Ports):
+    pip install -r requirements-async.txt
+    python async_app.py
+    uvicorn async_app:app --host 0.0.0.0 --port 5001
+"""
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+
+from flask import Flask
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+from starlette.staticfiles import StaticFiles
+
+from acquisition import settings_of
+from async_serial import AsyncSerialManager, run_rollups
+from events import format_event
+from history import query_history, query_buckets, newest_reading_id, parse_timestamp, parse_resolution, HistoryQueryError
+from models import init_db
+from rollup import RollupWorker
+from room import UnknownRoom
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'pi_frontend')
+
+# Flask-App nur für Konfiguration und den Datenbank-Kontext von Flask-SQLAlchemy
+db_app = Flask(__name__)
+db_app.config.from_object('config')
+init_db(db_app)
+
+serial_mgr = AsyncSerialManager(db_app)
+rollup_worker = RollupWorker(db_app)
+
+def etag_matches(request, etag):
+    """Entspricht request.if_none_match.contains(etag) in Flask."""
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    tags = [t.strip().removeprefix('W/').strip('"') for t in header.split(',')]
+    return etag in tags or '*' in tags
+
+def etag_headers(etag):
+    # 'no-cache': Browser dürfen speichern, müssen aber per If-None-Match nachfragen
+    return {'ETag': f'"{etag}"', 'Cache-Control': 'no-cache'}
+
+def int_arg(request, name, default):
+    try:
+        return int(request.query_params.get(name, default))
+    except ValueError:
+        return default
+
+async def get_rooms(request):
+    return JSONResponse(serial_mgr.rooms_info())
+
+async def get_live_data(request):
+    """Gibt den aktuellen Live-Status eines Raums zurück (ETag = Raum und Status-Sequenznummer)."""
+    state = serial_mgr.get_room(request.query_params.get('room')).state.current
+    if etag_matches(request, state.etag):
+        return Response(status_code=304, headers=etag_headers(state.etag))
+    return Response(state.body, media_type='application/json', headers=etag_headers(state.etag))
+
+async def stream(request):
+    """Server-Sent Events: 'live' bei jeder Status-Änderung, 'reading' bei jedem neuen Verlaufspunkt."""
+    room = serial_mgr.get_room(request.query_params.get('room'))
+    initial = format_event('live', room.state.current.body)
+    return StreamingResponse(room.events.stream(initial=initial), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def load_history(request, room_id, limit, start, end, resolution):
+    """Wie get_history() in app.py; läuft per to_thread, weil SQLite blockiert."""
+    with db_app.app_context():
+        etag = f"history-{newest_reading_id()}"
+        if resolution and end is None:
+            etag += f"-{int(time.time()) // resolution}"
+        if etag_matches(request, etag):
+            return etag, None, None
+        if resolution:
+            return etag, query_buckets(resolution, limit=limit, start=start, end=end, room_id=room_id), None
+
+        readings, next_cursor = query_history(
+            limit=limit,
+            start=start,
+            end=end,
+            cursor=request.query_params.get('cursor'),
+            room_id=room_id
+        )
+        return etag, [r.to_dict() for r in readings], next_cursor
+
+async def get_history(request):
+    """Parameter wie in app.py: limit, from, to, cursor, resolution, room."""
+    limit = max(1, min(int_arg(request, 'limit', 100), 5000))
+    room_id = serial_mgr.get_room(request.query_params.get('room')).id
+    try:
+        start = parse_timestamp(request.query_params.get('from'))
+        end = parse_timestamp(request.query_params.get('to'))
+        resolution = parse_resolution(request.query_params.get('resolution', request.query_params.get('bucket')))
+        etag, data, next_cursor = await asyncio.to_thread(load_history, request, room_id, limit, start, end, resolution)
+    except HistoryQueryError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    headers = etag_headers(etag)
+    if data is None:
+        return Response(status_code=304, headers=headers)
+    if next_cursor:
+        headers['X-Next-Cursor'] = next_cursor
+    return JSONResponse(data, headers=headers)
+
+async def get_status(request):
+    return JSONResponse({
+        'history_writer': serial_mgr.history.stats(),
+        'rollup': rollup_worker.stats(),
+        'rooms': {room_id: room.stats() for room_id, room in serial_mgr.rooms.items()},
+        'devices': serial_mgr.registry.stats()
+    })
+
+async def update_settings(request):
+    """Aktualisiert die Einstellungen; der Regler liest sie beim nächsten Schritt."""
+    data = await request.json()
+    state = serial_mgr.update_settings(
+        target_temp=float(data['target_temp']) if 'target_temp' in data else None,
+        target_hum=float(data['target_hum']) if 'target_hum' in data else None,
+        control_mode=data.get('control_mode'),
+        room_id=request.query_params.get('room')
+    )
+    return JSONResponse({"status": "success", **settings_of(state)})
+
+async def unknown_room(request, exc):
+    return JSONResponse({"error": str(exc)}, status_code=404)
+
+@asynccontextmanager
+async def lifespan(app):
+    tasks = [asyncio.create_task(serial_mgr.run()), asyncio.create_task(run_rollups(rollup_worker))]
+    yield
+    # Abbruch schreibt den gepufferten Verlauf (AsyncHistoryWriter.run)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+app = Starlette(
+    routes=[
+        Route('/api/rooms', get_rooms, methods=['GET']),
+        Route('/api/live', get_live_data, methods=['GET']),
+        Route('/api/stream', stream, methods=['GET']),
+        Route('/api/history', get_history, methods=['GET']),
+        Route('/api/status', get_status, methods=['GET']),
+        Route('/api/settings', update_settings, methods=['POST']),
+        Mount('/', StaticFiles(directory=FRONTEND_DIR, html=True))
+    ],
+    middleware=[
+        # CORS für alle Domains aktivieren
+        Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'],
+                   expose_headers=['X-Next-Cursor'])
+    ],
+    exception_handlers={UnknownRoom: unknown_room},
+    lifespan=lifespan
+)
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=5001)
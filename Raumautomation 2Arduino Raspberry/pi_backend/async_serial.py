@@ -0,0 +1,208 @@
+"""
+SerialManager für das asyncio-Backend (async_app.py).
+
+Sensor lesen, Motor schreiben, PID-Schritt, Verlauf bündeln und SSE-Verteilung
+laufen als Tasks in einer einzigen Event-Loop statt in eigenen Threads. Nur
+blockierende Arbeit (Port-Scan, SQLite-Commit, Rollups) wird per
+asyncio.to_thread ausgelagert.
+"""
+import asyncio
+import time
+from datetime import datetime
+
+import serial
+import serial_asyncio
+from flask import Flask
+
+from events import AsyncEventBroker
+from history_writer import HistoryWriter
+from models import DEFAULT_ROOM
+from room import LOG_INTERVAL
+from serial_manager import SerialManager, RESCAN_INTERVAL, RECONNECT_DELAY
+
+# Höchstens so viele Bytes je read(); nach einer Pause kommt so der ganze Rückstau auf einmal
+READ_SIZE = 4096
+
+class AsyncHistoryWriter(HistoryWriter):
+    """HistoryWriter mit asyncio.Queue; nur der Commit selbst läuft in einem Executor-Thread."""
+    def __init__(self, app: Flask, max_queue=1000, batch_size=50, flush_interval=5.0):
+        super().__init__(app, max_queue, batch_size, flush_interval)
+        self.queue = asyncio.Queue(maxsize=max_queue)
+
+    def submit(self, temperature, humidity, fan_speed, timestamp=None, room_id=DEFAULT_ROOM):
+        try:
+            self.queue.put_nowait({
+                'room_id': room_id,
+                'timestamp': timestamp or datetime.utcnow(),
+                'temperature': temperature,
+                'humidity': humidity,
+                'fan_speed': fan_speed
+            })
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def run(self):
+        """Task: sammelt Einträge und schreibt sie gebündelt; beim Abbruch wird der Rest gesichert."""
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        try:
+            while True:
+                try:
+                    timeout = max(0.0, deadline - time.monotonic())
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout=timeout))
+                except asyncio.TimeoutError:
+                    pass
+
+                if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                    # Vor dem await leeren, damit ein Abbruch den Batch nicht doppelt schreibt
+                    pending, batch = batch, []
+                    await asyncio.to_thread(self._flush, pending)
+                    deadline = time.monotonic() + self.flush_interval
+        finally:
+            while not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            self._flush(batch)
+
+class NonBlockingWriter:
+    """
+    StreamWriter ohne drain(): liegt noch Ungesendetes im Puffer (Arduino nimmt nichts an),
+    wird ein Befehl wie bei write_timeout verworfen, statt die Sensor-Schleife warten zu lassen.
+    """
+    def __init__(self, writer):
+        self.writer = writer
+
+    def write(self, data):
+        if self.writer.transport.get_write_buffer_size():
+            raise serial.SerialTimeoutException('Write timeout')
+        self.writer.write(data)
+
+async def run_rollups(rollup_worker):
+    """Task: RollupWorker.run_once() periodisch, die SQLite-Arbeit in einem Executor-Thread."""
+    while True:
+        await asyncio.to_thread(rollup_worker.run_once)
+        await asyncio.sleep(rollup_worker.interval)
+
+class AsyncSerialManager(SerialManager):
+    """
+    SerialManager als Menge von asyncio-Tasks, je Raum eine Serial-Schleife. Port-Erkennung,
+    PID und Sensorzeilen-Verarbeitung sind dieselben wie im Thread-Backend (room.py).
+    Statt start()/stop() wird run() als Task gestartet und zum Beenden abgebrochen.
+    """
+    def __init__(self, app: Flask):
+        super().__init__(app)
+        self.thread = None
+        # Ein Scan für alle Räume; wer währenddessen fragt, bekommt dessen Ergebnis
+        self.scan_lock = asyncio.Lock()
+        self.last_scan = float('-inf')
+        self.assignment = {}
+
+    def _history_writer(self, app):
+        return AsyncHistoryWriter(app)
+
+    def _event_broker(self):
+        return AsyncEventBroker()
+
+    async def run(self):
+        print(f"Async Serial Manager started ({len(self.rooms)} rooms).")
+        tasks = [
+            asyncio.create_task(self.history.run()),
+            asyncio.create_task(self._log_loop()),
+            *(asyncio.create_task(self._serial_loop(room)) for room in self.rooms.values())
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _log_loop(self):
+        while True:
+            await asyncio.sleep(LOG_INTERVAL)
+            for room in self.rooms.values():
+                if room.state.current.temperature is not None:
+                    room.log_reading()
+
+    async def _scan(self, room):
+        """Ports eines Raums; ein Ergebnis jünger als RESCAN_INTERVAL wird wiederverwendet."""
+        async with self.scan_lock:
+            if room.id not in self.assignment or time.monotonic() - self.last_scan >= RESCAN_INTERVAL:
+                # Port-Scan blockiert, daher im Thread
+                self.assignment = await asyncio.to_thread(self.registry.scan)
+                self.last_scan = time.monotonic()
+            return self.assignment.get(room.id, (None, None))
+
+    async def _serial_loop(self, room):
+        while self.running:
+            # 1. Verbindungswiederherstellung
+            room.set_ports(*await self._scan(room))
+
+            if room.simulated:
+                # SIMULATION MODE
+                room.simulation_step()
+                await asyncio.sleep(room.simulation_timeout())
+                continue
+
+            # 2. Hauptschleife, bis ein Port ausfällt
+            writers = []
+            try:
+                sensor_reader, sensor_writer = await serial_asyncio.open_serial_connection(
+                    url=room.sensor_port, baudrate=115200)
+                writers.append(sensor_writer)
+                motor_reader, motor_writer = await serial_asyncio.open_serial_connection(
+                    url=room.motor_port, baudrate=115200)
+                writers.append(motor_writer)
+                print(f"[{room.id}] Connected to Sensor {room.sensor_port} and Motor {room.motor_port}")
+
+                room.attach(sensor_writer, NonBlockingWriter(motor_writer))
+                await self._run_until_error(
+                    self._read_sensor(room, sensor_reader),
+                    self._control_loop(room),
+                    self._read_motor(room, motor_reader)
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[{room.id}] Serial Loop Error: {e}")
+            finally:
+                for writer in writers:
+                    writer.close()
+                room.detach()
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    @staticmethod
+    async def _run_until_error(*coros):
+        """Führt die Coroutinen parallel aus; endet eine mit Fehler, werden die anderen abgebrochen."""
+        tasks = [asyncio.create_task(c) for c in coros]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _read_sensor(self, room, reader):
+        while True:
+            chunk = await reader.read(READ_SIZE)
+            if not chunk:
+                raise ConnectionError("Sensor getrennt")
+            room.receive_sensor(chunk)
+
+    async def _control_loop(self, room):
+        """Fester Regeltakt (ControlScheduler); ohne Takt regelt _read_sensor mit jeder Zeile."""
+        if room.scheduler is None:
+            return
+        while True:
+            await asyncio.sleep(room.scheduler.timeout())
+            if room.scheduler.due():
+                room.control_step(room.motor)
+
+    async def _read_motor(self, room, reader):
+        # Ausgaben des Motor-Arduinos: nur die Antwort auf HELLO zählt, der Rest (Watchdog) wird geleert
+        while True:
+            chunk = await reader.read(READ_SIZE)
+            if not chunk:
+                raise ConnectionError("Motor getrennt")
+            room.receive_motor(chunk)
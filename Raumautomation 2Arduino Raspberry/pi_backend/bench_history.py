@@ -0,0 +1,95 @@
+"""
+Benchmark der Verlaufsabfragen gegen eine synthetische Datenbank.
+
+Erzeugt eine SQLite-Datei mit N Messwerten im 30 s Raster und misst
+/api/history-Abfragen (neueste N, Zeitbereich, Blättern per Cursor)
+jeweils mit und ohne Index auf 'timestamp'.
+
+Aufruf:
+    python bench_history.py --rows 2000000
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask
+from models import db, upgrade_schema
+from history import query_history
+
+INTERVAL = timedelta(seconds=30)
+
+
+def fill_db(path, rows):
+    conn = sqlite3.connect(path)
+    start = datetime(2024, 1, 1)
+
+    def generate():
+        for i in range(rows):
+            ts = start + i * INTERVAL
+            yield (ts.strftime('%Y-%m-%d %H:%M:%S.%f'), 20 + (i % 100) * 0.05, 50 + (i % 60) * 0.2, i % 256)
+
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.executemany("INSERT INTO climate_reading (timestamp, temperature, humidity, fan_speed) VALUES (?, ?, ?, ?)",
+                     generate())
+    conn.commit()
+    conn.close()
+    return start, start + (rows - 1) * INTERVAL
+
+
+def timed(label, fn, repeat=20):
+    fn() # Cache aufwärmen
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    elapsed = (time.perf_counter() - start) / repeat * 1000
+    print(f"  {label:<34} {elapsed:9.2f} ms")
+    return result
+
+
+def run_queries(first, last):
+    middle = first + (last - first) / 2
+    timed("neueste 100", lambda: query_history(limit=100))
+    timed("Bereich 1 Tag (limit 5000)", lambda: query_history(limit=5000, start=middle, end=middle + timedelta(days=1)))
+    _, cursor = query_history(limit=500, start=middle)
+    timed("nächste Seite per Cursor (500)", lambda: query_history(limit=500, start=middle, cursor=cursor))
+    _, cursor = query_history(limit=500)
+    timed("ältere Seite per Cursor (500)", lambda: query_history(limit=500, cursor=cursor))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'bench.db')
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+        db.init_app(app)
+
+        with app.app_context():
+            db.create_all()
+            t = time.perf_counter()
+            first, last = fill_db(path, args.rows)
+            print(f"{args.rows} Zeilen erzeugt in {time.perf_counter() - t:.1f} s ({first} bis {last})")
+
+            print("Mit Index:")
+            run_queries(first, last)
+
+            db.session.execute(db.text("DROP INDEX ix_climate_reading_timestamp"))
+            db.session.commit()
+            print("Ohne Index:")
+            run_queries(first, last)
+
+            # Migration für bestehende Datenbanken prüfen
+            t = time.perf_counter()
+            upgrade_schema()
+            print(f"Index nachträglich angelegt in {time.perf_counter() - t:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+"""
+Latenz-Benchmark für den SerialManager.
+
+Simuliert Sensor- und Motor-Arduino über Pseudo-Terminals (pty) und misst die Zeit
+vom Schreiben einer Sensorzeile bis zum Eintreffen des Motorbefehls.
+Mit '--backend async' wird der AsyncSerialManager (async_app.py) gemessen.
+Die Latenz wird ohne festen Regeltakt gemessen (Regelschritt je Sensorzeile);
+mit '--control-period' läuft stattdessen der Regeltakt und dessen Jitter wird ausgegeben.
+
+Mit '--rooms N' bedient ein Prozess N Sensor/Motor-Paare; je Sample bekommen alle
+Räume gleichzeitig eine Sensorzeile (ungünstigster Fall), ausgegeben werden die
+Verteilung über alle Räume und der langsamste Raum.
+
+Aufruf (nur Linux/macOS):
+    python bench_latency.py --samples 200
+    python bench_latency.py --samples 200 --backend async
+    python bench_latency.py --samples 200 --control-period 0.1
+    python bench_latency.py --samples 200 --rooms 16
+"""
+import argparse
+import asyncio
+import os
+import pty
+import random
+import resource
+import select
+import statistics
+import threading
+import time
+
+from flask import Flask
+from models import db
+from serial_manager import SerialManager
+
+
+class FakeRegistry:
+    """Liefert statt eines Port-Scans die pty-Geräte je Raum."""
+
+    def __init__(self, assignment):
+        self.assignment = assignment
+
+    def scan(self):
+        return self.assignment
+
+    def stats(self):
+        return {}
+
+
+class FakePorts:
+    """'pairs': je Raum (sensor_port, motor_port), in der Reihenfolge von ROOMS."""
+
+    def __init__(self, app, pairs):
+        super().__init__(app)
+        self.registry = FakeRegistry(dict(zip(self.rooms, pairs)))
+
+
+class FakeArduinoManager(FakePorts, SerialManager):
+    pass
+
+
+def start_async(app, pairs):
+    """Startet den AsyncSerialManager in einer eigenen Event-Loop (Daemon-Thread)."""
+    from async_serial import AsyncSerialManager
+
+    class FakeAsyncManager(FakePorts, AsyncSerialManager):
+        pass
+
+    mgr = FakeAsyncManager(app, pairs)
+    threading.Thread(target=asyncio.run, args=(mgr.run(),), daemon=True).start()
+    return mgr
+
+
+def open_pty():
+    master, slave = pty.openpty()
+    return master, os.ttyname(slave)
+
+
+def sensor_line():
+    return f'{{"temp": {random.uniform(20, 30):.1f}, "hum": {random.uniform(40, 60):.1f}}}\n'.encode('utf-8')
+
+
+def measure_latency(args, masters):
+    """Je Sample eine Sensorzeile an alle Räume, Zeit bis zum Motorbefehl je Raum in ms."""
+    latencies = {room_id: [] for room_id in masters}
+    for _ in range(args.samples):
+        time.sleep(random.uniform(0, 2 * args.interval))
+        lines = [sensor_line() for _ in masters]
+        pending = {motor_master: room_id for room_id, (_, motor_master) in masters.items()}
+        start = time.perf_counter()
+        for (sensor_master, _), line in zip(masters.values(), lines):
+            os.write(sensor_master, line)
+        buffers = dict.fromkeys(pending, b'')
+        deadline = start + 2.0
+        while pending and (remaining := deadline - time.perf_counter()) > 0:
+            ready, _, _ = select.select(list(pending), [], [], remaining)
+            now = time.perf_counter()
+            for fd in ready:
+                buffers[fd] += os.read(fd, 256)
+                if b'\n' in buffers[fd]:
+                    latencies[pending.pop(fd)].append((now - start) * 1000)
+        if pending:
+            print(f"Timeout: kein Motorbefehl für {', '.join(pending.values())}")
+    return latencies
+
+
+def percentile(values, p):
+    return values[max(0, int(len(values) * p) - 1)]
+
+
+def print_latency(latencies):
+    values = sorted(v for room in latencies.values() for v in room)
+    if not values:
+        return
+    print(f"Samples: {len(values)}" + (f" ({len(latencies)} Räume)" if len(latencies) > 1 else ""))
+    print(f"min    {values[0]:7.2f} ms")
+    print(f"median {statistics.median(values):7.2f} ms")
+    print(f"p95    {percentile(values, 0.95):7.2f} ms")
+    print(f"max    {values[-1]:7.2f} ms")
+    if len(latencies) > 1:
+        per_room = {room_id: sorted(v) for room_id, v in latencies.items() if v}
+        worst = max(per_room, key=lambda r: percentile(per_room[r], 0.95))
+        print(f"langsamster Raum {worst}: median {statistics.median(per_room[worst]):.2f} ms, "
+              f"p95 {percentile(per_room[worst], 0.95):.2f} ms, max {per_room[worst][-1]:.2f} ms")
+
+
+def measure_control(mgr, args, masters):
+    """Sensorzeilen mit zufälligem Abstand an alle Räume senden, Motorbefehle leeren, Jitter je Raum ausgeben."""
+    motor_masters = [motor for _, motor in masters.values()]
+    commands = 0
+    for _ in range(args.samples):
+        deadline = time.perf_counter() + random.uniform(0, 2 * args.interval)
+        for sensor_master, _ in masters.values():
+            os.write(sensor_master, sensor_line())
+        while (remaining := deadline - time.perf_counter()) > 0:
+            ready, _, _ = select.select(motor_masters, [], [], remaining)
+            for fd in ready:
+                commands += os.read(fd, 4096).count(b'\n')
+
+    mgr.running = False
+    print(f"Sensorzeilen: {args.samples * len(masters)}, Motorbefehle: {commands}")
+    if len(masters) == 1:
+        for key, value in mgr.room.control_stats().items():
+            print(f"{key:15} {value}")
+        return
+    print(f"{'Raum':10} {'Takte':>6} {'Mittel':>8} {'p99':>8} {'max':>8}  (Jitter in ms)")
+    for room_id, room in mgr.rooms.items():
+        stats = room.control_stats()
+        print(f"{room_id:10} {stats['cycles']:6} {stats['jitter_mean_ms']:8.3f} "
+              f"{stats['jitter_p99_ms']:8.3f} {stats['jitter_max_ms']:8.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--samples', type=int, default=100)
+    parser.add_argument('--interval', type=float, default=0.05, help="Mittlerer Abstand der Sensorzeilen in s")
+    parser.add_argument('--backend', choices=['thread', 'async'], default='thread')
+    parser.add_argument('--control-period', type=float, default=0.0, help="Regeltakt in s (0 = je Sensorzeile)")
+    parser.add_argument('--rooms', type=int, default=1, help="Anzahl Sensor/Motor-Paare")
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['CONTROL_PERIOD'] = args.control_period
+    # Die pty-Arduinos beantworten kein HELLO, also gleich bei JSON bleiben
+    app.config['SERIAL_PROTOCOL'] = 'json'
+    if not args.control_period:
+        # Latenz je Sensorzeile: jeder Regelschritt sendet (Keepalive 0), auch bei gleicher Drehzahl
+        app.config['MOTOR_KEEPALIVE'] = 0
+    if args.rooms > 1:
+        app.config['ROOMS'] = {f"raum{i + 1:02}": {} for i in range(args.rooms)}
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+
+    room_ids = list(app.config.get('ROOMS') or ['default'])
+    masters = {}
+    pairs = []
+    for room_id in room_ids:
+        sensor_master, sensor_port = open_pty()
+        motor_master, motor_port = open_pty()
+        masters[room_id] = (sensor_master, motor_master)
+        pairs.append((sensor_port, motor_port))
+
+    if args.backend == 'async':
+        mgr = start_async(app, pairs)
+    else:
+        mgr = FakeArduinoManager(app, pairs)
+        mgr.start()
+    time.sleep(0.5) # Verbindungsaufbau abwarten
+
+    if args.control_period:
+        measure_control(mgr, args, masters)
+        return
+
+    latencies = measure_latency(args, masters)
+    mgr.running = False
+
+    print_latency(latencies)
+    # ru_maxrss: Linux in KiB, macOS in Bytes
+    print(f"Speicher (max RSS) {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Lasttest für /api/live mit vielen gleichzeitigen Dashboard-Clients.
+
+Jeder Client fragt über eine eigene Keep-Alive-Verbindung so schnell wie möglich
+/api/live ab. Die Clients werden auf mehrere Prozesse verteilt, damit nicht der
+Lastgenerator selbst zum Flaschenhals wird. Funktioniert gegen jeden laufenden
+Server, also auch gegen den V3-Server (Port 8000).
+
+Aufruf (Server vorher separat starten, am besten auf einem anderen Rechner messen):
+    python app.py
+    python bench_live.py --url http://raspberrypi:5001/api/live --clients 50 --seconds 10
+    python bench_live.py --url ... --etag    # wie Browser mit If-None-Match (304)
+"""
+import argparse
+import http.client
+import os
+import statistics
+import threading
+import time
+from collections import Counter
+from multiprocessing import Pool
+from urllib.parse import urlsplit
+
+
+def run_client(url, deadline, use_etag, results):
+    parts = urlsplit(url)
+    path = parts.path or '/'
+    conn = None
+    etag = None
+    statuses = Counter()
+    latencies = []
+
+    while time.monotonic() < deadline:
+        try:
+            if conn is None:
+                conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=10)
+            headers = {'If-None-Match': etag} if use_etag and etag else {}
+            start = time.perf_counter()
+            conn.request('GET', path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status] += 1
+            etag = response.getheader('ETag', etag)
+            if response.getheader('Connection', '').lower() == 'close':
+                conn.close()
+                conn = None
+        except (OSError, http.client.HTTPException):
+            statuses['error'] += 1
+            if conn is not None:
+                conn.close()
+            conn = None
+
+    if conn is not None:
+        conn.close()
+    results.append((statuses, latencies))
+
+
+def run_process(args):
+    url, clients, seconds, use_etag = args
+    deadline = time.monotonic() + seconds
+    results = []
+    threads = [threading.Thread(target=run_client, args=(url, deadline, use_etag, results))
+               for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    statuses = Counter()
+    latencies = []
+    for s, l in results:
+        statuses.update(s)
+        latencies.extend(l)
+    return statuses, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:5001/api/live')
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--processes', type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument('--etag', action='store_true', help="If-None-Match mitsenden wie ein Browser")
+    args = parser.parse_args()
+
+    processes = max(1, min(args.processes, args.clients))
+    shares = [args.clients // processes + (1 if i < args.clients % processes else 0) for i in range(processes)]
+
+    with Pool(processes) as pool:
+        per_process = pool.map(run_process, [(args.url, n, args.seconds, args.etag) for n in shares])
+
+    statuses = Counter()
+    latencies = []
+    for s, l in per_process:
+        statuses.update(s)
+        latencies.extend(l)
+
+    ok = sum(n for status, n in statuses.items() if status in (200, 304))
+    print(f"{args.clients} Clients, {args.seconds:.0f} s gegen {args.url}")
+    print(f"Anfragen/s: {ok / args.seconds:10.1f}")
+    print(f"Status:     {dict(statuses)}")
+    if latencies:
+        latencies.sort()
+        print(f"Latenz:     median {statistics.median(latencies) * 1000:.2f} ms, "
+              f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:.2f} ms, "
+              f"max {latencies[-1] * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark Zeilen-Parser: schneller Weg für Messzeilen (parse_sensor_line) gegen json.loads.
+
+Liest einen Mitschnitt des Sensor-Datenstroms (Standard: corpus/sensor_lines.txt),
+zerlegt ihn mit dem LineFramer wie im Betrieb und prüft zuerst, dass parse_line für
+jede Zeile dasselbe Ergebnis liefert wie der bisherige Weg über json.loads. Danach
+wird der Durchsatz beider Wege gemessen (bester von '--repeat' Durchläufen).
+
+Der Mitschnitt enthält Messzeilen im Format der Firmware (Serial.print(t, 1), auch
+negative Werte), Sensorfehler, die Antwort auf HELLO, eine angeschnittene erste
+Zeile und eine Zeile mit Bitfehler.
+
+Aufruf:
+    python bench_parse.py
+    python bench_parse.py --corpus mitschnitt.txt --repeat 20
+"""
+import argparse
+import json
+import os
+import time
+
+from protocol import LineFramer, parse_line, parse_sensor_line
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus', 'sensor_lines.txt')
+
+def parse_json(line):
+    """Bisheriger Weg: jede Zeile über json.loads."""
+    if not line or line[0] != 0x7B:  # '{'
+        return None
+    try:
+        data = json.loads(str(line, 'utf-8', 'ignore'))
+    except json.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
+
+def timed(fn, lines, repeat):
+    """Bester von 'repeat' Durchläufen, µs je Zeile."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for line in lines:
+            fn(line)
+        best = min(best, time.perf_counter() - start)
+    return best / len(lines) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    with open(args.corpus, 'rb') as f:
+        lines = LineFramer(max_size=1 << 30).feed(f.read())
+
+    mismatches = [bytes(line) for line in lines if parse_line(line) != parse_json(line)]
+    if mismatches:
+        raise SystemExit(f"parse_line weicht bei {len(mismatches)} Zeilen von json.loads ab, z.B. {mismatches[0]!r}")
+    fast = sum(parse_sensor_line(line) is not None for line in lines)
+    print(f"{len(lines)} Zeilen aus {args.corpus}, {fast} ({fast / len(lines):.1%}) über den schnellen Weg, "
+          f"Ergebnisse identisch mit json.loads")
+
+    print("\nParsen (µs je Zeile, Zeilen/s):")
+    for name, fn in (("json.loads", parse_json), ("parse_line", parse_line)):
+        per_line = timed(fn, lines, args.repeat)
+        print(f"  {name:11} {per_line:6.2f}  {1e6 / per_line:9.0f}/s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""
+Benchmark JSON-Zeilen gegen Binär-Rahmen (protocol.py).
+
+Vergleicht Bytes je Nachricht, die daraus folgende maximale Nachrichtenrate auf
+der Leitung (8N1 = 10 Bit je Byte) und die Dekodierzeit auf dem Pi:
+  - alt:        Zeile teilen, decode/strip, json.loads (Weg vor protocol.py)
+  - JSON:       StreamDecoder mit JSON-Zeilen
+  - binär:      StreamDecoder mit Rahmen
+Die Daten werden so gestückelt, wie sie von der seriellen Schnittstelle kommen:
+eine Nachricht je read(), mit '--burst N' N Nachrichten je read() (Rückstau nach
+einer Pause, z.B. während eines SQLite-Commits).
+
+'--pty' misst zusätzlich das Abholen eines Rückstaus über ein echtes pty (nur
+Linux/macOS): readline() je Zeile gegen ein read() aller wartenden Bytes in den
+StreamDecoder. pyserial liest bei readline() Byte für Byte, jeweils mit eigenem
+select() und read().
+
+Aufruf:
+    python bench_protocol.py --samples 100000
+    python bench_protocol.py --burst 50
+    python bench_protocol.py --pty
+"""
+import argparse
+import json
+import os
+import pty
+import random
+import threading
+import time
+
+import serial
+
+from protocol import MSG_READING, READING, StreamDecoder, encode_fan_speed, encode_frame
+
+BAUDRATES = (9600, 115200)
+
+def sensor_json(temp, hum):
+    # Wie Serial.print(t, 1) / Serial.println in arduino_sensor/main.ino
+    return f'{{"temp": {temp:.1f}, "hum": {hum:.1f}}}\r\n'.encode('utf-8')
+
+def sensor_frame(temp, hum):
+    return encode_frame(MSG_READING, READING.pack(round(temp * 10), round(hum * 10)))
+
+def decode_old(chunks):
+    buf = bytearray()
+    count = 0
+    for chunk in chunks:
+        buf += chunk
+        while b'\n' in buf:
+            raw, _, rest = buf.partition(b'\n')
+            buf = bytearray(rest)
+            line = raw.decode('utf-8', errors='ignore').strip()
+            if line.startswith('{') and line.endswith('}'):
+                json.loads(line)
+                count += 1
+    return count
+
+def decode_stream(chunks):
+    decoder = StreamDecoder()
+    count = 0
+    for chunk in chunks:
+        count += len(decoder.feed(chunk))
+    return count
+
+def bursts(chunks, size):
+    return [b''.join(chunks[i:i + size]) for i in range(0, len(chunks), size)]
+
+def timed(fn, chunks, burst, repeat=3):
+    """Bester von 'repeat' Durchläufen, µs je Nachricht."""
+    reads = bursts(chunks, burst)
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = fn(reads)
+        best = min(best, time.perf_counter() - start)
+        assert count == len(chunks), (count, len(chunks))
+    return best / len(chunks) * 1e6
+
+def drain_readline(ser, count):
+    done = 0
+    while done < count:
+        if ser.in_waiting:
+            line = ser.readline().decode('utf-8', errors='ignore').strip()
+            if line.startswith('{') and line.endswith('}'):
+                json.loads(line)
+                done += 1
+
+def drain_framer(ser, count):
+    decoder = StreamDecoder()
+    done = 0
+    while done < count:
+        done += len(decoder.feed(ser.read(ser.in_waiting or 1)))
+
+def timed_pty(fn, chunks):
+    """Rückstau über ein pty abholen, (µs Wand, µs CPU) je Nachricht."""
+    master, slave = pty.openpty()
+    ser = serial.Serial(os.ttyname(slave), 115200, timeout=1)
+    # Der pty-Puffer ist klein, der Schreiber läuft daher nebenher
+    writer = threading.Thread(target=os.write, args=(master, b''.join(chunks)))
+    start, cpu = time.perf_counter(), time.process_time()
+    writer.start()
+    fn(ser, len(chunks))
+    wall, cpu = time.perf_counter() - start, time.process_time() - cpu
+    writer.join()
+    ser.close()
+    os.close(master)
+    os.close(slave)
+    return wall / len(chunks) * 1e6, cpu / len(chunks) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--samples', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--burst', type=int, default=1, help="Nachrichten je read()")
+    parser.add_argument('--pty', action='store_true', help="Rückstau zusätzlich über ein pty abholen")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    readings = [(round(rng.uniform(-10, 40), 1), round(rng.uniform(0, 100), 1)) for _ in range(args.samples)]
+    json_chunks = [sensor_json(t, h) for t, h in readings]
+    frame_chunks = [sensor_frame(t, h) for t, h in readings]
+    speeds = [rng.randrange(256) for _ in range(args.samples)]
+
+    def size(chunks):
+        return sum(map(len, chunks)) / len(chunks)
+
+    print(f"{args.samples} Nachrichten, Bytes je Nachricht und max. Nachrichten/s bei {', '.join(map(str, BAUDRATES))} Baud:")
+    for name, chunks in (
+        ("Sensor JSON", json_chunks),
+        ("Sensor binär", frame_chunks),
+        ("Motor JSON", [encode_fan_speed(s) for s in speeds]),
+        ("Motor binär", [encode_fan_speed(s, True) for s in speeds])
+    ):
+        per_message = size(chunks)
+        rates = '  '.join(f"{baud / 10 / per_message:7.0f}/s" for baud in BAUDRATES)
+        print(f"  {name:13} {per_message:5.1f} B  {rates}")
+
+    print(f"\nDekodieren (µs je Nachricht, {args.burst} je read()):")
+    print(f"  alt (json.loads) {timed(decode_old, json_chunks, args.burst):6.2f}")
+    print(f"  JSON             {timed(decode_stream, json_chunks, args.burst):6.2f}")
+    print(f"  binär            {timed(decode_stream, frame_chunks, args.burst):6.2f}")
+
+    if args.pty:
+        # readline() braucht ca. 0,2 ms je Zeile, 2000 Zeilen genügen
+        backlog = json_chunks[:2000]
+        print(f"\nRückstau von {len(backlog)} JSON-Zeilen über ein pty (µs je Nachricht, Wand / CPU):")
+        for name, fn in (("readline()", drain_readline), ("read() + Decoder", drain_framer)):
+            wall, cpu = timed_pty(fn, backlog)
+            print(f"  {name:16} {wall:7.1f} / {cpu:7.1f}")
+
+    start = time.perf_counter()
+    for s in speeds:
+        encode_fan_speed(s)
+    json_encode = (time.perf_counter() - start) / len(speeds) * 1e6
+    start = time.perf_counter()
+    for s in speeds:
+        encode_fan_speed(s, True)
+    frame_encode = (time.perf_counter() - start) / len(speeds) * 1e6
+    print(f"\nMotorbefehl kodieren (µs): JSON {json_encode:.2f}, binär {frame_encode:.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+import os
+import tempfile
+
+SQLALCHEMY_DATABASE_URI = 'sqlite:///climate_data.db'
+SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+# Aufbewahrung in Tagen: Rohdaten und Rollups je Auflösung in Sekunden (None = unbegrenzt)
+RAW_RETENTION_DAYS = 7
+ROLLUP_RETENTION_DAYS = {60: 30, 3600: 365, 86400: None}
+
+# Regeltakt in Sekunden: der PID läuft in diesem festen Abstand auf dem neuesten Messwert,
+# unabhängig davon, wann Sensorzeilen ankommen (0 = wie früher mit jeder Sensorzeile)
+CONTROL_PERIOD = 1.0
+
+# Motorbefehle nur bei einer Änderung um mehr als MOTOR_DEADBAND (PWM-Stufen 0-255; Aus und
+# Vollgas immer) und spätestens alle MOTOR_KEEPALIVE Sekunden. Der Watchdog des Motor-Arduinos
+# stoppt nach 5 s ohne Befehl: MOTOR_KEEPALIVE + Regeltakt (ohne Takt: Sensorintervall 2 s) < 5 s
+MOTOR_DEADBAND = 2
+MOTOR_KEEPALIVE = 2.5
+
+# Längste Wartezeit eines Schreibzugriffs auf einen Port in Sekunden; ein hängender
+# Arduino hält die Serial-Schleife (und damit alle Räume) höchstens so lange auf
+SERIAL_WRITE_TIMEOUT = 0.01
+
+# Serial-Protokoll zu den Arduinos: 'auto' handelt je Verbindung das kompakte Binärprotokoll
+# aus (protocol.py; ältere Firmware bleibt bei JSON), 'json' sendet nie HELLO
+SERIAL_PROTOCOL = os.environ.get('SERIAL_PROTOCOL', 'auto')
+
+# Räume mit je einem Sensor- und Motor-Arduino, in dieser Reihenfolge (der erste ist der Standardraum
+# der API). Geräte per USB-Seriennummer ('SN:...'), VID:PID (nur eindeutig bei einem Gerät dieses
+# Typs) oder Gerätename; die Seriennummer zeigt 'python -m serial.tools.list_ports -v'.
+# Leer: ein Raum 'default', Sensor und Motor werden per Port-Scan gefunden.
+ROOMS = {}
+# ROOMS = {
+#     'wohnzimmer': {'sensor': 'SN:75833353035351E0E1A1', 'motor': 'SN:7583335303535140D0F2'},
+#     'keller':     {'sensor': '/dev/ttyACM2',            'motor': '/dev/ttyACM3'},
+# }
+
+# 'embedded': Serial-Schleife, Regelung und Rollups laufen im Webprozess (python app.py / serve.py)
+# 'external': acquisition.py läuft als eigener Prozess, die Webprozesse lesen den Status
+#             aus dem Shared Memory (beliebig viele Worker, z.B. gunicorn -w 4)
+ACQUISITION = os.environ.get('ACQUISITION', 'embedded')
+
+# Verzeichnis der Shared-Memory-Slots; /dev/shm liegt unter Linux im RAM
+SHARED_STATE_DIR = os.environ.get(
+    'SHARED_STATE_DIR',
+    '/dev/shm/raumautomation' if os.path.isdir('/dev/shm') else os.path.join(tempfile.gettempdir(), 'raumautomation')
+)
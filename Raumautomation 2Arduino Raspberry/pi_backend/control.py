@@ -0,0 +1,99 @@
+import statistics
+import time
+from collections import deque
+from simple_pid import PID
+
+class ClimateController:
+    """
+    Ein Regelschritt: Lüfterdrehzahl (0-255) aus Temperatur, Feuchte, Sollwerten und Modus.
+    Ohne Serial und Threads, damit Hardware-Schleife, asyncio-Backend und
+    Simulation (simulate.py) denselben Code verwenden.
+
+    'time_fn' ist die Uhr der PID-Regler (Standard: time.monotonic); die Simulation
+    übergibt eine virtuelle Uhr, damit I- und D-Anteil mit simulierter Zeit rechnen.
+    """
+    def __init__(self, target_temperature=22.0, target_humidity=50.0, time_fn=None):
+        # 1. Temperatur PID (Kühlen: Negative Regelparameter)
+        self.pid_temp = PID(-10, -0.1, -0.05, setpoint=target_temperature, time_fn=time_fn)
+        self.pid_temp.output_limits = (0, 255)
+
+        # 2. Feuchtigkeits PID (Entfeuchten: Feuchte > Ziel -> Lüfter AN)
+        # Ähnlich wie Kühlen: Eingang > Sollwert -> Fehler negativ -> Ausgang positiv?
+        # Standard: Fehler = Soll - Ist.
+        # Wenn Ist(60) > Soll(50) -> Fehler(-10). Wir wollen Lüfter AN.
+        # Also brauchen wir wieder ein negatives Kp.
+        self.pid_hum = PID(-5, -0.05, -0.01, setpoint=target_humidity, time_fn=time_fn)
+        self.pid_hum.output_limits = (0, 255)
+
+    def step(self, state, temp, hum):
+        """Ein PID-Schritt mit den Sollwerten und dem Modus aus dem Schnappschuss."""
+        # PID Sollwerte aktualisieren (falls geändert)
+        self.pid_temp.setpoint = state.target_temperature
+        self.pid_hum.setpoint = state.target_humidity
+
+        # Anforderungen berechnen
+        speed_temp = int(self.pid_temp(temp))
+        speed_hum = int(self.pid_hum(hum))
+
+        if state.control_mode == "TEMP":
+            return speed_temp
+        elif state.control_mode == "HUM":
+            return speed_hum
+        elif state.control_mode == "AUTO":
+            return max(speed_temp, speed_hum)
+        return 0
+
+class ControlScheduler:
+    """
+    Fester Regeltakt auf der monotonen Uhr, unabhängig davon, wann Sensorzeilen ankommen.
+
+    Die Termine liegen auf einem festen Raster (Start + k * period); ein verspäteter
+    Takt verschiebt die folgenden also nicht. Liegt ein Takt mehr als eine Periode
+    zurück, werden die verpassten übersprungen statt nachgeholt. Die Verspätung je
+    Takt (Jitter) wird für /api/status gesammelt.
+    """
+    def __init__(self, period, clock=time, window=1000):
+        self.period = period
+        self.clock = clock
+        self.next_deadline = clock.monotonic() + period
+
+        # Statistik: Mittel und p99 über die letzten 'window' Takte, Maximum seit dem Start
+        self.jitter = deque(maxlen=window)
+        self.cycles = 0
+        self.skipped = 0
+        self.max_jitter = 0.0
+
+    def restart(self):
+        """Neues Raster ab jetzt, z.B. nach dem Verbinden; die Zeit ohne Verbindung zählt nicht als Jitter."""
+        self.next_deadline = self.clock.monotonic() + self.period
+
+    def timeout(self):
+        """Sekunden bis zum nächsten Takt (0 = fällig)."""
+        return max(0.0, self.next_deadline - self.clock.monotonic())
+
+    def due(self):
+        """Prüft, ob ein Takt fällig ist, und verbucht ihn in diesem Fall."""
+        now = self.clock.monotonic()
+        if now < self.next_deadline:
+            return False
+        late = now - self.next_deadline
+        self.jitter.append(late)
+        self.max_jitter = max(self.max_jitter, late)
+        self.cycles += 1
+        missed = int(late // self.period)
+        self.skipped += missed
+        self.next_deadline += (missed + 1) * self.period
+        return True
+
+    def stats(self):
+        recent = sorted(self.jitter)
+        def ms(seconds):
+            return round(seconds * 1000, 3)
+        return {
+            'period_ms': ms(self.period),
+            'cycles': self.cycles,
+            'skipped': self.skipped,
+            'jitter_mean_ms': ms(statistics.fmean(recent)) if recent else None,
+            'jitter_p99_ms': ms(recent[min(len(recent) - 1, int(len(recent) * 0.99))]) if recent else None,
+            'jitter_max_ms': ms(self.max_jitter)
+        }
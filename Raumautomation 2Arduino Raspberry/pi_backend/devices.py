@@ -0,0 +1,204 @@
+"""
+Geräte-Registry: ordnet die USB-Serial-Ports den Räumen zu (je ein Sensor und ein Motor).
+
+Mit ROOMS in config.py steht die Zuordnung in der Konfiguration (USB-Seriennummer,
+VID:PID oder Gerätename). Ein Scan listet dann nur die Ports auf und öffnet keinen,
+denn jedes Öffnen setzt den Arduino zurück; das bleibt auch bei 16 Räumen schnell.
+Ohne ROOMS gibt es einen Raum, dessen Sensor und Motor wie bisher über den
+Port-Cache oder einen parallelen Probe-Scan gefunden werden.
+"""
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import serial
+import serial.tools.list_ports
+
+from models import DEFAULT_ROOM
+
+# Maximale Wartezeit auf die erste Ausgabe eines Arduinos beim Port-Scan
+PROBE_TIMEOUT = 3
+
+ROLES = ('sensor', 'motor')
+
+def serial_ports():
+    return [p for p in serial.tools.list_ports.comports()
+            if "ACM" in p.device or "USB" in p.device or "COM" in p.device]
+
+def port_identity(port):
+    """Stabile Kennung eines USB-Serial-Geräts, unabhängig vom Gerätenamen."""
+    if port.serial_number:
+        return f"SN:{port.serial_number}"
+    if port.vid is not None:
+        return f"{port.vid:04x}:{port.pid:04x}"
+    return None
+
+def port_keys(port):
+    """Alle Angaben, unter denen ein Port in ROOMS stehen darf."""
+    keys = {port.device}
+    if port.serial_number:
+        keys.add(f"SN:{port.serial_number}")
+    if port.vid is not None:
+        keys.add(f"{port.vid:04x}:{port.pid:04x}")
+    return keys
+
+class DeviceRegistry:
+    def __init__(self, cache_path, rooms=None):
+        """
+        'rooms': Raum-ID -> {'sensor': ..., 'motor': ...} aus ROOMS; leer = ein Raum per Port-Scan.
+        'cache_path': zuletzt erkannte Zuordnung Sensor/Motor -> USB-Gerät für den Port-Scan.
+        """
+        self.cache_path = cache_path
+        self.rooms = rooms or {}
+
+        # Ergebnis des letzten Scans für /api/status: Gerät -> Kennung, Rolle, Raum
+        self.devices = {}
+        self.scans = 0
+        self.last_scan_ms = None
+        self.warnings = set()
+
+    def scan(self):
+        """
+        Sucht die Ports aller Räume -> {Raum-ID: (sensor_port, motor_port)}, None = nicht gefunden.
+        Blockiert (der Probe-Scan dauert einige Sekunden), läuft also nie in der Regelschleife.
+        """
+        start = time.perf_counter()
+        ports = serial_ports()
+        self.devices = {p.device: {'identity': port_identity(p), 'role': None, 'room': None} for p in ports}
+        if self.rooms:
+            assignment = self._match_rooms(ports)
+        else:
+            assignment = {DEFAULT_ROOM: self._find_ports(ports)}
+        for room_id, found in assignment.items():
+            for role, device in zip(ROLES, found):
+                if device in self.devices:
+                    self.devices[device].update(role=role, room=room_id)
+        self.scans += 1
+        self.last_scan_ms = round((time.perf_counter() - start) * 1000, 2)
+        return assignment
+
+    def stats(self):
+        return {
+            'mode': 'rooms' if self.rooms else 'scan',
+            'scans': self.scans,
+            'last_scan_ms': self.last_scan_ms,
+            'devices': [{'device': device, **info} for device, info in sorted(self.devices.items())]
+        }
+
+    def _warn(self, message):
+        # Der Scan wiederholt sich alle paar Sekunden, jede Warnung nur einmal ausgeben
+        if message not in self.warnings:
+            self.warnings.add(message)
+            print(message)
+
+    def _match_rooms(self, ports):
+        """Zuordnung laut ROOMS, ohne einen Port zu öffnen."""
+        assignment = {}
+        taken = {}
+        for room_id, spec in self.rooms.items():
+            found = []
+            for role in ROLES:
+                device = self._match_spec(room_id, role, spec.get(role), ports)
+                if device in taken:
+                    self._warn(f"Room {room_id}: {device} is already used by room {taken[device]}")
+                    device = None
+                if device is not None:
+                    taken[device] = room_id
+                found.append(device)
+            assignment[room_id] = tuple(found)
+        return assignment
+
+    def _match_spec(self, room_id, role, spec, ports):
+        if not spec:
+            return None
+        matches = [p.device for p in ports if spec in port_keys(p)]
+        if len(matches) > 1:
+            # z.B. zwei Arduinos ohne Seriennummer mit derselben VID:PID
+            self._warn(f"Room {room_id}: {role} '{spec}' matches {', '.join(matches)}, "
+                       f"use the serial number or device name")
+            return None
+        return matches[0] if matches else None
+
+    def _find_ports(self, ports):
+        """Sucht Sensor- und Motor-Arduino, zuerst über den Cache, sonst per parallelem Scan."""
+        # 1. Zuletzt bekannte Zuordnung (per USB-Seriennummer bzw. VID:PID) ohne Probe übernehmen
+        found_sensor = self._match_cached_port('sensor', ports)
+        found_motor = self._match_cached_port('motor', ports)
+        if found_sensor and found_motor:
+            print(f"Using cached ports: Sensor {found_sensor}, Motor {found_motor}")
+            return found_sensor, found_motor
+
+        # 2. Alle übrigen Kandidaten gleichzeitig prüfen (jeder Port braucht ~2 s Reset)
+        candidates = [p for p in ports if p.device not in (found_sensor, found_motor)]
+        print(f"Scanning {len(candidates)} ports...")
+        if candidates:
+            with ThreadPoolExecutor(max_workers=len(candidates)) as pool:
+                roles = list(pool.map(self._probe_port, [p.device for p in candidates]))
+
+            for p, role in zip(candidates, roles):
+                if role == 'sensor' and not found_sensor:
+                    found_sensor = p.device
+                    self._remember_port('sensor', p)
+                    print(f"Found Sensor on {p.device}")
+                elif role == 'motor' and not found_motor:
+                    found_motor = p.device
+                    self._remember_port('motor', p)
+                    print(f"Found Motor (candidate) on {p.device}")
+                elif role:
+                    # Ohne ROOMS wird nur ein Paar betrieben; weitere Räume brauchen eine Zuordnung
+                    self.devices[p.device]['role'] = role
+                    self._warn(f"Additional {role} on {p.device} ignored, configure ROOMS to use it")
+
+        return found_sensor, found_motor
+
+    def _probe_port(self, device):
+        """Öffnet einen Port und erkennt anhand der ersten Ausgaben die Rolle des Arduinos."""
+        try:
+            with serial.Serial(device, 115200, timeout=PROBE_TIMEOUT) as s:
+                time.sleep(2) # Arduino Reset nach dem Öffnen abwarten
+
+                deadline = time.time() + PROBE_TIMEOUT
+                while time.time() < deadline:
+                    s.timeout = max(0.1, deadline - time.time())
+                    line = s.readline().decode('utf-8', errors='ignore')
+                    if "temp" in line and "hum" in line:
+                        return 'sensor'
+                    if "Motor" in line or "Ready" in line:
+                        return 'motor'
+        except Exception as e:
+            print(f"Error scanning {device}: {e}")
+        return None
+
+    def _load_port_cache(self):
+        try:
+            with open(self.cache_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _match_cached_port(self, role, ports):
+        entry = self._load_port_cache().get(role)
+        if not entry:
+            return None
+        matches = [p.device for p in ports if port_identity(p) == entry['identity']]
+        if entry['device'] in matches:
+            return entry['device']
+        # Gleiches Gerät an anderem Port nur übernehmen, wenn die Kennung eindeutig ist
+        # (zwei Arduinos ohne Seriennummer haben dieselbe VID:PID)
+        if len(matches) == 1:
+            return matches[0]
+        return None
+
+    def _remember_port(self, role, port):
+        identity = port_identity(port)
+        if identity is None:
+            return
+        cache = self._load_port_cache()
+        cache[role] = {'device': port.device, 'identity': identity}
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            with open(self.cache_path, 'w') as f:
+                json.dump(cache, f)
+        except OSError as e:
+            print(f"Could not write port cache: {e}")
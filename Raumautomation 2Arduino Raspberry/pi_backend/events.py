@@ -0,0 +1,101 @@
+import asyncio
+import json
+import queue
+import threading
+
+class EventBroker:
+    """
+    Verteilt Ereignisse als Server-Sent Events an alle offenen /api/stream Verbindungen.
+    Jedes Ereignis wird nur einmal kodiert, egal wie viele Clients verbunden sind.
+    """
+    def __init__(self, max_queue=100):
+        self.max_queue = max_queue
+        self.subscribers = set()
+        self.listeners = []
+        self.lock = threading.Lock()
+
+    def add_listener(self, callback):
+        """Ruft callback(event, data) bei jedem Ereignis auf (z.B. Weitergabe ins Shared Memory)."""
+        self.listeners.append(callback)
+
+    def subscribe(self):
+        q = queue.Queue(maxsize=self.max_queue)
+        with self.lock:
+            self.subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self.lock:
+            self.subscribers.discard(q)
+
+    def publish(self, event, data):
+        for callback in self.listeners:
+            callback(event, data)
+        message = format_event(event, data)
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait(message)
+            except queue.Full:
+                # Langsamer Client: Ereignis verwerfen statt den Serial-Thread zu blockieren
+                pass
+
+    def stream(self, initial=None, keepalive=15):
+        """SSE-Generator für eine Verbindung: erst 'initial', danach jedes neue Ereignis."""
+        q = self.subscribe()
+        try:
+            if initial:
+                yield initial
+            while True:
+                try:
+                    yield q.get(timeout=keepalive)
+                except queue.Empty:
+                    # Kommentarzeile hält Proxies und Browser-Verbindung offen
+                    yield b": keepalive\n\n"
+        finally:
+            self.unsubscribe(q)
+
+class AsyncEventBroker:
+    """
+    Gegenstück zu EventBroker für das asyncio-Backend (async_app.py).
+    publish() wird nur aus der Event-Loop aufgerufen, daher ohne Lock.
+    """
+    def __init__(self, max_queue=100):
+        self.max_queue = max_queue
+        self.subscribers = set()
+        self.listeners = []
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def publish(self, event, data):
+        for callback in self.listeners:
+            callback(event, data)
+        message = format_event(event, data)
+        for q in self.subscribers:
+            try:
+                q.put_nowait(message)
+            except asyncio.QueueFull:
+                # Langsamer Client: Ereignis verwerfen statt die Schleife aufzuhalten
+                pass
+
+    async def stream(self, initial=None, keepalive=15):
+        """Asynchroner SSE-Generator für eine Verbindung, wie EventBroker.stream()."""
+        q = asyncio.Queue(maxsize=self.max_queue)
+        self.subscribers.add(q)
+        try:
+            if initial:
+                yield initial
+            while True:
+                try:
+                    yield await asyncio.wait_for(q.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+        finally:
+            self.subscribers.discard(q)
+
+def format_event(event, data):
+    """Kodiert ein Ereignis; 'data' darf bereits fertiges JSON (bytes) sein."""
+    payload = data if isinstance(data, bytes) else json.dumps(data).encode('utf-8')
+    return b"event: " + event.encode('utf-8') + b"\ndata: " + payload + b"\n\n"
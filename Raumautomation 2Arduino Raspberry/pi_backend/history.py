@@ -0,0 +1,191 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import Integer, and_, cast, func, or_
+from models import db, ClimateReading, ClimateRollup
+from rollup import ROLLUP_RESOLUTIONS, high_water_mark_clause
+
+# Einheiten für den 'resolution'-Parameter, z.B. '90s', '5m', '1h', '1d'
+RESOLUTION_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+class HistoryQueryError(ValueError):
+    """Ungültige Parameter für eine Verlaufsabfrage."""
+
+def parse_timestamp(value):
+    """Wandelt einen ISO-8601 Zeitstempel in naive UTC-Zeit um (wie in der DB gespeichert)."""
+    if value is None:
+        return None
+    try:
+        ts = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise HistoryQueryError(f"Ungültiger Zeitstempel: {value}")
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+def parse_resolution(value):
+    """Wandelt '300', '5m', '1h' usw. in eine Bucket-Breite in Sekunden um."""
+    if value is None:
+        return None
+    value = value.strip().lower()
+    factor = RESOLUTION_UNITS.get(value[-1:], None)
+    number = value[:-1] if factor else value
+    try:
+        seconds = int(number) * (factor or 1)
+    except ValueError:
+        raise HistoryQueryError(f"Ungültige Auflösung: {value}")
+    if seconds <= 0:
+        raise HistoryQueryError(f"Ungültige Auflösung: {value}")
+    return seconds
+
+def encode_cursor(reading):
+    return f"{reading.timestamp.isoformat()},{reading.id}"
+
+def decode_cursor(cursor):
+    try:
+        ts, row_id = cursor.rsplit(',', 1)
+        return datetime.fromisoformat(ts), int(row_id)
+    except ValueError:
+        raise HistoryQueryError(f"Ungültiger Cursor: {cursor}")
+
+def newest_reading_id():
+    """Höchste ClimateReading.id (Primärschlüssel, daher ohne Tabellenscan)."""
+    return db.session.query(func.max(ClimateReading.id)).scalar() or 0
+
+def query_history(limit=100, start=None, end=None, cursor=None, room_id=None):
+    """
+    Liefert Messwerte chronologisch sortiert und den Cursor für die nächste Seite.
+
+    Ohne 'start' werden die neuesten Einträge geliefert und der Cursor blättert
+    in die Vergangenheit, mit 'start' wird ab diesem Zeitpunkt vorwärts geblättert.
+    Alle Abfragen laufen über den Index auf (timestamp, id), mit 'room_id' über
+    (room_id, timestamp, id); ohne 'room_id' kommen die Messwerte aller Räume.
+    """
+    query = ClimateReading.query
+    if room_id is not None:
+        query = query.filter(ClimateReading.room_id == room_id)
+    if start is not None:
+        query = query.filter(ClimateReading.timestamp >= start)
+    if end is not None:
+        query = query.filter(ClimateReading.timestamp <= end)
+
+    forward = start is not None
+    if cursor is not None:
+        ts, row_id = decode_cursor(cursor)
+        if forward:
+            query = query.filter(or_(ClimateReading.timestamp > ts,
+                                     and_(ClimateReading.timestamp == ts, ClimateReading.id > row_id)))
+        else:
+            query = query.filter(or_(ClimateReading.timestamp < ts,
+                                     and_(ClimateReading.timestamp == ts, ClimateReading.id < row_id)))
+
+    if forward:
+        query = query.order_by(ClimateReading.timestamp.asc(), ClimateReading.id.asc())
+    else:
+        query = query.order_by(ClimateReading.timestamp.desc(), ClimateReading.id.desc())
+
+    readings = query.limit(limit).all()
+    next_cursor = encode_cursor(readings[-1]) if len(readings) == limit else None
+
+    if not forward:
+        # Umkehren für chronologische Reihenfolge in Diagrammen
+        readings.reverse()
+    return readings, next_cursor
+
+def query_buckets(resolution, limit=500, start=None, end=None, room_id=None):
+    """
+    Fasst Messwerte in Zeit-Buckets von 'resolution' Sekunden zusammen (min/max/Mittel).
+    Ohne Zeitbereich werden die letzten 'limit' Buckets bis jetzt geliefert.
+    Die Aggregation läuft komplett in SQLite, übertragen wird nur ein Punkt pro Bucket.
+
+    Ist 'resolution' ein Vielfaches einer Rollup-Stufe, wird aus der kleinen Rollup-Tabelle
+    gelesen und nur der noch nicht aggregierte Rest aus den Rohdaten ergänzt. Mit 'room_id'
+    nur die Messwerte dieses Raums, sonst werden die Räume je Bucket zusammengefasst.
+
+    Rollups, High-Water-Mark und Rest laufen in einer einzigen Abfrage: pysqlite öffnet für
+    SELECTs keine Transaktion, nur so sehen alle Teile denselben Stand, auch wenn der
+    RollupWorker gerade committet (sonst fehlen Zeilen oder werden doppelt gezählt).
+    """
+    if end is None:
+        end = datetime.utcnow()
+    # Ohne 'start' sind die neuesten Buckets bis 'end' gefragt
+    newest = start is None
+    if start is None:
+        start = end - timedelta(seconds=resolution * limit)
+    # Auf Bucket-Grenzen ausrichten, damit der erste Bucket vollständig ist
+    start_epoch = int(start.replace(tzinfo=timezone.utc).timestamp())
+    start_epoch -= start_epoch % resolution
+    start = datetime.fromtimestamp(start_epoch, timezone.utc).replace(tzinfo=None)
+    end_epoch = int(end.replace(tzinfo=timezone.utc).timestamp())
+
+    level = next((r for r in sorted(ROLLUP_RESOLUTIONS, reverse=True) if resolution % r == 0), None)
+    buckets = {}
+
+    C = ClimateReading
+    bucket = (cast(func.strftime('%s', C.timestamp), Integer) // resolution).label('bucket')
+    raw_query = (C.query
+                 .with_entities(
+                     bucket, func.count(C.id),
+                     func.sum(C.temperature), func.min(C.temperature), func.max(C.temperature),
+                     func.sum(C.humidity), func.min(C.humidity), func.max(C.humidity),
+                     func.sum(C.fan_speed), func.min(C.fan_speed), func.max(C.fan_speed))
+                 .filter(C.timestamp >= start, C.timestamp <= end)
+                 .group_by(bucket))
+    if room_id is not None:
+        raw_query = raw_query.filter(C.room_id == room_id)
+
+    if level is None:
+        _merge_partials(buckets, raw_query.all())
+    else:
+        R = ClimateRollup
+        bucket = (R.bucket_start // resolution).label('bucket')
+        rollup_query = (R.query
+                        .with_entities(
+                            bucket, func.sum(R.count),
+                            func.sum(R.temperature_sum), func.min(R.temperature_min), func.max(R.temperature_max),
+                            func.sum(R.humidity_sum), func.min(R.humidity_min), func.max(R.humidity_max),
+                            func.sum(R.fan_speed_sum), func.min(R.fan_speed_min), func.max(R.fan_speed_max))
+                        .filter(R.resolution == level,
+                                R.bucket_start >= start_epoch,
+                                R.bucket_start <= end_epoch)
+                        .group_by(bucket))
+        if room_id is not None:
+            rollup_query = rollup_query.filter(R.room_id == room_id)
+        # Teil-Aggregate je Bucket aus beiden Tabellen; _merge_partials fasst sie zusammen
+        raw_query = raw_query.filter(C.id > high_water_mark_clause(level))
+        _merge_partials(buckets, rollup_query.union_all(raw_query).all())
+
+    # Das Abrunden von 'start' kann einen Bucket zu viel liefern; er fällt am nicht gefragten Ende weg
+    keys = sorted(buckets)
+    keys = keys[-limit:] if newest else keys[:limit]
+    return [bucket_to_dict(b * resolution, *buckets[b]) for b in keys]
+
+def _merge_partials(buckets, rows):
+    """Führt Teil-Aggregate (count, je Messgröße sum/min/max) pro Bucket zusammen."""
+    for b, *values in rows:
+        current = buckets.get(b)
+        if current is None:
+            buckets[b] = list(values)
+            continue
+        current[0] += values[0]
+        for i in (1, 4, 7):
+            current[i] = _combine(current[i], values[i], lambda a, c: a + c)
+            current[i + 1] = _combine(current[i + 1], values[i + 1], min)
+            current[i + 2] = _combine(current[i + 2], values[i + 2], max)
+
+def _combine(a, b, fn):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return fn(a, b)
+
+def bucket_to_dict(epoch, count, t_sum, t_min, t_max, h_sum, h_min, h_max, f_sum, f_min, f_max):
+    return {
+        'timestamp': datetime.fromtimestamp(epoch, timezone.utc).replace(tzinfo=None).isoformat(),
+        'count': count,
+        'temperature': _mean(t_sum, count), 'temperature_min': t_min, 'temperature_max': t_max,
+        'humidity': _mean(h_sum, count), 'humidity_min': h_min, 'humidity_max': h_max,
+        'fan_speed': _mean(f_sum, count), 'fan_speed_min': f_min, 'fan_speed_max': f_max
+    }
+
+def _mean(total, count):
+    return round(total / count, 2) if total is not None and count else None
@@ -0,0 +1,103 @@
+import queue
+import threading
+import time
+from datetime import datetime
+from models import db, ClimateReading, DEFAULT_ROOM
+from flask import Flask
+
+class HistoryWriter:
+    """
+    Schreibt ClimateReading-Einträge gebündelt in einem eigenen Thread,
+    damit ein langsamer SD-Karten-Commit nie die Regelschleife blockiert.
+    Ein Writer für alle Räume: mehr Räume ergeben größere, nicht mehr Commits.
+    """
+    def __init__(self, app: Flask, max_queue=1000, batch_size=50, flush_interval=5.0):
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.stop_event = threading.Event()
+
+        # Statistik
+        self.dropped = 0
+        self.rows_written = 0
+        self.flush_count = 0
+        self.last_flush_ms = None
+        self.max_flush_ms = None
+
+        self.thread = threading.Thread(target=self._worker, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self, timeout=5.0):
+        """Beendet den Writer und schreibt alle noch wartenden Einträge."""
+        self.stop_event.set()
+        if self.thread.is_alive():
+            self.thread.join(timeout=timeout)
+
+    def submit(self, temperature, humidity, fan_speed, timestamp=None, room_id=DEFAULT_ROOM):
+        """Reiht einen Messwert ein, ohne auf die Datenbank zu warten."""
+        try:
+            self.queue.put_nowait({
+                'room_id': room_id,
+                'timestamp': timestamp or datetime.utcnow(),
+                'temperature': temperature,
+                'humidity': humidity,
+                'fan_speed': fan_speed
+            })
+        except queue.Full:
+            # Lieber einen Verlaufspunkt verlieren als die Regelung aufhalten
+            self.dropped += 1
+
+    def stats(self):
+        return {
+            'queue_depth': self.queue.qsize(),
+            'dropped': self.dropped,
+            'rows_written': self.rows_written,
+            'flush_count': self.flush_count,
+            'last_flush_ms': self.last_flush_ms,
+            'max_flush_ms': self.max_flush_ms
+        }
+
+    def _worker(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+
+        while not self.stop_event.is_set():
+            try:
+                batch.append(self.queue.get(timeout=max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                pass
+
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._flush(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+        # Restliche Einträge beim Herunterfahren sichern
+        while True:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        self._flush(batch)
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        start = time.perf_counter()
+        with self.app.app_context():
+            try:
+                db.session.add_all([ClimateReading(**row) for row in batch])
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"History Writer Error: {e}")
+                return
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.last_flush_ms = round(elapsed_ms, 2)
+        self.max_flush_ms = round(max(self.max_flush_ms or 0, elapsed_ms), 2)
+        self.flush_count += 1
+        self.rows_written += len(batch)
@@ -0,0 +1,70 @@
+import json
+import threading
+from dataclasses import dataclass, field, replace
+
+@dataclass(frozen=True)
+class LiveState:
+    """
+    Unveränderlicher Schnappschuss des Live-Status.
+    Ein Schnappschuss wird nie verändert, sondern bei jeder Änderung komplett ersetzt.
+
+    JSON und ETag werden beim Erzeugen einmal berechnet (im schreibenden Thread),
+    /api/live liefert danach nur noch die fertigen Bytes aus.
+    """
+    seq: int = 0
+    room_id: str = None
+    temperature: float = None
+    humidity: float = None
+    fan_speed: int = 0
+    target_temperature: float = 22.0
+    target_humidity: float = 50.0
+    control_mode: str = "TEMP" # TEMP, HUM, AUTO
+    active_sensor_port: str = None
+    active_motor_port: str = None
+
+    body: bytes = field(init=False, repr=False, compare=False)
+    etag: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, 'body', json.dumps(self.to_dict(), separators=(',', ':')).encode('utf-8'))
+        object.__setattr__(self, 'etag', f"live-{self.room_id}-{self.seq}")
+
+    def to_dict(self):
+        """Format von /api/live und /api/stream (ohne Sequenznummer)."""
+        return {
+            'room': self.room_id,
+            'temperature': self.temperature,
+            'humidity': self.humidity,
+            'fan_speed': self.fan_speed,
+            'target_temperature': self.target_temperature,
+            'target_humidity': self.target_humidity,
+            'control_mode': self.control_mode,
+            'active_sensor_port': self.active_sensor_port,
+            'active_motor_port': self.active_motor_port
+        }
+
+class StatePublisher:
+    """
+    Hält den aktuellen LiveState. Schreiber erzeugen einen neuen Schnappschuss und
+    tauschen die Referenz atomar aus, Leser greifen über 'current' ohne Lock zu
+    und sehen immer einen in sich konsistenten Stand.
+    """
+    def __init__(self, initial=None, on_publish=None):
+        self._state = initial or LiveState()
+        self.on_publish = on_publish
+        # Nur Schreiber (Serial-Thread, Einstellungen) werden serialisiert
+        self._write_lock = threading.Lock()
+
+    @property
+    def current(self):
+        return self._state
+
+    def update(self, **changes):
+        """Übernimmt die Änderungen in einen neuen Schnappschuss und veröffentlicht ihn."""
+        with self._write_lock:
+            state = replace(self._state, seq=self._state.seq + 1, **changes)
+            self._state = state
+            if self.on_publish:
+                # Innerhalb des Locks, damit Stream-Clients die Stände in Reihenfolge erhalten
+                self.on_publish(state)
+        return state
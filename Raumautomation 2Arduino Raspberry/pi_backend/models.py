@@ -1,14 +1,27 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import inspect, text
 from datetime import datetime
 
 db = SQLAlchemy()
 
+# Raum ohne ROOMS-Konfiguration; bestehende Messwerte gehören nach der Migration zu ihm
+DEFAULT_ROOM = 'default'
+
 class ClimateReading(db.Model):
     """
     Stores historical climate data and the control action taken.
     """
+    __table_args__ = (
+        # Verlauf eines Raums; der Index enthält die rowid, sortiert also auch nach (timestamp, id)
+        db.Index('ix_climate_reading_room_id_timestamp', 'room_id', 'timestamp'),
+        # IDs nie wiederverwenden: die Rollups merken sich die höchste aggregierte id
+        # (RollupState), auch wenn die Bereinigung die Tabelle zwischendurch leert
+        {'sqlite_autoincrement': True}
+    )
+
     id = db.Column(db.Integer, primary_key=True)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    room_id = db.Column(db.String(32), nullable=False, default=DEFAULT_ROOM, server_default=DEFAULT_ROOM)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     temperature = db.Column(db.Float, nullable=True)
     humidity = db.Column(db.Float, nullable=True)
     fan_speed = db.Column(db.Integer, nullable=True)
@@ -16,8 +29,116 @@ class ClimateReading(db.Model):
     def to_dict(self):
         return {
             'id': self.id,
+            'room_id': self.room_id,
             'timestamp': self.timestamp.isoformat(),
             'temperature': self.temperature,
             'humidity': self.humidity,
             'fan_speed': self.fan_speed
         }
+
+class ClimateRollup(db.Model):
+    """
+    Aggregierte Messwerte je Zeit-Bucket für die Langzeitspeicherung.
+    'resolution' ist die Bucket-Breite in Sekunden (1 Minute, 1 Stunde, 1 Tag),
+    'bucket_start' der Beginn des Buckets als Unix-Zeit (UTC), je Raum ein Bucket.
+    Gespeichert werden Summen statt Mittelwerten, damit Buckets inkrementell ergänzt
+    (und für den ganzen Haushalt über die Räume zusammengefasst) werden können.
+    """
+    resolution = db.Column(db.Integer, primary_key=True)
+    bucket_start = db.Column(db.Integer, primary_key=True)
+    room_id = db.Column(db.String(32), primary_key=True, default=DEFAULT_ROOM, server_default=DEFAULT_ROOM)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    temperature_sum = db.Column(db.Float, nullable=True)
+    temperature_min = db.Column(db.Float, nullable=True)
+    temperature_max = db.Column(db.Float, nullable=True)
+    humidity_sum = db.Column(db.Float, nullable=True)
+    humidity_min = db.Column(db.Float, nullable=True)
+    humidity_max = db.Column(db.Float, nullable=True)
+    fan_speed_sum = db.Column(db.Float, nullable=True)
+    fan_speed_min = db.Column(db.Integer, nullable=True)
+    fan_speed_max = db.Column(db.Integer, nullable=True)
+
+class RollupState(db.Model):
+    """
+    High-Water-Mark je Rollup-Auflösung: höchste bereits aggregierte ClimateReading.id.
+    """
+    resolution = db.Column(db.Integer, primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+
+def upgrade_schema():
+    """
+    Ergänzt fehlende Spalten und Indizes in bestehenden Datenbanken.
+    db.create_all() erzeugt beides nur zusammen mit neuen Tabellen.
+    """
+    columns = {c['name'] for c in inspect(db.engine).get_columns('climate_reading')}
+    if 'room_id' not in columns:
+        # SQLite ändert dafür nur das Schema, die bestehenden Zeilen erhalten den Standardraum
+        with db.engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE climate_reading ADD COLUMN room_id VARCHAR(32) "
+                              f"NOT NULL DEFAULT '{DEFAULT_ROOM}'"))
+        print(f"Datenbank migriert: climate_reading.room_id (bestehende Zeilen: '{DEFAULT_ROOM}')")
+
+    if not _has_autoincrement('climate_reading'):
+        _rebuild_with_autoincrement()
+        print("Datenbank migriert: climate_reading.id mit AUTOINCREMENT")
+
+    columns = {c['name'] for c in inspect(db.engine).get_columns('climate_rollup')}
+    if 'room_id' not in columns:
+        # room_id gehört zum Primärschlüssel, das geht nur mit einer neuen Tabelle;
+        # bestehende Rollups stammen aus der Zeit mit einem Raum
+        with db.engine.begin() as conn:
+            selected = ', '.join(f"'{DEFAULT_ROOM}'" if c.name == 'room_id' else c.name
+                                 for c in ClimateRollup.__table__.columns)
+            _recreate_table(conn, ClimateRollup.__table__, selected)
+        print(f"Datenbank migriert: climate_rollup.room_id (bestehende Buckets: '{DEFAULT_ROOM}')")
+
+    for index in ClimateReading.__table__.indexes:
+        index.create(bind=db.engine, checkfirst=True)
+
+def _has_autoincrement(table):
+    with db.engine.connect() as conn:
+        sql = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                           {'name': table}).scalar()
+    return 'AUTOINCREMENT' in (sql or '').upper()
+
+def _rebuild_with_autoincrement():
+    """
+    SQLite kann AUTOINCREMENT nicht nachträglich setzen: Tabelle neu anlegen und umkopieren.
+    Neue IDs beginnen oberhalb der High-Water-Mark der Rollups. Liegen alle IDs schon darunter,
+    war die Tabelle zwischendurch leer und die IDs wurden wiederverwendet; diese Zeilen sind
+    noch nicht aggregiert und werden über die Marke verschoben.
+    """
+    table = ClimateReading.__table__
+    with db.engine.begin() as conn:
+        old_columns = {c['name'] for c in inspect(conn).get_columns('climate_reading')}
+        columns = [c.name for c in table.columns if c.name in old_columns]
+        last_id = conn.execute(text("SELECT MAX(last_id) FROM rollup_state")).scalar() or 0
+        max_id = conn.execute(text("SELECT MAX(id) FROM climate_reading")).scalar() or 0
+        offset = last_id if 0 < max_id < last_id else 0
+        selected = ', '.join(f"id + {offset}" if c == 'id' else c for c in columns)
+
+        _recreate_table(conn, table, selected, columns)
+
+        conn.execute(text("DELETE FROM sqlite_sequence WHERE name = 'climate_reading'"))
+        conn.execute(text("INSERT INTO sqlite_sequence (name, seq) "
+                          "SELECT 'climate_reading', MAX(:last_id, COALESCE(MAX(id), 0)) FROM climate_reading"),
+                     {'last_id': last_id})
+
+def _recreate_table(conn, table, selected, columns=None):
+    """Legt 'table' nach dem aktuellen Modell neu an und kopiert die Zeilen ('selected' je Spalte)."""
+    columns = columns or [c.name for c in table.columns]
+    conn.execute(text(f"ALTER TABLE {table.name} RENAME TO {table.name}_old"))
+    # Die Indizes wandern mit; ihre Namen werden für die neue Tabelle gebraucht
+    for index in inspect(conn).get_indexes(f"{table.name}_old"):
+        conn.execute(text(f'DROP INDEX "{index["name"]}"'))
+    table.create(conn)
+    conn.execute(text(f"INSERT INTO {table.name} ({', '.join(columns)}) "
+                      f"SELECT {selected} FROM {table.name}_old"))
+    conn.execute(text(f"DROP TABLE {table.name}_old"))
+
+def init_db(app):
+    """Bindet die Datenbank an die App und legt fehlende Tabellen und Indizes an."""
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        upgrade_schema()
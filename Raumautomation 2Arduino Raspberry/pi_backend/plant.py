@@ -0,0 +1,116 @@
+"""
+Raummodell für Simulation und Regler-Tests (ersetzt den früheren Random Walk).
+
+RoomPlant bildet Temperatur und Feuchte eines Raums als Systeme erster Ordnung
+ab: innere Wärme- und Feuchtelasten treiben die Werte nach oben, der Lüfter
+tauscht Luft mit außen (Tagesgang der Außentemperatur). Zufall kommt nur aus
+einem eigenen, per 'seed' reproduzierbaren Generator.
+
+VirtualClock ersetzt das time-Modul (time/monotonic/sleep), sodass
+SerialManager, PID-Regler und Verlauf mit simulierter Zeit laufen.
+"""
+import json
+import math
+import random
+import time
+from dataclasses import dataclass
+
+@dataclass(frozen=True)
+class PlantParams:
+    start_temperature: float = 24.0
+    start_humidity: float = 55.0
+    # Ohne Lüfter strebt der Raum gegen diese Werte (Abwärme, Personen, Pflanzen)
+    load_temperature: float = 30.0
+    load_humidity: float = 70.0
+    load_tau: float = 1800.0            # s, Zeitkonstante Richtung Last
+    # Außenluft: Tagesmittel, Amplitude, Tiefpunkt um 4 Uhr
+    outside_temperature: float = 18.0
+    outside_amplitude: float = 4.0
+    outside_humidity: float = 40.0
+    fan_tau: float = 300.0              # s, Zeitkonstante des Luftaustauschs bei voller Drehzahl
+    motor_tau: float = 3.0              # s, Hochlaufen/Auslaufen des Lüfters
+    # Rauschen: Prozess (je sqrt(s)) und Sensor (DHT: 0.1 Auflösung)
+    temperature_noise: float = 0.005
+    humidity_noise: float = 0.02
+    sensor_noise: float = 0.05
+
+def outside_temperature(params, elapsed):
+    """Außentemperatur nach 'elapsed' Sekunden seit Mitternacht (Tiefpunkt 4 Uhr, Höchstwert 16 Uhr)."""
+    hour = (elapsed / 3600.0) % 24
+    return params.outside_temperature + params.outside_amplitude * math.sin(2 * math.pi * (hour - 10) / 24)
+
+def advance(params, temperature, humidity, airflow, fan_command, outside, dt):
+    """
+    Ein Modellschritt ohne Rauschen. Nur Arithmetik, daher auch mit NumPy-Arrays
+    nutzbar (tune_pid.py rechnet so viele Reglerparameter gleichzeitig).
+    """
+    p = params
+    airflow = airflow + (fan_command / 255.0 - airflow) * min(1.0, dt / p.motor_tau)
+    exchange = airflow * dt / p.fan_tau
+    load = dt / p.load_tau
+    temperature = temperature + (p.load_temperature - temperature) * load + (outside - temperature) * exchange
+    humidity = humidity + (p.load_humidity - humidity) * load + (p.outside_humidity - humidity) * exchange
+    return temperature, humidity, airflow
+
+class RoomPlant:
+    """Temperatur/Feuchte eines Raums mit Lüfter; step(dt) rechnet dt Sekunden weiter."""
+    def __init__(self, params=None, seed=None, start_time=0.0):
+        self.params = params or PlantParams()
+        self.rng = random.Random(seed)
+        self.elapsed = start_time
+        self.temperature = self.params.start_temperature
+        self.humidity = self.params.start_humidity
+        self.fan_command = 0
+        self.airflow = 0.0 # 0..1, folgt fan_command verzögert
+
+    def step(self, dt):
+        p = self.params
+        self.elapsed += dt
+        self.temperature, self.humidity, self.airflow = advance(
+            p, self.temperature, self.humidity, self.airflow, self.fan_command,
+            outside_temperature(p, self.elapsed), dt)
+
+        noise = math.sqrt(dt)
+        self.temperature += self.rng.gauss(0.0, p.temperature_noise) * noise
+        self.humidity += self.rng.gauss(0.0, p.humidity_noise) * noise
+        self.humidity = max(0.0, min(100.0, self.humidity))
+
+    def sensor_line(self):
+        """Messzeile im Format des Sensor-Arduinos."""
+        temp = round(self.temperature + self.rng.gauss(0.0, self.params.sensor_noise), 1)
+        hum = round(self.humidity + self.rng.gauss(0.0, self.params.sensor_noise), 1)
+        return json.dumps({"temp": temp, "hum": hum})
+
+class PlantMotor:
+    """Steht für den Motor-Arduino: nimmt {"fan_speed": n} Zeilen an wie die Firmware."""
+    def __init__(self, plant):
+        self.plant = plant
+
+    def write(self, data):
+        for line in data.decode('utf-8').splitlines():
+            try:
+                self.plant.fan_command = max(0, min(255, int(json.loads(line)['fan_speed'])))
+            except (ValueError, KeyError, TypeError):
+                pass
+        return len(data)
+
+class VirtualClock:
+    """
+    Simulierte Zeit mit der Schnittstelle des time-Moduls.
+    sleep() stellt nur die Uhr vor; mit 'speed' (z.B. 1000 = 1000-fach) wird
+    zusätzlich real gewartet, ohne 'speed' läuft es so schnell wie möglich.
+    """
+    def __init__(self, start=None, speed=None):
+        self.now = time.time() if start is None else start
+        self.speed = speed
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+        if self.speed:
+            time.sleep(seconds / self.speed)
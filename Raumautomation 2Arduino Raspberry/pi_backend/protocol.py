@@ -0,0 +1,252 @@
+"""
+Kompaktes Binärprotokoll zwischen Pi und Arduinos, optional neben den JSON-Zeilen.
+
+Rahmen: 0x00, COBS(Typ + Nutzdaten + CRC-16), 0x00. COBS entfernt alle Nullbytes
+aus dem Rahmen, 0x00 trennt also eindeutig. Nach einem 0x00 beginnt ein Rahmen
+(kurze Rahmen haben einen COBS-Code < 0x20), sonst eine Textzeile; so lassen sich
+JSON-Zeilen und Rahmen im selben Datenstrom auseinanderhalten (z.B. Antwort auf
+HELLO, danach nur noch Rahmen). Das führende 0x00 ist nötig, weil der COBS-Code
+auch 0x0A oder 0x0D sein kann.
+
+Nachrichten (Little Endian, Messwerte in Zehnteln wie die DHT22-Auflösung):
+    0x01 Messwert      <hH  Temperatur, Feuchte   entspricht {"temp": 21.5, "hum": 45.2}
+    0x02 Sensorfehler  -                          entspricht {"error": "..."}
+    0x10 Lüfterbefehl  <B   Drehzahl 0-255        entspricht {"fan_speed": 128}
+
+Aushandlung: Der Pi sendet HELLO als JSON-Zeile. Firmware mit Binärprotokoll
+antwortet mit derselben Zeile und sendet (Sensor) bzw. versteht (Motor) ab dann
+Rahmen. Ältere Firmware ignoriert die Zeile, dann bleibt es bei JSON.
+"""
+import binascii
+import json
+import re
+import struct
+
+PROTOCOL_VERSION = 1
+HELLO = b'{"proto": 1}\n'
+# So oft wird HELLO pro Verbindung höchstens gesendet (der Arduino bootet nach dem Öffnen ~2 s)
+MAX_HELLOS = 3
+
+MSG_READING = 0x01
+MSG_SENSOR_ERROR = 0x02
+MSG_FAN_SPEED = 0x10
+
+READING = struct.Struct('<hH')
+FAN_SPEED = struct.Struct('<B')
+CRC = struct.Struct('<H')
+
+# Puffer ohne Zeilenende/Rahmenende darüber hinaus ist Müll (z.B. falsche Baudrate)
+MAX_BUFFER = 4096
+
+# Messzeile genau so, wie arduino_sensor/main.ino sie druckt (Serial.print(t, 1));
+# jede andere Form geht über json.loads
+SENSOR_LINE = re.compile(rb'\{"temp": (-?\d+\.\d+), "hum": (-?\d+\.\d+)\}\r?')
+
+def crc16(data):
+    """CRC-16/CCITT-FALSE (Polynom 0x1021, Start 0xFFFF), wie crc16() in der Firmware."""
+    return binascii.crc_hqx(data, 0xFFFF)
+
+def cobs_encode(data):
+    out = bytearray(b'\x00')
+    code_index = 0
+    code = 1
+    for byte in data:
+        if byte:
+            out.append(byte)
+            code += 1
+        if not byte or code == 0xFF:
+            out[code_index] = code
+            code_index = len(out)
+            out.append(0)
+            code = 1
+    out[code_index] = code
+    return bytes(out)
+
+def cobs_decode(data):
+    out = bytearray()
+    i = 0
+    while i < len(data):
+        code = data[i]
+        if code == 0 or i + code > len(data):
+            raise ValueError("Ungültiger COBS-Rahmen")
+        out += data[i + 1:i + code]
+        i += code
+        if code < 0xFF and i < len(data):
+            out.append(0)
+    return bytes(out)
+
+def encode_frame(msg_type, payload=b''):
+    body = bytes((msg_type,)) + payload
+    return b'\x00' + cobs_encode(body + CRC.pack(crc16(body))) + b'\x00'
+
+def decode_frame(frame):
+    """COBS-Rahmen ohne das abschließende 0x00 -> (Typ, Nutzdaten); None bei Format- oder CRC-Fehler."""
+    try:
+        body = cobs_decode(frame)
+    except ValueError:
+        return None
+    if len(body) < 3 or CRC.unpack_from(body, len(body) - 2)[0] != crc16(body[:-2]):
+        return None
+    return body[0], body[1:-2]
+
+def encode_fan_speed(speed, binary=False):
+    """Motorbefehl im ausgehandelten Format."""
+    if binary:
+        return encode_frame(MSG_FAN_SPEED, FAN_SPEED.pack(speed))
+    return (json.dumps({"fan_speed": speed}) + "\n").encode('utf-8')
+
+def frame_to_message(msg_type, payload):
+    """Rahmen -> dieselbe Nachricht (dict), die die JSON-Zeile ergeben hätte."""
+    if msg_type == MSG_READING and len(payload) == READING.size:
+        temp, hum = READING.unpack(payload)
+        return {'temp': temp / 10, 'hum': hum / 10}
+    if msg_type == MSG_SENSOR_ERROR:
+        return {'error': "Failed to read from DHT sensor!"}
+    if msg_type == MSG_FAN_SPEED and len(payload) == FAN_SPEED.size:
+        return {'fan_speed': payload[0]}
+    return None
+
+def parse_sensor_line(line):
+    """
+    Schneller Weg für die Messzeile des Sensors: Bytes/memoryview -> {'temp', 'hum'}
+    ohne json.loads; None, wenn die Zeile eine andere Form hat.
+    """
+    match = SENSOR_LINE.fullmatch(line)
+    if match is None:
+        return None
+    temp, hum = match.groups()
+    return {'temp': float(temp), 'hum': float(hum)}
+
+def parse_line(line):
+    """
+    JSON-Zeile eines Arduinos -> dict; None für Text wie 'Arduino Motor Controller Ready'.
+    'line' ist ein str oder Bytes/memoryview ohne '\n'. Messzeilen nehmen den schnellen
+    Weg (parse_sensor_line), alle anderen werden ohne decode()/strip() geprüft und nur
+    bei '{' am Anfang einmal in einen str umgewandelt (json.loads überspringt das '\r'
+    von println selbst).
+    """
+    if isinstance(line, str):
+        line = line.strip().encode('utf-8')
+    data = parse_sensor_line(line)
+    if data is not None:
+        return data
+    if not line or line[0] != 0x7B:  # '{'
+        return None
+    try:
+        data = json.loads(str(line, 'utf-8', 'ignore'))
+    except json.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
+
+class LineFramer:
+    """
+    Zerlegt einen Byte-Strom an 'delimiter' in Einheiten (Zeilen bzw. Rahmen).
+
+    Alles, was ein read() liefert, wird an einen bytearray angehängt; feed() gibt
+    alle vollständigen Einheiten auf einmal als memoryview zurück (ohne Kopie, ohne
+    Trennzeichen). Kopiert wird nur der unvollständige Rest in einen neuen Puffer,
+    die zurückgegebenen Views bleiben so gültig, solange sie referenziert werden.
+    """
+    def __init__(self, delimiter=b'\n', max_size=MAX_BUFFER):
+        self.delimiter = delimiter
+        self.max_size = max_size
+        self.buf = bytearray()
+        self.errors = 0
+
+    def feed(self, data):
+        buf = self.buf
+        buf += data
+        delimiter = self.delimiter
+        end = buf.find(delimiter)
+        if end == -1:
+            self._trim(0)
+            return []
+
+        view = memoryview(buf)
+        units = []
+        pos = 0
+        while end != -1:
+            units.append(view[pos:end])
+            pos = end + 1
+            end = buf.find(delimiter, pos)
+        # Die Views gehören zum alten Puffer, weiter geht es mit einer Kopie des Rests
+        self.buf = bytearray(view[pos:])
+        self._trim(0)
+        return units
+
+    def _trim(self, pos):
+        """Gibt die ersten 'pos' Bytes frei; zu langer Rest ohne Trennzeichen wird verworfen."""
+        buf = self.buf
+        del buf[:pos]
+        if len(buf) > self.max_size:
+            # z.B. falsche Baudrate
+            self.errors += 1
+            buf.clear()
+            self._discarded()
+
+    def _discarded(self):
+        pass
+
+class StreamDecoder(LineFramer):
+    """
+    Zerlegt den Byte-Strom eines Arduinos in Nachrichten (dicts).
+    JSON-Zeilen (bis '\n') und Binär-Rahmen (bis 0x00) dürfen gemischt vorkommen;
+    unvollständige Reste bleiben bis zum nächsten feed() im Puffer.
+    """
+    def __init__(self):
+        super().__init__()
+        self.after_zero = False
+
+        # Statistik (Pufferüberläufe zählen in self.errors mit)
+        self.frames = 0
+        self.lines = 0
+
+    def _discarded(self):
+        self.after_zero = False
+
+    def feed(self, data):
+        buf = self.buf
+        buf += data
+        view = memoryview(buf)
+        messages = []
+        pos = 0
+        after_zero = self.after_zero
+        while pos < len(buf):
+            first = buf[pos]
+            if first == 0:
+                after_zero = True
+                pos += 1
+                continue
+            if first in b'\r\n ' and not after_zero:
+                pos += 1
+                continue
+
+            if first < 0x20:
+                # Rahmen; direkt nach 0x00 auch mit COBS-Code 0x0A/0x0D ('\n'/'\r')
+                end = buf.find(b'\x00', pos)
+                if end == -1:
+                    break
+                decoded = decode_frame(view[pos:end])
+                message = frame_to_message(*decoded) if decoded else None
+                if message is None:
+                    self.errors += 1
+                else:
+                    self.frames += 1
+                    messages.append(message)
+            else:
+                end = buf.find(b'\n', pos)
+                if end == -1:
+                    break
+                message = parse_line(view[pos:end])
+                if message is not None:
+                    self.lines += 1
+                    messages.append(message)
+            # Ein Rahmen endet mit 0x00, eine Zeile mit '\n'
+            after_zero = first < 0x20
+            pos = end + 1
+
+        self.after_zero = after_zero
+        # Keine View verlässt feed(), der Puffer kann also an Ort und Stelle gekürzt werden
+        view.release()
+        self._trim(pos)
+        return messages
@@ -0,0 +1,146 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func, select, text
+from models import db, ClimateReading, ClimateRollup, RollupState
+from flask import Flask
+
+# Bucket-Breiten der Rollup-Stufen in Sekunden: 1 Minute, 1 Stunde, 1 Tag
+ROLLUP_RESOLUTIONS = (60, 3600, 86400)
+
+# Standard-Aufbewahrung in Tagen (None = unbegrenzt), über app.config anpassbar
+DEFAULT_RAW_RETENTION_DAYS = 7
+DEFAULT_ROLLUP_RETENTION_DAYS = {60: 30, 3600: 365, 86400: None}
+
+# Aggregiert alle Rohdaten mit id in (last_id, max_id] je Raum und ergänzt bestehende Buckets
+UPSERT_ROLLUP = text("""
+    INSERT INTO climate_rollup (resolution, bucket_start, room_id, count,
+        temperature_sum, temperature_min, temperature_max,
+        humidity_sum, humidity_min, humidity_max,
+        fan_speed_sum, fan_speed_min, fan_speed_max)
+    SELECT :resolution, CAST(strftime('%s', timestamp) AS INTEGER) / :resolution * :resolution AS bucket, room_id, COUNT(*),
+        SUM(temperature), MIN(temperature), MAX(temperature),
+        SUM(humidity), MIN(humidity), MAX(humidity),
+        SUM(fan_speed), MIN(fan_speed), MAX(fan_speed)
+    FROM climate_reading
+    WHERE id > :last_id AND id <= :max_id
+    GROUP BY room_id, bucket
+    ON CONFLICT (resolution, bucket_start, room_id) DO UPDATE SET
+        count = count + excluded.count,
+        temperature_sum = COALESCE(temperature_sum + excluded.temperature_sum, temperature_sum, excluded.temperature_sum),
+        temperature_min = COALESCE(MIN(temperature_min, excluded.temperature_min), temperature_min, excluded.temperature_min),
+        temperature_max = COALESCE(MAX(temperature_max, excluded.temperature_max), temperature_max, excluded.temperature_max),
+        humidity_sum = COALESCE(humidity_sum + excluded.humidity_sum, humidity_sum, excluded.humidity_sum),
+        humidity_min = COALESCE(MIN(humidity_min, excluded.humidity_min), humidity_min, excluded.humidity_min),
+        humidity_max = COALESCE(MAX(humidity_max, excluded.humidity_max), humidity_max, excluded.humidity_max),
+        fan_speed_sum = COALESCE(fan_speed_sum + excluded.fan_speed_sum, fan_speed_sum, excluded.fan_speed_sum),
+        fan_speed_min = COALESCE(MIN(fan_speed_min, excluded.fan_speed_min), fan_speed_min, excluded.fan_speed_min),
+        fan_speed_max = COALESCE(MAX(fan_speed_max, excluded.fan_speed_max), fan_speed_max, excluded.fan_speed_max)
+""")
+
+def high_water_mark(resolution):
+    state = db.session.get(RollupState, resolution)
+    return state.last_id if state else 0
+
+def high_water_mark_clause(resolution):
+    """high_water_mark() als Unterabfrage, gelesen im selben Stand wie die Abfrage, die sie enthält."""
+    return func.coalesce(select(RollupState.last_id)
+                         .where(RollupState.resolution == resolution)
+                         .scalar_subquery(), 0)
+
+def run_rollup():
+    """
+    Überträgt alle neuen Rohdaten seit der High-Water-Mark in die Rollup-Stufen.
+    Gibt die Anzahl der neu aggregierten Rohzeilen zurück.
+    """
+    max_id = db.session.query(func.max(ClimateReading.id)).scalar() or 0
+    processed = 0
+    for resolution in ROLLUP_RESOLUTIONS:
+        state = db.session.get(RollupState, resolution)
+        if state is None:
+            state = RollupState(resolution=resolution, last_id=0)
+            db.session.add(state)
+        if state.last_id >= max_id:
+            continue
+        db.session.execute(UPSERT_ROLLUP, {'resolution': resolution, 'last_id': state.last_id, 'max_id': max_id})
+        processed = max(processed, max_id - state.last_id)
+        state.last_id = max_id
+    db.session.commit()
+    return processed
+
+def prune(raw_days=DEFAULT_RAW_RETENTION_DAYS, rollup_days=None):
+    """
+    Löscht Rohdaten und feine Rollups außerhalb ihres Aufbewahrungsfensters.
+    Rohdaten werden nur gelöscht, wenn alle Stufen sie bereits aggregiert haben.
+    """
+    rollup_days = rollup_days or DEFAULT_ROLLUP_RETENTION_DAYS
+    now = datetime.now(timezone.utc)
+    deleted = 0
+
+    if raw_days is not None:
+        aggregated_id = min(high_water_mark(r) for r in ROLLUP_RESOLUTIONS)
+        cutoff = (now - timedelta(days=raw_days)).replace(tzinfo=None)
+        deleted += (ClimateReading.query
+                    .filter(ClimateReading.timestamp < cutoff, ClimateReading.id <= aggregated_id)
+                    .delete(synchronize_session=False))
+
+    for resolution, days in rollup_days.items():
+        if days is None:
+            continue
+        cutoff = int((now - timedelta(days=days)).timestamp())
+        deleted += (ClimateRollup.query
+                    .filter(ClimateRollup.resolution == resolution, ClimateRollup.bucket_start < cutoff)
+                    .delete(synchronize_session=False))
+
+    db.session.commit()
+    return deleted
+
+class RollupWorker:
+    """
+    Führt Rollup und Aufbewahrungs-Bereinigung periodisch in einem eigenen Thread aus.
+    """
+    def __init__(self, app: Flask, interval=60.0):
+        self.app = app
+        self.interval = interval
+        self.raw_days = app.config.get('RAW_RETENTION_DAYS', DEFAULT_RAW_RETENTION_DAYS)
+        self.rollup_days = app.config.get('ROLLUP_RETENTION_DAYS', DEFAULT_ROLLUP_RETENTION_DAYS)
+        self.stop_event = threading.Event()
+
+        # Statistik
+        self.last_run_ms = None
+        self.rows_aggregated = 0
+        self.rows_pruned = 0
+
+        self.thread = threading.Thread(target=self._worker, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self, timeout=5.0):
+        self.stop_event.set()
+        if self.thread.is_alive():
+            self.thread.join(timeout=timeout)
+
+    def stats(self):
+        return {
+            'last_run_ms': self.last_run_ms,
+            'rows_aggregated': self.rows_aggregated,
+            'rows_pruned': self.rows_pruned
+        }
+
+    def run_once(self):
+        start = time.perf_counter()
+        with self.app.app_context():
+            try:
+                self.rows_aggregated += run_rollup()
+                self.rows_pruned += prune(self.raw_days, self.rollup_days)
+            except Exception as e:
+                db.session.rollback()
+                print(f"Rollup Error: {e}")
+                return
+        self.last_run_ms = round((time.perf_counter() - start) * 1000, 2)
+
+    def _worker(self):
+        while not self.stop_event.is_set():
+            self.run_once()
+            self.stop_event.wait(self.interval)
@@ -0,0 +1,360 @@
+"""
+Ein Raum: Sensor- und Motor-Arduino, Live-Status, PID-Regler, Regeltakt und Raummodell.
+
+Ohne Serial-Schleife und ohne Threads; SerialManager (ein Thread für alle Räume)
+und AsyncSerialManager (ein Task je Raum) füttern die Bytes der Ports hinein und
+rufen die fälligen Regelschritte auf. Jeder Raum hat seinen eigenen Regler und
+Status, ein Fehler an einem Port betrifft nur diesen Raum.
+"""
+import re
+import time
+from datetime import datetime
+
+import serial
+
+from control import ClimateController, ControlScheduler
+from live_state import LiveState, StatePublisher
+from models import DEFAULT_ROOM
+from plant import RoomPlant, PlantMotor
+from protocol import HELLO, MAX_HELLOS, StreamDecoder, encode_fan_speed, parse_line
+
+# Abstand der Verlaufspunkte bzw. der Simulationsschritte in Sekunden
+LOG_INTERVAL = 30
+SIMULATION_STEP = 1.0
+
+# Ältere Messwerte werden nicht mehr geregelt (Sensor ausgefallen), Sekunden
+SAMPLE_MAX_AGE = 10
+
+# Raum-IDs stehen in URLs, Dateinamen der Shared-Memory-Slots und in climate_reading.room_id
+ROOM_ID = re.compile(r'[A-Za-z0-9_-]{1,32}')
+
+class MotorOutput:
+    """
+    Lüfterbefehle an den Motor-Arduino: nur bei einer Änderung über die Totzone hinaus
+    (Aus und Vollgas immer exakt) und als Keepalive, bevor dessen Watchdog den Motor stoppt.
+
+    Geschrieben wird ohne zu warten: nimmt der Port nichts an (write_timeout bzw. voller
+    Puffer im asyncio-Backend), wird der Befehl verworfen und im nächsten Regelschritt
+    neu gesendet, mit vorangestelltem Trennzeichen für einen halb geschriebenen Befehl.
+    """
+    def __init__(self, deadband=2, keepalive=2.5, clock=time):
+        self.deadband = deadband
+        self.keepalive = keepalive
+        self.clock = clock
+
+        # Statistik für /api/status
+        self.commands = 0
+        self.keepalives = 0
+        self.suppressed = 0
+        self.write_timeouts = 0
+        self.reset()
+
+    def reset(self):
+        """Neue Verbindung (der Arduino startet neu): der nächste Befehl geht auf jeden Fall raus."""
+        self.sent_speed = None
+        self.last_write = float('-inf')
+        self.resync = False
+
+    def changed(self, speed):
+        if self.sent_speed is None:
+            return True
+        if speed == self.sent_speed:
+            return False
+        return abs(speed - self.sent_speed) > self.deadband or speed in (0, 255)
+
+    def send(self, motor, speed, binary=False):
+        """Sendet 'speed', wenn es sich geändert hat oder der Keepalive fällig ist; True = geschrieben."""
+        now = self.clock.monotonic()
+        if self.changed(speed):
+            self.commands += 1
+        elif now - self.last_write >= self.keepalive:
+            self.keepalives += 1
+        else:
+            self.suppressed += 1
+            return False
+
+        data = encode_fan_speed(speed, binary)
+        if self.resync:
+            # Zeilenende bzw. Rahmenende: ein abgebrochener Befehl endet hier (Firmware überspringt leere)
+            data = (b'\x00' if binary else b'\n') + data
+        try:
+            motor.write(data)
+        except serial.SerialTimeoutException:
+            self.write_timeouts += 1
+            self.sent_speed = None
+            self.resync = True
+            return False
+        self.sent_speed = speed
+        self.last_write = now
+        self.resync = False
+        return True
+
+    def stats(self):
+        return {
+            'sent_speed': self.sent_speed,
+            'commands': self.commands,
+            'keepalives': self.keepalives,
+            'suppressed': self.suppressed,
+            'write_timeouts': self.write_timeouts
+        }
+
+class UnknownRoom(LookupError):
+    """Die angefragte Raum-ID ist nicht konfiguriert."""
+
+def configured_rooms(config):
+    """Räume aus ROOMS (config.py) in ihrer Reihenfolge; ohne ROOMS nur DEFAULT_ROOM."""
+    rooms = dict(config.get('ROOMS') or {DEFAULT_ROOM: {}})
+    for room_id in rooms:
+        if not isinstance(room_id, str) or not ROOM_ID.fullmatch(room_id):
+            raise ValueError(f"Ungültige Raum-ID in ROOMS: {room_id!r} (erlaubt: A-Z, a-z, 0-9, _ und -)")
+    return rooms
+
+class Room:
+    def __init__(self, room_id, app, history, events, clock=time, seed=None):
+        """
+        'history' (HistoryWriter) und die Uhr teilen sich alle Räume, 'events' gehört nur
+        diesem Raum (/api/stream?room=...). 'seed' macht das Raummodell reproduzierbar.
+        """
+        self.id = room_id
+        self.clock = clock
+        self.history = history
+        self.events = events
+
+        # Ports laut letztem Scan und die geöffneten Verbindungen (serial.Serial bzw. asyncio-Writer)
+        self.sensor_port = None
+        self.motor_port = None
+        self.sensor = None
+        self.motor = None
+        self.scanned = False
+
+        # Aktueller Status inkl. Einstellungen als unveränderlicher Schnappschuss.
+        # Jede Änderung erzeugt einen neuen Stand (seq = ETag für /api/live) und geht an den Stream.
+        self.state = StatePublisher(LiveState(room_id=room_id),
+                                    on_publish=lambda s: self.events.publish('live', s.body))
+
+        # PID Regler für Temperatur und Feuchte
+        state = self.state.current
+        self.controller = ClimateController(state.target_temperature, state.target_humidity,
+                                            time_fn=clock.monotonic)
+
+        # Fester Regeltakt (CONTROL_PERIOD in config.py); 0 = Regelschritt mit jeder Sensorzeile
+        period = app.config.get('CONTROL_PERIOD', 1.0)
+        self.scheduler = ControlScheduler(period, clock) if period else None
+        self.last_sample_time = float('-inf')
+
+        # Motorbefehle nur bei Änderung über die Totzone bzw. als Keepalive (config.py)
+        self.motor_output = MotorOutput(app.config.get('MOTOR_DEADBAND', 2),
+                                        app.config.get('MOTOR_KEEPALIVE', 2.5), clock)
+
+        # Raummodell für den Betrieb ohne Arduinos; Lüfterbefehle gehen zurück ins Modell
+        self.plant = RoomPlant(seed=seed, start_time=clock.time() % 86400)
+        self.plant_motor = PlantMotor(self.plant)
+        self.next_simulation = clock.monotonic()
+        self.last_log_time = clock.time()
+
+        # Serial-Protokoll (SERIAL_PROTOCOL in config.py): 'auto' handelt je Verbindung
+        # das Binärprotokoll aus (protocol.py), 'json' bleibt bei JSON-Zeilen
+        self.protocol = app.config.get('SERIAL_PROTOCOL', 'auto')
+        self.reset_protocol()
+
+    @property
+    def connected(self):
+        return self.sensor is not None and self.motor is not None
+
+    @property
+    def simulated(self):
+        """Keiner der beiden Arduinos gefunden: das Raummodell liefert die Messwerte."""
+        return self.scanned and self.sensor_port is None and self.motor_port is None
+
+    def set_ports(self, sensor_port, motor_port):
+        """Übernimmt das Ergebnis eines Scans (nur für Räume ohne offene Verbindung)."""
+        was_simulated = self.simulated
+        self.scanned = True
+        if sensor_port: self.sensor_port = sensor_port
+        if motor_port: self.motor_port = motor_port
+        state = self.state.current
+        if (state.active_sensor_port, state.active_motor_port) != (self.sensor_port, self.motor_port):
+            self.state.update(active_sensor_port=self.sensor_port, active_motor_port=self.motor_port)
+        if self.simulated and not was_simulated:
+            print(f"[{self.id}] No devices found. Saving simulation data...")
+
+    def attach(self, sensor, motor):
+        """Neue Verbindung: wieder mit JSON beginnen und das Binärprotokoll anbieten."""
+        self.sensor = sensor
+        self.motor = motor
+        if self.scheduler is not None:
+            self.scheduler.restart()
+        self.motor_output.reset()
+        self.reset_protocol()
+        self.send_hello('sensor', sensor)
+        self.send_hello('motor', motor)
+
+    def detach(self):
+        self.sensor = None
+        self.motor = None
+        self.reset_protocol()
+
+    def update_settings(self, target_temp=None, target_hum=None, control_mode=None):
+        """Übernimmt neue Sollwerte/Modus; der Regler liest sie beim nächsten Schritt."""
+        changes = {}
+        if target_temp is not None: changes['target_temperature'] = target_temp
+        if target_hum is not None: changes['target_humidity'] = target_hum
+        if control_mode is not None: changes['control_mode'] = control_mode
+        return self.state.update(**changes)
+
+    def log_reading(self):
+        state = self.state.current
+        timestamp = datetime.utcfromtimestamp(self.clock.time())
+        self.history.submit(state.temperature, state.humidity, state.fan_speed,
+                            timestamp=timestamp, room_id=self.id)
+        self.events.publish('reading', {
+            'room': self.id,
+            'timestamp': timestamp.isoformat(),
+            'temperature': state.temperature,
+            'humidity': state.humidity,
+            'fan_speed': state.fan_speed
+        })
+
+    def log_if_due(self):
+        """Schreibt alle LOG_INTERVAL Sekunden einen Verlaufspunkt (sobald Messwerte da sind)."""
+        if self.clock.time() - self.last_log_time > LOG_INTERVAL:
+            self.last_log_time = self.clock.time()
+            if self.state.current.temperature is not None:
+                self.log_reading()
+
+    def timeout(self):
+        """Sekunden bis zur nächsten fälligen Arbeit ohne neue Bytes (Logging, Regeltakt, Simulation)."""
+        timeout = max(0.0, LOG_INTERVAL - (self.clock.time() - self.last_log_time))
+        if self.simulated:
+            timeout = min(timeout, self.simulation_timeout())
+        elif self.connected and self.scheduler is not None:
+            timeout = min(timeout, self.scheduler.timeout())
+        return timeout
+
+    def tick(self):
+        """Fällige Arbeit ohne neue Bytes: Simulationsschritt bzw. Regeltakt, danach Logging."""
+        if self.simulated:
+            if self.simulation_timeout() == 0:
+                self.simulation_step()
+        elif self.connected:
+            self.control_if_due(self.motor)
+        self.log_if_due()
+
+    def stats(self):
+        return {
+            'sensor_port': self.sensor_port,
+            'motor_port': self.motor_port,
+            'connected': self.connected,
+            'simulated': self.simulated,
+            'control': self.control_stats(),
+            'serial': self.protocol_stats(),
+            'motor_output': self.motor_output.stats()
+        }
+
+    def control_stats(self):
+        return self.scheduler.stats() if self.scheduler else None
+
+    def reset_protocol(self):
+        """Neue Verbindung: wieder mit JSON beginnen, bis der Arduino HELLO beantwortet."""
+        self.sensor_decoder = StreamDecoder()
+        self.motor_decoder = StreamDecoder()
+        self.sensor_binary = False
+        self.motor_binary = False
+        self.hellos = {'sensor': 0, 'motor': 0}
+
+    def send_hello(self, role, ser):
+        acked = self.sensor_binary if role == 'sensor' else self.motor_binary
+        if self.protocol == 'auto' and not acked and self.hellos[role] < MAX_HELLOS:
+            self.hellos[role] += 1
+            ser.write(HELLO)
+
+    def protocol_stats(self):
+        def side(binary, decoder):
+            return {
+                'protocol': 'binary' if binary else 'json',
+                'frames': decoder.frames,
+                'lines': decoder.lines,
+                'errors': decoder.errors
+            }
+        return {
+            'sensor': side(self.sensor_binary, self.sensor_decoder),
+            'motor': side(self.motor_binary, self.motor_decoder)
+        }
+
+    def receive_sensor(self, chunk):
+        """Bytes vom Sensor-Arduino: JSON-Zeilen oder Binär-Rahmen, je nach Aushandlung."""
+        for data in self.sensor_decoder.feed(chunk):
+            if 'proto' in data:
+                self.sensor_binary = True
+                print(f"[{self.id}] Sensor uses binary protocol")
+            else:
+                self.handle_sensor_data(data, self.motor)
+        # Erste Ausgabe nach dem Reset: der Arduino ist bereit für HELLO
+        self.send_hello('sensor', self.sensor)
+
+    def receive_motor(self, chunk):
+        """Bytes vom Motor-Arduino (Bereit-Meldung, Watchdog, Antwort auf HELLO)."""
+        for data in self.motor_decoder.feed(chunk):
+            if 'proto' in data:
+                self.motor_binary = True
+                print(f"[{self.id}] Motor uses binary protocol")
+        self.send_hello('motor', self.motor)
+
+    def control_if_due(self, motor):
+        if self.scheduler is not None and self.scheduler.due():
+            self.control_step(motor)
+
+    def simulation_timeout(self):
+        """Sekunden bis zum nächsten Simulationsschritt (mit Regeltakt: bis zum nächsten Takt)."""
+        if self.scheduler is not None:
+            return self.scheduler.timeout()
+        return max(0.0, self.next_simulation - self.clock.monotonic())
+
+    def simulation_step(self, dt=None):
+        """
+        Ein Schritt ohne Hardware: das Raummodell rechnet dt Sekunden weiter und liefert
+        eine Sensorzeile, die denselben Weg nimmt wie vom Arduino (Parsen, PID, Motorbefehl).
+        """
+        if dt is None:
+            dt = self.scheduler.period if self.scheduler else SIMULATION_STEP
+        self.plant.step(dt)
+        self.handle_sensor_line(self.plant.sensor_line(), self.plant_motor)
+        self.control_if_due(self.plant_motor)
+        self.next_simulation = self.clock.monotonic() + dt
+
+    def handle_sensor_line(self, line, motor):
+        """Übernimmt eine JSON-Sensorzeile (Simulation, Benchmarks)."""
+        data = parse_line(line)
+        if data is not None:
+            self.handle_sensor_data(data, motor)
+
+    def handle_sensor_data(self, data, motor):
+        """Übernimmt eine Sensornachricht als neuesten Messwert (ohne Regeltakt: sofort regeln)."""
+        temp = data.get('temp')
+        hum = data.get('hum')
+
+        if temp is None:
+            self.state.update(temperature=None, humidity=hum)
+            return
+
+        self.state.update(temperature=temp, humidity=hum)
+        self.last_sample_time = self.clock.monotonic()
+        if self.scheduler is None:
+            self.control_step(motor)
+
+    def control_step(self, motor):
+        """Ein Regelschritt auf dem neuesten Messwert; sendet die Lüfterdrehzahl an den Motor."""
+        state = self.state.current
+        if state.temperature is None or state.humidity is None:
+            return
+        if self.clock.monotonic() - self.last_sample_time > SAMPLE_MAX_AGE:
+            # Sensor liefert nichts mehr: nicht mit alten Werten weiterregeln (I-Anteil)
+            return
+
+        # --- REGELUNGS-LOGIK ---
+        final_speed = self.controller.step(state, state.temperature, state.humidity)
+        if final_speed != state.fan_speed:
+            self.state.update(fan_speed=final_speed)
+
+        # Sende an Motor (JSON-Zeile oder Binär-Rahmen, je nach Aushandlung), nur wenn nötig
+        self.motor_output.send(motor, final_speed, self.motor_binary)
@@ -1,228 +1,210 @@
+import os
 import threading
 import time
-import json
+import selectors
 import serial
-import serial.tools.list_ports
-import random
-from simple_pid import PID
-from models import db, ClimateReading
+from concurrent.futures import ThreadPoolExecutor
+from devices import DeviceRegistry
+from history_writer import HistoryWriter
+from events import EventBroker
+from room import Room, UnknownRoom, configured_rooms
 from flask import Flask
 
+# Abfrageintervall im Fallback ohne fileno(), damit der Regeltakt pünktlich bleibt
+POLL_INTERVAL = 0.01
+
+# Räume ohne Verbindung: neuer Scan frühestens nach so vielen Sekunden bzw. nach einem Portfehler
+RESCAN_INTERVAL = 5.0
+RECONNECT_DELAY = 2.0
+
+# Während eines Scans im Hintergrund so oft nach dessen Ergebnis sehen
+SCAN_POLL = 0.1
+
 class SerialManager:
-    def __init__(self, app: Flask):
+    def __init__(self, app: Flask, clock=time, seed=None):
+        """
+        'clock' liefert time()/monotonic()/sleep() für Regelung, Verlauf und Simulation
+        (Standard: das time-Modul, für simulate.py eine plant.VirtualClock).
+        'seed' macht das Raummodell im Simulationsbetrieb reproduzierbar (je Raum seed + i).
+        """
         self.app = app
+        self.clock = clock
         self.running = True
-        self.sensor_port = None
-        self.motor_port = None
-        self.lock = threading.Lock()
-        
-        # Aktueller Status
-        self.current_temp = None
-        self.current_hum = None
-        self.current_fan_speed = 0
-        
-        # Einstellungen
-        self.control_mode = "TEMP" # TEMP, HUM, AUTO
-        self.target_temp = 22.0
-        self.target_hum = 50.0
-        
-        # PID Regler
-        # 1. Temperatur PID (Kühlen: Negative Regelparameter)
-        self.pid_temp = PID(-10, -0.1, -0.05, setpoint=self.target_temp)
-        self.pid_temp.output_limits = (0, 255) 
-        
-        # 2. Feuchtigkeits PID (Entfeuchten: Feuchte > Ziel -> Lüfter AN)
-        # Ähnlich wie Kühlen: Eingang > Sollwert -> Fehler negativ -> Ausgang positiv?
-        # Standard: Fehler = Soll - Ist. 
-        # Wenn Ist(60) > Soll(50) -> Fehler(-10). Wir wollen Lüfter AN.
-        # Also brauchen wir wieder ein negatives Kp.
-        self.pid_hum = PID(-5, -0.05, -0.01, setpoint=self.target_hum)
-        self.pid_hum.output_limits = (0, 255)
+
+        # Schreibzugriffe warten höchstens so lange (hängender Motor-Arduino, config.py)
+        self.write_timeout = app.config.get('SERIAL_WRITE_TIMEOUT', 0.01)
+
+        # Räume aus ROOMS (config.py), ohne ROOMS nur 'default'; welcher Port zu welchem Raum gehört,
+        # weiß die Registry (Zuordnung laut ROOMS bzw. Port-Cache und Scan)
+        rooms = configured_rooms(app.config)
+        self.registry = DeviceRegistry(os.path.join(app.instance_path, 'port_cache.json'),
+                                       app.config.get('ROOMS'))
+
+        # Verlauf aller Räume wird gebündelt in einem eigenen Thread geschrieben
+        self.history = self._history_writer(app)
+
+        # Je Raum eigener Status, Regler und Live-Stream (/api/stream?room=...)
+        self.rooms = {
+            room_id: Room(room_id, app, self.history, self._event_broker(), clock,
+                          seed=None if seed is None else seed + i)
+            for i, room_id in enumerate(rooms)
+        }
 
         self.thread = threading.Thread(target=self._worker, daemon=True)
 
+    def _history_writer(self, app):
+        return HistoryWriter(app)
+
+    def _event_broker(self):
+        return EventBroker()
+
     def start(self):
+        self.history.start()
         self.thread.start()
 
-    def _find_ports(self):
-        """Scannt nach angeschlossenen Arduinos."""
-        ports = list(serial.tools.list_ports.comports())
-        found_sensor = None
-        found_motor = None
-        
-        print(f"Scanning {len(ports)} ports...")
-        for p in ports:
-            if "ACM" in p.device or "USB" in p.device or "COM" in p.device:
-                try:
-                    s = serial.Serial(p.device, 115200, timeout=2)
-                    time.sleep(2) 
-                    
-                    start = time.time()
-                    is_sensor = False
-                    is_motor = False
-                    
-                    while time.time() - start < 3:
-                        if s.in_waiting:
-                            line = s.readline().decode('utf-8', errors='ignore')
-                            if "temp" in line and "hum" in line:
-                                is_sensor = True
-                                break
-                            if "Motor" in line or "Ready" in line:
-                                is_motor = True
-                                break
-                    
-                    s.close()
-                    
-                    if is_sensor:
-                        found_sensor = p.device
-                        print(f"Found Sensor on {p.device}")
-                    elif is_motor:
-                        found_motor = p.device
-                        print(f"Found Motor (candidate) on {p.device}")
-                    
-                except Exception as e:
-                    print(f"Error scanning {p.device}: {e}")
-        
-        return found_sensor, found_motor
+    def stop(self):
+        """Stoppt die Serial-Schleife und schreibt den gepufferten Verlauf."""
+        self.running = False
+        self.history.stop()
+
+    @property
+    def room(self):
+        """Standardraum (der erste in ROOMS), für Aufrufe ohne Raum-ID."""
+        return next(iter(self.rooms.values()))
+
+    def get_room(self, room_id=None):
+        if room_id is None:
+            return self.room
+        try:
+            return self.rooms[room_id]
+        except KeyError:
+            raise UnknownRoom(f"Unbekannter Raum: {room_id}")
+
+    def rooms_info(self):
+        return {'default': self.room.id, 'rooms': list(self.rooms)}
+
+    def update_settings(self, target_temp=None, target_hum=None, control_mode=None, room_id=None):
+        """Übernimmt neue Sollwerte/Modus für einen Raum; sein Regler liest sie beim nächsten Schritt."""
+        return self.get_room(room_id).update_settings(target_temp, target_hum, control_mode)
 
     def _worker(self):
+        """
+        Ein Thread für alle Räume: ein Selector über alle Ports, danach die fälligen
+        Regeltakte, Simulationsschritte und Verlaufspunkte je Raum. Der Port-Scan läuft
+        im Hintergrund, damit verbundene Räume währenddessen weiter geregelt werden.
+        """
         print("Serial Manager started.")
-        
-        sensor_ser = None
-        motor_ser = None
-        
-        last_log_time = time.time()
+
+        self.selector = selectors.DefaultSelector()
+        self.polled = []
+        self.next_scan = float('-inf')
+        scanner = ThreadPoolExecutor(max_workers=1)
+        scan = None
 
         while self.running:
-            # 1. Verbindungswiederherstellung (Recovery)
-            if not sensor_ser or not motor_ser:
-                s, m = self._find_ports()
-                if s: self.sensor_port = s
-                if m: self.motor_port = m
-                
-                if self.sensor_port and not sensor_ser:
-                    try:
-                        sensor_ser = serial.Serial(self.sensor_port, 115200, timeout=1)
-                        print("Connected to Sensor")
-                    except: sensor_ser = None
-                
-                if self.motor_port and not motor_ser:
-                    try:
-                        motor_ser = serial.Serial(self.motor_port, 115200, timeout=1)
-                        print("Connected to Motor")
-                    except: motor_ser = None
-                
-                if not sensor_ser and not motor_ser:
-                    # SIMULATION MODE
-                    print("No devices found. Saving simulation data...")
-                    # Simuliere langsame Änderung
-                    # Startwerte
-                    if self.current_temp is None: 
-                        self.current_temp = 22.0
-                        self.current_hum = 50.0
-
-                    # Random Walk Simulation
-                    self.current_temp += random.uniform(-0.1, 0.1)
-                    self.current_hum += random.uniform(-0.5, 0.5)
-                    
-                    # PID Berechnung (Simuliert)
-                    speed_temp = 0
-                    speed_hum = 0
-                    
-                    # PID Sollwerte aktualisieren
-                    self.pid_temp.setpoint = self.target_temp
-                    self.pid_hum.setpoint = self.target_hum
-                    
-                    speed_temp = int(self.pid_temp(self.current_temp))
-                    speed_hum = int(self.pid_hum(self.current_hum))
-                    
-                    final_speed = 0
-                    if self.control_mode == "TEMP": final_speed = speed_temp
-                    elif self.control_mode == "HUM": final_speed = speed_hum
-                    elif self.control_mode == "AUTO": final_speed = max(speed_temp, speed_hum)
-                    
-                    self.current_fan_speed = max(0, min(255, final_speed))
-                    
-                    # Logging
-                    if time.time() - last_log_time > 30:
-                        last_log_time = time.time()
-                        with self.app.app_context():
-                            reading = ClimateReading(
-                                temperature=self.current_temp,
-                                humidity=self.current_hum,
-                                fan_speed=self.current_fan_speed
-                            )
-                            db.session.add(reading)
-                            db.session.commit()
-                            
-                    time.sleep(1) # Simulation läuft langsamer
-                    continue
-
-            # 2. Hauptschleife
-            try:
-                # --- SENSOR LESEN ---
-                if sensor_ser.in_waiting:
-                    line = sensor_ser.readline().decode('utf-8', errors='ignore').strip()
-                    if line.startswith('{') and line.endswith('}'):
-                        try:
-                            data = json.loads(line)
-                            with self.lock:
-                                self.current_temp = data.get('temp')
-                                self.current_hum = data.get('hum')
-                            
-                            # --- REGELUNGS-LOGIK ---
-                            speed_temp = 0
-                            speed_hum = 0
-                            
-                            if self.current_temp is not None:
-                                # PID Sollwerte aktualisieren (falls geändert)
-                                self.pid_temp.setpoint = self.target_temp
-                                self.pid_hum.setpoint = self.target_hum
-                                
-                                # Anforderungen berechnen
-                                speed_temp = int(self.pid_temp(self.current_temp))
-                                speed_hum = int(self.pid_hum(self.current_hum))
-                                
-                                final_speed = 0
-                                
-                                if self.control_mode == "TEMP":
-                                    final_speed = speed_temp
-                                elif self.control_mode == "HUM":
-                                    final_speed = speed_hum
-                                elif self.control_mode == "AUTO":
-                                    final_speed = max(speed_temp, speed_hum)
-                                
-                                self.current_fan_speed = final_speed
-                                
-                                # Sende an Motor
-                                cmd = {"fan_speed": self.current_fan_speed}
-                                msg = json.dumps(cmd) + "\n"
-                                motor_ser.write(msg.encode('utf-8'))
-                                
-                        except json.JSONDecodeError:
-                            pass
-                
-                # --- LOGGING (Alle 30s) ---
-                if time.time() - last_log_time > 30:
-                    last_log_time = time.time()
-                    if self.current_temp is not None:
-                        with self.app.app_context():
-                            reading = ClimateReading(
-                                temperature=self.current_temp,
-                                humidity=self.current_hum,
-                                fan_speed=self.current_fan_speed
-                            )
-                            db.session.add(reading)
-                            db.session.commit()
-                        
-                time.sleep(0.1)
-                
-            except Exception as e:
-                print(f"Serial Loop Error: {e}")
+            # 1. Verbindungswiederherstellung (Recovery) für Räume ohne Verbindung
+            unconnected = any(not room.connected for room in self.rooms.values())
+            if scan is None and unconnected and self.clock.monotonic() >= self.next_scan:
+                scan = scanner.submit(self.registry.scan)
+            if scan is not None and scan.done():
                 try:
-                    if sensor_ser: sensor_ser.close()
-                    if motor_ser: motor_ser.close()
-                except: pass
-                sensor_ser = None
-                motor_ser = None
-                time.sleep(2)
+                    self._connect_rooms(scan.result())
+                except Exception as e:
+                    print(f"Port scan failed: {e}")
+                scan = None
+                self.next_scan = self.clock.monotonic() + RESCAN_INTERVAL
+
+            # 2. Warten bis Bytes ankommen oder in einem Raum Regeltakt, Simulation oder Logging fällig ist
+            timeout = min(room.timeout() for room in self.rooms.values())
+            if scan is not None:
+                timeout = min(timeout, SCAN_POLL)
+            elif unconnected:
+                timeout = min(timeout, max(0.0, self.next_scan - self.clock.monotonic()))
+            if self.polled:
+                timeout = min(timeout, POLL_INTERVAL)
+
+            if self.selector.get_map():
+                for key, _ in self.selector.select(timeout=timeout):
+                    room, role = key.data
+                    self._read(room, role)
+            else:
+                self.clock.sleep(timeout)
+
+            # Fallback ohne fileno() (z.B. Windows): pollen statt blockierendem readline
+            for room, role in list(self.polled):
+                self._read(room, role, poll=True)
+
+            # 3. Regeltakt, Simulation und Logging (alle 30s) je Raum
+            for room in self.rooms.values():
+                try:
+                    room.tick()
+                except Exception as e:
+                    self._disconnect(room, e)
+
+        scanner.shutdown(wait=False)
+
+    def _read(self, room, role, poll=False):
+        """Liest alle wartenden Bytes eines Ports; ein Fehler trennt nur diesen Raum."""
+        if not room.connected:
+            return
+        ser = room.sensor if role == 'sensor' else room.motor
+        try:
+            waiting = ser.in_waiting
+            if poll and not waiting:
+                return
+            chunk = ser.read(waiting or 1)
+            if role == 'sensor':
+                room.receive_sensor(chunk)
+            else:
+                room.receive_motor(chunk)
+        except Exception as e:
+            self._disconnect(room, e)
+
+    def _connect_rooms(self, assignment):
+        for room in self.rooms.values():
+            if room.connected:
+                continue
+            room.set_ports(*assignment.get(room.id, (None, None)))
+            if room.sensor_port and room.motor_port:
+                self._connect(room)
+
+    def _connect(self, room):
+        """Öffnet Sensor und Motor eines Raums und registriert beide im Selector."""
+        opened = []
+        try:
+            for port in (room.sensor_port, room.motor_port):
+                opened.append(serial.Serial(port, 115200, timeout=1, write_timeout=self.write_timeout))
+            sensor, motor = opened
+            print(f"[{room.id}] Connected to Sensor {room.sensor_port} and Motor {room.motor_port}")
+            room.attach(sensor, motor)
+        except Exception as e:
+            print(f"[{room.id}] Could not connect: {e}")
+            for ser in opened:
+                ser.close()
+            room.detach()
+            return
+
+        for role, ser in (('sensor', sensor), ('motor', motor)):
+            try:
+                self.selector.register(ser.fileno(), selectors.EVENT_READ, (room, role))
+            except (AttributeError, OSError, ValueError):
+                # pyserial bietet fileno() nur auf POSIX-Systemen
+                self.polled.append((room, role))
+
+    def _disconnect(self, room, error):
+        print(f"[{room.id}] Serial Loop Error: {error}")
+        for ser in (room.sensor, room.motor):
+            if ser is None:
+                continue
+            try:
+                self.selector.unregister(ser.fileno())
+            except (AttributeError, KeyError, OSError, ValueError):
+                pass
+            try:
+                ser.close()
+            except Exception:
+                pass
+        self.polled = [(r, role) for r, role in self.polled if r is not room]
+        room.detach()
+        # Wie früher erst nach einer Pause neu verbinden (Arduino wird gerade neu gesteckt)
+        self.next_scan = max(self.next_scan, self.clock.monotonic() + RECONNECT_DELAY)
@@ -0,0 +1,41 @@
+"""
+Produktiv-Start des Backends mit waitress statt des Werkzeug-Entwicklungsservers.
+
+waitress bedient alle Anfragen aus einem einzigen Prozess mit einem Thread-Pool.
+Dadurch gibt es weiterhin genau einen SerialManager, der die Arduinos besitzt.
+Für mehrere Worker-Prozesse (gunicorn -w 4) den Messprozess separat starten
+(acquisition.py) und ACQUISITION=external setzen. Jede offene
+/api/stream-Verbindung belegt einen Thread, daher '--threads' mindestens so
+groß wählen wie die Anzahl der Dashboards.
+
+Aufruf:
+    python serve.py --threads 32
+    ACQUISITION=external python serve.py --threads 32   # neben acquisition.py
+"""
+import argparse
+import signal
+import sys
+
+from waitress import serve
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5001)
+    parser.add_argument('--threads', type=int, default=32)
+    args = parser.parse_args()
+
+    # Import startet SerialManager und RollupWorker (einmal, in diesem Prozess),
+    # außer bei ACQUISITION=external
+    from app import app
+
+    # SIGTERM (z.B. systemd) wie Strg+C behandeln, damit die atexit-Handler den Verlauf schreiben
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    serve(app, host=args.host, port=args.port, threads=args.threads,
+          connection_limit=max(100, args.threads * 4), channel_timeout=60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+import fcntl
+import json
+import mmap
+import os
+import struct
+import time
+import zlib
+from contextlib import contextmanager
+from collections import namedtuple
+from events import format_event
+from models import DEFAULT_ROOM
+from room import UnknownRoom
+
+# Kopf eines Slots: seq (ungerade = Schreiber aktiv), version, crc32, Länge der Nutzdaten
+HEADER = struct.Struct('<QQII')
+SEQ = struct.Struct('<Q')
+SLOT_SIZE = 16384
+
+# Slots, die der Messprozess (acquisition.py) anlegt: je Raum 'live-<raum>' usw., dazu einmal 'status'
+ROOM_SLOTS = ('live', 'reading', 'settings')
+GLOBAL_SLOTS = ('status',)
+# Der Status enthält alle Räume (Regeltakt, Protokoll, Geräte) und braucht mehr Platz
+SLOT_SIZES = {'status': 65536}
+
+# Wie LiveState: fertiges JSON plus ETag für /api/live
+SharedLive = namedtuple('SharedLive', 'etag body')
+
+class AcquisitionUnavailable(RuntimeError):
+    """Der Messprozess läuft nicht (oder hat noch keinen Status veröffentlicht)."""
+
+class SharedSlot:
+    """
+    Ein Wert (Bytes) in einer Memory-Mapped Datei, geschützt durch einen Seqlock.
+
+    Beliebig viele Leser in beliebigen Prozessen, aber nur ein Schreiber gleichzeitig;
+    mehrere Schreiber müssen sich über locked() abstimmen. Leser prüfen Länge und
+    CRC direkt im Mapping und kopieren nur den fertigen, gültigen Wert.
+    """
+    def __init__(self, path, size=SLOT_SIZE, create=False):
+        self.path = path
+        self.fd = os.open(path, os.O_RDWR | (os.O_CREAT if create else 0), 0o644)
+        if create and os.fstat(self.fd).st_size < size:
+            # Bestehende Datei nicht ersetzen: Webprozesse behalten ihr Mapping
+            os.ftruncate(self.fd, size)
+        self.size = os.fstat(self.fd).st_size
+        self.mm = mmap.mmap(self.fd, self.size)
+        self.view = memoryview(self.mm)
+
+    def close(self):
+        self.view.release()
+        self.mm.close()
+        os.close(self.fd)
+
+    @contextmanager
+    def locked(self):
+        """Serialisiert Schreiber aus mehreren Prozessen (z.B. Web-Worker)."""
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+    def version(self):
+        """Zähler der Schreibvorgänge; billige Änderungsprüfung ohne den Wert zu lesen."""
+        return HEADER.unpack_from(self.mm, 0)[1]
+
+    def write(self, payload):
+        if len(payload) > self.size - HEADER.size:
+            raise ValueError(f"Wert zu groß für Slot {self.path}: {len(payload)} Bytes")
+        seq, version, _, _ = HEADER.unpack_from(self.mm, 0)
+        # Ungerade = Schreiben läuft (auch nach einem Absturz mitten im Schreiben)
+        seq |= 1
+        SEQ.pack_into(self.mm, 0, seq)
+        self.mm[HEADER.size:HEADER.size + len(payload)] = payload
+        HEADER.pack_into(self.mm, 0, seq + 1, version + 1, zlib.crc32(payload), len(payload))
+        return version + 1
+
+    def read(self, retries=1000):
+        """Liefert (version, bytes); version 0 = noch nie geschrieben."""
+        for _ in range(retries):
+            seq, version, crc, length = HEADER.unpack_from(self.mm, 0)
+            if seq % 2 == 0 and length <= self.size - HEADER.size:
+                data = self.view[HEADER.size:HEADER.size + length]
+                # CRC fängt auch Schreibvorgänge ab, die ohne Speicherbarriere sichtbar werden
+                if zlib.crc32(data) == crc and SEQ.unpack_from(self.mm, 0)[0] == seq:
+                    value = bytes(data)
+                    data.release()
+                    return version, value
+                data.release()
+            time.sleep(0) # Schreiber ist gerade aktiv
+        raise AcquisitionUnavailable(f"Slot {self.path} wird nicht fertig geschrieben")
+
+class SharedState:
+    """
+    Die Slots des Messprozesses in einem Verzeichnis (unter Linux in /dev/shm, also im RAM).
+    Der Messprozess legt alle Slots für 'rooms' an, Leser öffnen die Slots eines Raums
+    erst beim ersten Zugriff.
+    """
+    def __init__(self, directory, create=False, rooms=()):
+        self.directory = directory
+        self.create = create
+        if create:
+            os.makedirs(directory, exist_ok=True)
+        self.slots = {}
+        for name in GLOBAL_SLOTS + tuple(f"{slot}-{room_id}" for room_id in rooms for slot in ROOM_SLOTS):
+            self[name]
+
+    def __getitem__(self, name):
+        slot = self.slots.get(name)
+        if slot is None:
+            slot = SharedSlot(os.path.join(self.directory, f"{name}.bin"),
+                              size=SLOT_SIZES.get(name, SLOT_SIZE), create=self.create)
+            self.slots[name] = slot
+        return slot
+
+    def publish(self, name, data):
+        """Schreibt fertiges JSON (bytes) oder ein JSON-fähiges Objekt in einen Slot."""
+        payload = data if isinstance(data, bytes) else json.dumps(data).encode('utf-8')
+        return self[name].write(payload)
+
+    def close(self):
+        for slot in self.slots.values():
+            slot.close()
+
+class AcquisitionClient:
+    """
+    Sicht eines Webprozesses auf den separaten Messprozess.
+    Bietet dieselben Methoden wie Acquisition, liest aber nur aus dem Shared Memory
+    (Einstellungen werden in den 'settings'-Slot des Raums geschrieben und dort abgeholt).
+    'rooms' sind die Raum-IDs aus ROOMS, dieselbe config.py wie im Messprozess.
+    """
+    def __init__(self, directory, rooms=(DEFAULT_ROOM,), poll_interval=0.2):
+        self.directory = directory
+        self.room_ids = list(rooms)
+        self.poll_interval = poll_interval
+        self.shared = None
+
+    def _slot(self, name):
+        try:
+            if self.shared is None:
+                self.shared = SharedState(self.directory)
+            return self.shared[name]
+        except (FileNotFoundError, ValueError):
+            # ValueError: Datei existiert, ist aber noch leer (Messprozess startet gerade)
+            raise AcquisitionUnavailable("Messprozess (acquisition.py) läuft nicht")
+
+    def resolve_room(self, room_id=None):
+        if room_id is None:
+            return self.room_ids[0]
+        if room_id not in self.room_ids:
+            raise UnknownRoom(f"Unbekannter Raum: {room_id}")
+        return room_id
+
+    def rooms(self):
+        return {'default': self.room_ids[0], 'rooms': self.room_ids}
+
+    def live(self, room_id=None):
+        room_id = self.resolve_room(room_id)
+        version, body = self._slot(f"live-{room_id}").read()
+        if version == 0:
+            raise AcquisitionUnavailable("Noch kein Status vom Messprozess")
+        return SharedLive(f"live-{room_id}-{version}", body)
+
+    def update_settings(self, target_temp=None, target_hum=None, control_mode=None, room_id=None):
+        slot = self._slot(f"settings-{self.resolve_room(room_id)}")
+        changes = {'target_temp': target_temp, 'target_hum': target_hum, 'control_mode': control_mode}
+        with slot.locked():
+            # Vollständige Einstellungen schreiben, damit parallele Änderungen nicht verloren gehen
+            _, payload = slot.read()
+            settings = json.loads(payload) if payload else {}
+            settings.update({k: v for k, v in changes.items() if v is not None})
+            slot.write(json.dumps(settings).encode('utf-8'))
+        return settings
+
+    def stats(self):
+        version, payload = self._slot('status').read()
+        return json.loads(payload) if version else {}
+
+    def stream(self, room_id=None, keepalive=15):
+        """SSE-Generator für einen Raum; die Raum-ID wird sofort geprüft, nicht erst beim ersten Ereignis."""
+        return self._stream(self.resolve_room(room_id), keepalive)
+
+    def _stream(self, room_id, keepalive):
+        """Fragt die Versionen der Slots des Raums ab und sendet nur Änderungen."""
+        seen = {'live': 0, 'reading': None}
+        last_sent = time.monotonic()
+        while True:
+            try:
+                for name in seen:
+                    slot = self._slot(f"{name}-{room_id}")
+                    version = slot.version()
+                    if seen[name] is None:
+                        seen[name] = version # nur neue Verlaufspunkte senden
+                    elif version != seen[name]:
+                        seen[name], payload = slot.read()
+                        yield format_event(name, payload)
+                        last_sent = time.monotonic()
+            except AcquisitionUnavailable:
+                pass
+            if time.monotonic() - last_sent >= keepalive:
+                # Kommentarzeile hält Proxies und Browser-Verbindung offen
+                yield b": keepalive\n\n"
+                last_sent = time.monotonic()
+            time.sleep(self.poll_interval)
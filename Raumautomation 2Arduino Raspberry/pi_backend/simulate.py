@@ -0,0 +1,121 @@
+"""
+Simulation schneller als Echtzeit: Raummodell (plant.py) plus SerialManager mit virtueller Uhr.
+
+Jeder Schritt nimmt denselben Weg wie eine echte Sensorzeile (Parsen, PID,
+Motorbefehl, Live-Status, Verlauf alle 30 s), nur ohne Threads und ohne
+Warten. Gleicher --seed ergibt denselben Verlauf, so lassen sich
+Regler-Änderungen über einen simulierten Tag in Sekunden vergleichen.
+
+Aufruf:
+    python simulate.py --hours 24 --seed 1
+    python simulate.py --hours 24 --mode AUTO --target-temp 23 --csv verlauf.csv
+    python simulate.py --hours 1 --speed 1000     # 1000-fach, z.B. mit laufendem Dashboard
+"""
+import argparse
+import csv
+import statistics
+import time
+from datetime import datetime, timezone
+
+from flask import Flask
+from models import init_db
+from plant import VirtualClock
+from serial_manager import SerialManager
+
+def run_simulation(hours=24.0, seed=1, dt=1.0, control_mode='TEMP', target_temp=22.0, target_hum=50.0,
+                   start='2024-01-01T00:00:00', speed=None, database_uri='sqlite://', csv_path=None,
+                   control_period=1.0):
+    """Simuliert 'hours' Stunden und gibt Kennzahlen als dict zurück."""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    app.config['CONTROL_PERIOD'] = control_period
+    init_db(app)
+
+    start_epoch = datetime.fromisoformat(start).replace(tzinfo=timezone.utc).timestamp()
+    clock = VirtualClock(start=start_epoch, speed=speed)
+    mgr = SerialManager(app, clock=clock, seed=seed)
+    mgr.update_settings(target_temp, target_hum, control_mode)
+    room = mgr.room
+    mgr.history.start()
+
+    temps, hums, speeds = [], [], []
+    writer = None
+    if csv_path:
+        csv_file = open(csv_path, 'w', newline='')
+        writer = csv.writer(csv_file)
+        writer.writerow(['timestamp', 'temperature', 'humidity', 'fan_speed'])
+
+    steps = int(hours * 3600 / dt)
+    wall_start = time.perf_counter()
+    for _ in range(steps):
+        room.simulation_step(dt)
+        room.log_if_due()
+        clock.sleep(dt)
+
+        state = room.state.current
+        temps.append(state.temperature)
+        hums.append(state.humidity)
+        speeds.append(state.fan_speed)
+        if writer:
+            writer.writerow([datetime.fromtimestamp(clock.time(), timezone.utc).isoformat(),
+                             state.temperature, state.humidity, state.fan_speed])
+    wall = time.perf_counter() - wall_start
+
+    mgr.history.stop()
+    if writer:
+        csv_file.close()
+
+    return {
+        'steps': steps,
+        'simulated_s': steps * dt,
+        'wall_s': wall,
+        'temperature': summarize(temps, target_temp),
+        'humidity': summarize(hums, target_hum),
+        'fan_speed_mean': statistics.fmean(speeds) if speeds else None,
+        'motor': room.motor_output.stats(),
+        'history': mgr.history.stats()
+    }
+
+def summarize(values, target):
+    return {
+        'mean': statistics.fmean(values),
+        'min': min(values),
+        'max': max(values),
+        'mae': statistics.fmean(abs(v - target) for v in values)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hours', type=float, default=24.0)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--dt', type=float, default=1.0, help="Abstand der Sensorzeilen in s")
+    parser.add_argument('--control-period', type=float, default=1.0,
+                        help="Regeltakt in s (0 = Regelschritt mit jeder Sensorzeile)")
+    parser.add_argument('--mode', default='TEMP', choices=['TEMP', 'HUM', 'AUTO'])
+    parser.add_argument('--target-temp', type=float, default=22.0)
+    parser.add_argument('--target-hum', type=float, default=50.0)
+    parser.add_argument('--start', default='2024-01-01T00:00:00', help="Simulierter Startzeitpunkt (UTC)")
+    parser.add_argument('--speed', type=float, help="Faktor gegenüber Echtzeit (Standard: so schnell wie möglich)")
+    parser.add_argument('--db', default='sqlite://', help="Datenbank für den Verlauf (Standard: im Speicher)")
+    parser.add_argument('--csv', help="Jeden Schritt als CSV schreiben")
+    args = parser.parse_args()
+
+    result = run_simulation(args.hours, args.seed, args.dt, args.mode, args.target_temp, args.target_hum,
+                            args.start, args.speed, args.db, args.csv, args.control_period)
+
+    t, h = result['temperature'], result['humidity']
+    print(f"Simuliert: {result['simulated_s'] / 3600:.1f} h in {result['wall_s']:.2f} s "
+          f"({result['simulated_s'] / result['wall_s']:.0f}x Echtzeit, {result['steps']} Schritte)")
+    print(f"Temperatur: Mittel {t['mean']:.2f} °C, min {t['min']:.1f}, max {t['max']:.1f}, "
+          f"mittlere Abweichung {t['mae']:.2f} K")
+    print(f"Feuchte:    Mittel {h['mean']:.1f} %, min {h['min']:.1f}, max {h['max']:.1f}, "
+          f"mittlere Abweichung {h['mae']:.2f} %")
+    print(f"Lüfter:     mittlere Drehzahl {result['fan_speed_mean']:.0f}")
+    m = result['motor']
+    print(f"Motor:      {m['commands']} Befehle + {m['keepalives']} Keepalives, "
+          f"{m['suppressed']} Regelschritte ohne Befehl")
+    print(f"Verlauf:    {result['history']['rows_written']} Zeilen geschrieben, "
+          f"{result['history']['dropped']} verworfen")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""
+PID-Tuning gegen das Raummodell: tausende Parametersätze gleichzeitig (NumPy).
+
+Jeder Satz (Kp, Ki, Kd) ist ein Element der Arrays; Modell (plant.advance) und
+PID (wie simple_pid: P auf Fehler, D auf Messwert, Anti-Windup) rechnen für alle
+Sätze in einem Schritt. Alle Sätze sehen dasselbe Rauschen, Unterschiede kommen
+also nur von den Parametern. Je Szenario wird ein Sollwertsprung vom Startwert
+des Raums simuliert; ausgewertet werden Einschwingzeit, Überschwingen und
+Lüfterenergie (Leistung ~ Drehzahl^3), jeweils der schlechteste Wert über alle Szenarien.
+
+Aufruf:
+    pip install -r requirements-tools.txt
+    python tune_pid.py                                 # Temperatur-Regler, 6000 Sätze
+    python tune_pid.py --loop hum --top 20
+    python tune_pid.py --kp -40:-5:36 --ki -1:0:21 --kd 0:0:1 --csv ergebnis.csv
+"""
+import argparse
+import csv
+import time
+from dataclasses import replace
+
+import numpy as np
+
+from plant import PlantParams, advance, outside_temperature
+
+# Aktuelle Werte aus control.ClimateController zum Vergleich
+CURRENT_GAINS = {'temp': (-10, -0.1, -0.05), 'hum': (-5, -0.05, -0.01)}
+
+# Standard-Raster je Regler: 'start:stop:anzahl'
+DEFAULT_GRID = {
+    'temp': {'kp': '-30:-1:30', 'ki': '-0.5:0:20', 'kd': '-2:0:10'},
+    'hum': {'kp': '-15:-0.5:30', 'ki': '-0.25:0:20', 'kd': '-1:0:10'}
+}
+
+# Abweichungen vom Standard-Raummodell
+SCENARIOS = {
+    'standard': {},
+    'warm': {'load_temperature': 33.0, 'load_humidity': 75.0},
+    'kuehl': {'outside_temperature': 12.0, 'outside_humidity': 35.0}
+}
+
+class BatchPID:
+    """simple_pid.PID für viele Parametersätze; alle Argumente als Arrays gleicher Form."""
+    def __init__(self, kp, ki, kd, setpoint, output_limits=(0, 255)):
+        self.kp, self.ki, self.kd = kp, ki, kd
+        self.setpoint = setpoint
+        self.low, self.high = output_limits
+        self.integral = np.zeros_like(kp)
+        self.last_input = None
+
+    def __call__(self, measurement, dt):
+        error = self.setpoint - measurement
+        # Erster Aufruf ohne D-Anteil; dt zählt wie bei simple_pid ab der Erzeugung des Reglers
+        d_input = measurement - self.last_input if self.last_input is not None else 0.0
+        self.last_input = measurement
+
+        self.integral = np.clip(self.integral + self.ki * error * dt, self.low, self.high)
+        output = self.kp * error + self.integral - self.kd * d_input / dt
+        return np.clip(output, self.low, self.high)
+
+def parse_range(spec):
+    start, stop, count = spec.split(':')
+    return np.linspace(float(start), float(stop), int(count))
+
+def make_grid(kp, ki, kd, include=None):
+    """Alle Kombinationen als drei flache Arrays; 'include' wird zusätzlich angehängt."""
+    kp, ki, kd = (a.ravel() for a in np.meshgrid(kp, ki, kd, indexing='ij'))
+    if include is not None:
+        kp, ki, kd = (np.append(a, v) for a, v in zip((kp, ki, kd), include))
+    return kp, ki, kd
+
+def simulate(loop, kp, ki, kd, params, target, hours=2.0, dt=1.0, start_hour=6.0, band=0.3,
+             fan_watts=30.0, seed=1):
+    """
+    Sollwertsprung für alle Parametersätze; liefert Arrays (Einschwingzeit in s,
+    Überschwingen, Energie in Wh, mittlere Abweichung). Nie eingeschwungen = inf.
+    """
+    n = kp.shape[0]
+    steps = int(hours * 3600 / dt)
+    rng = np.random.default_rng(seed)
+
+    temperature = np.full(n, params.start_temperature)
+    humidity = np.full(n, params.start_humidity)
+    airflow = np.zeros(n)
+    command = np.zeros(n)
+    pid = BatchPID(kp, ki, kd, target)
+
+    start_value = params.start_temperature if loop == 'temp' else params.start_humidity
+    direction = 1.0 if start_value >= target else -1.0
+    last_outside_band = np.full(n, -1)
+    overshoot = np.zeros(n)
+    energy = np.zeros(n)
+    abs_error = np.zeros(n)
+
+    elapsed = start_hour * 3600
+    for i in range(steps):
+        elapsed += dt
+        temperature, humidity, airflow = advance(params, temperature, humidity, airflow, command,
+                                                 outside_temperature(params, elapsed), dt)
+        # Gleiches Rauschen für alle Sätze
+        temperature = temperature + rng.normal(0.0, params.temperature_noise) * np.sqrt(dt)
+        humidity = np.clip(humidity + rng.normal(0.0, params.humidity_noise) * np.sqrt(dt), 0.0, 100.0)
+
+        value = temperature if loop == 'temp' else humidity
+        measured = np.round(value + rng.normal(0.0, params.sensor_noise), 1)
+        # ClimateController schneidet auf ganze Drehzahlen ab
+        command = np.trunc(pid(measured, dt))
+
+        error = value - target
+        last_outside_band[np.abs(error) > band] = i
+        np.maximum(overshoot, -direction * error, out=overshoot)
+        energy += (command / 255.0) ** 3 * fan_watts * dt / 3600.0
+        abs_error += np.abs(error)
+
+    settling = np.where(last_outside_band >= steps - 1, np.inf, (last_outside_band + 1) * dt)
+    return settling, overshoot, energy, abs_error / steps
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--loop', choices=['temp', 'hum'], default='temp')
+    parser.add_argument('--kp', help="Raster 'start:stop:anzahl'")
+    parser.add_argument('--ki')
+    parser.add_argument('--kd')
+    parser.add_argument('--target', type=float, help="Sollwert (Standard: 22 °C bzw. 50 %%)")
+    parser.add_argument('--hours', type=float, default=2.0)
+    parser.add_argument('--dt', type=float, default=1.0, help="Abstand der Sensorzeilen in s")
+    parser.add_argument('--start-hour', type=float, default=6.0, help="Uhrzeit des Sprungs (Tagesgang außen)")
+    parser.add_argument('--band', type=float, help="Toleranzband für die Einschwingzeit (Standard: 0.3 K bzw. 1 %%)")
+    parser.add_argument('--max-overshoot', type=float, default=0.5)
+    parser.add_argument('--fan-watts', type=float, default=30.0, help="Leistung des Lüfters bei voller Drehzahl")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--csv', help="Alle Ergebnisse als CSV schreiben")
+    args = parser.parse_args()
+
+    grid = DEFAULT_GRID[args.loop]
+    kp, ki, kd = make_grid(parse_range(args.kp or grid['kp']), parse_range(args.ki or grid['ki']),
+                           parse_range(args.kd or grid['kd']), include=CURRENT_GAINS[args.loop])
+    target = args.target if args.target is not None else (22.0 if args.loop == 'temp' else 50.0)
+    band = args.band if args.band is not None else (0.3 if args.loop == 'temp' else 1.0)
+
+    n = kp.shape[0]
+    settling = np.zeros(n)
+    overshoot = np.zeros(n)
+    energy = np.zeros(n)
+    mae = np.zeros(n)
+    start = time.perf_counter()
+    for overrides in SCENARIOS.values():
+        s, o, e, m = simulate(args.loop, kp, ki, kd, replace(PlantParams(), **overrides), target,
+                              args.hours, args.dt, args.start_hour, band, args.fan_watts, args.seed)
+        # Schlechtester Fall über alle Szenarien, Energie als Mittel
+        np.maximum(settling, s, out=settling)
+        np.maximum(overshoot, o, out=overshoot)
+        np.maximum(mae, m, out=mae)
+        energy += e / len(SCENARIOS)
+    elapsed = time.perf_counter() - start
+
+    unit = 'K' if args.loop == 'temp' else '%'
+    print(f"{n} Parametersätze x {len(SCENARIOS)} Szenarien x {int(args.hours * 3600 / args.dt)} Schritte "
+          f"in {elapsed:.1f} s")
+
+    def row(i):
+        settle = f"{settling[i] / 60:6.1f} min" if np.isfinite(settling[i]) else "     nie  "
+        return (f"{kp[i]:8.3f} {ki[i]:8.4f} {kd[i]:8.3f}  {settle}  {overshoot[i]:6.2f} {unit}  "
+                f"{energy[i]:6.2f} Wh  {mae[i]:6.3f} {unit}")
+
+    header = f"{'Kp':>8} {'Ki':>8} {'Kd':>8}  {'Einschwingen':>10}  {'Übersch.':>8}  {'Energie':>9}  {'Abw.':>8}"
+    # Rangfolge: Überschwingen begrenzt, dann Einschwingzeit, dann Energie
+    allowed = overshoot <= args.max_overshoot
+    order = np.lexsort((energy, settling, ~allowed))
+    print(f"\nBeste {args.top} (Überschwingen <= {args.max_overshoot} {unit}):")
+    print(header)
+    for i in order[:args.top]:
+        if allowed[i]:
+            print(row(i))
+    print(f"\nAktuell ({', '.join(str(g) for g in CURRENT_GAINS[args.loop])}):")
+    print(header)
+    print(row(n - 1))
+
+    if args.csv:
+        with open(args.csv, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['kp', 'ki', 'kd', 'settling_s', 'overshoot', 'energy_wh', 'mae'])
+            for i in order:
+                writer.writerow([kp[i], ki[i], kd[i], settling[i], overshoot[i], energy[i], mae[i]])
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,15 @@
 // Konfiguration - Zeigt auf deine Raspberry Pi IP (falls nicht lokal)
 const API_BASE = 'http://localhost:5001';
 
+// Raum aus der Adresse (index.html?room=keller); ohne Angabe liefert die API den Standardraum
+const ROOM = new URLSearchParams(window.location.search).get('room');
+const ROOM_QUERY = ROOM ? `room=${encodeURIComponent(ROOM)}` : '';
+
+function apiUrl(path, query = '') {
+    const params = [query, ROOM_QUERY].filter(Boolean).join('&');
+    return `${API_BASE}${path}${params ? '?' + params : ''}`;
+}
+
 // --- Gauge Diagramme (Tacho) ---
 const gaugeOptions = {
     rotation: -90,
@@ -97,6 +106,7 @@ const autoGroup = document.getElementById('autoControlGroup');
 
 // State
 let currentMode = 'TEMP';
+const HISTORY_POINTS = 20; // Punkte im Verlaufs-Diagramm
 
 function updateUIForMode(mode) {
     currentMode = mode;
@@ -126,76 +136,93 @@ async function updateLive() {
         const controller = new AbortController();
         const timeoutId = setTimeout(() => controller.abort(), 1000); // 1 Sekunde Timeout
 
-        const response = await fetch(`${API_BASE}/api/live`, { signal: controller.signal });
+        const response = await fetch(apiUrl('/api/live'), { signal: controller.signal });
         clearTimeout(timeoutId);
 
         if (!response.ok) throw new Error('Network response was not ok');
 
-        const data = await response.json();
+        renderLive(await response.json());
+    } catch (error) {
+        console.warn('Fetch error (Entering Demo Mode):', error);
+        renderDemo();
+    }
+}
 
-        // Status Aktualisierung
-        statusBadge.className = 'badge bg-success';
-        statusBadge.textContent = 'Online';
-
-        // Aktualisiere Gauges
-        const t = data.temperature || 0;
-        document.getElementById('tempValue').textContent = `${t.toFixed(1)} °C`;
-        tempGauge.data.datasets[0].data = [t, 50 - t];
-        tempGauge.update();
-
-        const h = data.humidity || 0;
-        document.getElementById('humValue').textContent = `${h.toFixed(1)} %`;
-        humGauge.data.datasets[0].data = [h, 100 - h];
-        humGauge.update();
-
-        // Aktualisiere Lüfter
-        const f = data.fan_speed || 0;
-        const fPercent = Math.round((f / 255) * 100);
-        document.getElementById('fanSpeedValue').textContent = `${fPercent} %`;
-        document.getElementById('fanProgressBar').style.width = `${fPercent}%`;
-
-        // Aktualisiere Steuerungslogik (Sync vom Server wenn nicht gerade gezogen wird?)
-        if (data.control_mode && data.control_mode !== currentMode) {
-            updateUIForMode(data.control_mode);
-        }
+function renderLive(data) {
+    // Status Aktualisierung
+    statusBadge.className = 'badge bg-success';
+    statusBadge.textContent = 'Online';
+
+    // Aktualisiere Gauges
+    const t = data.temperature || 0;
+    document.getElementById('tempValue').textContent = `${t.toFixed(1)} °C`;
+    tempGauge.data.datasets[0].data = [t, 50 - t];
+    tempGauge.update();
+
+    const h = data.humidity || 0;
+    document.getElementById('humValue').textContent = `${h.toFixed(1)} %`;
+    humGauge.data.datasets[0].data = [h, 100 - h];
+    humGauge.update();
+
+    // Aktualisiere Lüfter
+    const f = data.fan_speed || 0;
+    const fPercent = Math.round((f / 255) * 100);
+    document.getElementById('fanSpeedValue').textContent = `${fPercent} %`;
+    document.getElementById('fanProgressBar').style.width = `${fPercent}%`;
+
+    // Aktualisiere Steuerungslogik (Sync vom Server wenn nicht gerade gezogen wird?)
+    if (data.control_mode && data.control_mode !== currentMode) {
+        updateUIForMode(data.control_mode);
+    }
+
+    // Aktualisiere Auto-Anzeigewerte
+    const tTemp = data.target_temperature || 22.0;
+    const tHum = data.target_humidity || 50.0;
+    if (document.getElementById('autoTempDisplay')) document.getElementById('autoTempDisplay').textContent = `${tTemp.toFixed(1)} °C`;
+    if (document.getElementById('autoHumDisplay')) document.getElementById('autoHumDisplay').textContent = `${tHum.toFixed(1)} %`;
+}
 
-        // Aktualisiere Auto-Anzeigewerte
-        const tTemp = data.target_temperature || 22.0;
-        const tHum = data.target_humidity || 50.0;
-        if (document.getElementById('autoTempDisplay')) document.getElementById('autoTempDisplay').textContent = `${tTemp.toFixed(1)} °C`;
-        if (document.getElementById('autoHumDisplay')) document.getElementById('autoHumDisplay').textContent = `${tHum.toFixed(1)} %`;
+function renderDemo() {
+    statusBadge.className = 'badge bg-warning text-dark';
+    statusBadge.textContent = 'Demo Mode (Backend Unavailable)';
 
-    } catch (error) {
-        console.warn('Fetch error (Entering Demo Mode):', error);
-        statusBadge.className = 'badge bg-warning text-dark';
-        statusBadge.textContent = 'Demo Mode (Backend Unavailable)';
+    // Mock Daten (Demo Modus)
+    const t = 22.5 + Math.random() * 2 - 1;
+    const h = 45.0 + Math.random() * 5 - 2.5;
+    const f = 120 + Math.random() * 20 - 10;
 
-        // Mock Daten (Demo Modus)
-        const t = 22.5 + Math.random() * 2 - 1;
-        const h = 45.0 + Math.random() * 5 - 2.5;
-        const f = 120 + Math.random() * 20 - 10;
+    document.getElementById('tempValue').textContent = `${t.toFixed(1)} °C`;
+    tempGauge.data.datasets[0].data = [t, 50 - t];
+    tempGauge.update();
 
-        document.getElementById('tempValue').textContent = `${t.toFixed(1)} °C`;
-        tempGauge.data.datasets[0].data = [t, 50 - t];
-        tempGauge.update();
+    document.getElementById('humValue').textContent = `${h.toFixed(1)} %`;
+    humGauge.data.datasets[0].data = [h, 100 - h];
+    humGauge.update();
 
-        document.getElementById('humValue').textContent = `${h.toFixed(1)} %`;
-        humGauge.data.datasets[0].data = [h, 100 - h];
-        humGauge.update();
+    const fPercent = Math.round((f / 255) * 100);
+    document.getElementById('fanSpeedValue').textContent = `${fPercent} %`;
+    document.getElementById('fanProgressBar').style.width = `${fPercent}%`;
 
-        const fPercent = Math.round((f / 255) * 100);
-        document.getElementById('fanSpeedValue').textContent = `${fPercent} %`;
-        document.getElementById('fanProgressBar').style.width = `${fPercent}%`;
+    // Mock Auto-Anzeigewerte
+    if (document.getElementById('autoTempDisplay')) document.getElementById('autoTempDisplay').textContent = `22.0 °C`;
+    if (document.getElementById('autoHumDisplay')) document.getElementById('autoHumDisplay').textContent = `50.0 %`;
+}
 
-        // Mock Auto-Anzeigewerte
-        if (document.getElementById('autoTempDisplay')) document.getElementById('autoTempDisplay').textContent = `22.0 °C`;
-        if (document.getElementById('autoHumDisplay')) document.getElementById('autoHumDisplay').textContent = `50.0 %`;
+// Hängt einen neuen Verlaufspunkt aus dem Stream an (ohne /api/history neu zu laden)
+function appendHistoryPoint(d) {
+    historyChart.data.labels.push(new Date(d.timestamp).toLocaleTimeString());
+    historyChart.data.datasets[0].data.push(d.temperature);
+    historyChart.data.datasets[1].data.push(d.humidity);
+    if (historyChart.data.labels.length > HISTORY_POINTS) {
+        historyChart.data.labels.shift();
+        historyChart.data.datasets.forEach(ds => ds.data.shift());
     }
+    historyChart.update();
 }
 
 async function updateHistory() {
     try {
-        const response = await fetch(`${API_BASE}/api/history?limit=20`);
+        const response = await fetch(apiUrl('/api/history', `limit=${HISTORY_POINTS}`));
         const data = await response.json();
 
         const labels = data.map(d => new Date(d.timestamp).toLocaleTimeString());
@@ -230,7 +257,7 @@ async function updateHistory() {
 
 // --- Interaktion ---
 function sendSettings(payload) {
-    fetch(`${API_BASE}/api/settings`, {
+    fetch(apiUrl('/api/settings'), {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify(payload)
@@ -260,9 +287,41 @@ if (modeTempBtn) modeTempBtn.addEventListener('change', () => { updateUIForMode(
 if (modeHumBtn) modeHumBtn.addEventListener('change', () => { updateUIForMode('HUM'); sendSettings({ control_mode: 'HUM' }); });
 if (modeAutoBtn) modeAutoBtn.addEventListener('change', () => { updateUIForMode('AUTO'); sendSettings({ control_mode: 'AUTO' }); });
 
+// --- Live-Daten: Server-Sent Events, Polling nur als Fallback ---
+let pollingStarted = false;
+
+function startPolling() {
+    if (pollingStarted) return;
+    pollingStarted = true;
+    setInterval(updateLive, 2000);
+    setInterval(updateHistory, 10000);
+    updateLive();
+}
+
+function startStream() {
+    if (!window.EventSource) {
+        startPolling();
+        return;
+    }
+    const source = new EventSource(apiUrl('/api/stream'));
+    let opened = false;
+    source.onopen = () => { opened = true; };
+    source.addEventListener('live', (e) => renderLive(JSON.parse(e.data)));
+    source.addEventListener('reading', (e) => appendHistoryPoint(JSON.parse(e.data)));
+    source.onerror = () => {
+        // Nie verbunden (z.B. älteres Backend oder offline): auf Polling umschalten.
+        // Bestehende Streams verbindet der Browser selbst neu.
+        if (!opened) {
+            source.close();
+            startPolling();
+        } else {
+            statusBadge.className = 'badge bg-warning text-dark';
+            statusBadge.textContent = 'Verbinde...';
+        }
+    };
+}
+
 // --- Initialisierung ---
 updateUIForMode('TEMP'); // Standard
-setInterval(updateLive, 2000);
-setInterval(updateHistory, 10000);
-updateLive();
 updateHistory();
+startStream();
@@ -1,12 +1,14 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import serial
 import serial.tools.list_ports
 import time
 import threading
 import json
-import collections
 import random
+from dataclasses import dataclass, fields, replace
+from datetime import datetime
 
 # --- CONFIGURATION ---
 st.set_page_config(
@@ -17,8 +19,113 @@ st.set_page_config(
 )
 
 # Constants
-MAX_HISTORY = 120 # Save last 120 seconds (approx) for charts
+MAX_HISTORY = 4 * 3600 # ~2 hours of charts at the Arduino's 500 ms telemetry rate
+HISTORY_SLACK = 256 # extra slots so readers' views survive this many further appends
 BAUD_RATE = 115200
+LOCAL_TZ = datetime.now().astimezone().tzinfo
+
+# --- HISTORY BUFFER ---
+class RingBuffer:
+    """Fixed-capacity sample history: epoch float64 timestamps, float32 values.
+
+    Every sample is written twice (slot i and i + size), so the newest n samples
+    are always one contiguous range and readers get plain numpy views, no copy.
+    Not synchronized itself; SerialHandler calls it under its lock.
+    """
+
+    def __init__(self, capacity, fields, slack=HISTORY_SLACK):
+        self.capacity = capacity
+        self.size = capacity + slack
+        self.count = 0 # samples ever written
+        self.generation = 0 # bumped by clear(), so a reader can tell its seq is from before
+        self.time = np.zeros(2 * self.size, dtype=np.float64)
+        self.columns = {name: np.zeros(2 * self.size, dtype=np.float32) for name in fields}
+
+    def append(self, timestamp, **values):
+        i = self.count % self.size
+        for j in (i, i + self.size):
+            self.time[j] = timestamp
+            for name, column in self.columns.items():
+                value = values.get(name)
+                column[j] = np.nan if value is None else value # sensor errors arrive as null
+        self.count += 1
+
+    def clear(self):
+        self.count = 0
+        self.generation += 1
+
+    def since(self, seq):
+        """Views on the samples written after `seq` (at most `capacity`), the new seq and the generation.
+
+        A view stays valid until `slack` more samples have been appended, so copy
+        it (e.g. into a DataFrame) right away.
+        """
+        n = min(max(self.count - seq, 0), self.capacity)
+        end = (self.count - 1) % self.size + 1 + self.size if self.count else 0
+        window = slice(end - n, end)
+        columns = {name: column[window] for name, column in self.columns.items()}
+        return self.time[window], columns, self.count, self.generation
+
+# --- SERIAL FRAMING ---
+class LineFramer:
+    """Splits the serial byte stream into lines without readline() per line.
+
+    Whatever one read() returns is appended to a bytearray; feed() hands back all
+    complete lines at once as memoryviews (no copy, '\n' stripped). Only the
+    incomplete tail is copied into a fresh buffer, so returned views stay valid.
+    """
+
+    def __init__(self, max_size=4096):
+        self.max_size = max_size
+        self.buf = bytearray()
+
+    def feed(self, data):
+        buf = self.buf
+        buf += data
+        end = buf.find(b'\n')
+        if end == -1:
+            if len(buf) > self.max_size: # no line end in sight, e.g. wrong baud rate
+                buf.clear()
+            return []
+
+        view = memoryview(buf)
+        lines = []
+        pos = 0
+        while end != -1:
+            lines.append(view[pos:end])
+            pos = end + 1
+            end = buf.find(b'\n', pos)
+        self.buf = bytearray(view[pos:])
+        return lines
+
+
+def parse_line(line):
+    """One JSON line (memoryview) -> dict, None for boot messages and garbage.
+
+    The '{' check runs on the bytes, so only a candidate line is turned into a str
+    (once); json.loads skips the trailing '\r' itself.
+    """
+    if not line or line[0] != 0x7B: # '{'
+        return None
+    try:
+        data = json.loads(str(line, 'utf-8', 'ignore'))
+    except json.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
+
+# --- LIVE STATE ---
+@dataclass(frozen=True)
+class LiveState:
+    """Immutable snapshot of the controller state. Never modified, only replaced."""
+    temp: float = 0.0
+    hum: float = 0.0
+    target_temp: float = 25.0
+    target_hum: float = 50.0
+    fan_speed: int = 0
+    mode: str = "UNKNOWN"
+    last_update: float = None
+
+LIVE_STATE_FIELDS = {f.name for f in fields(LiveState)}
 
 # --- SERIAL HANDLER (SINGLETON) ---
 class SerialHandler:
@@ -26,19 +133,12 @@ class SerialHandler:
         self.ser = None
         self.running = False
         self.thread = None
-        self.lock = threading.Lock()
+        self.lock = threading.Lock() # serializes writers (serial/sim thread, UI commands)
         
-        # Data Storage
-        self.data_history = collections.deque(maxlen=MAX_HISTORY)
-        self.current_state = {
-            "temp": 0.0,
-            "hum": 0.0,
-            "target_temp": 25.0,
-            "target_hum": 50.0,
-            "fan_speed": 0,
-            "mode": "UNKNOWN",
-            "last_update": None
-        }
+        # Data Storage: chart history, preallocated once
+        self.history = RingBuffer(MAX_HISTORY, ("temp", "hum"))
+        # Current snapshot; readers just take the reference, no lock and no copy
+        self.state = LiveState()
         
         # Simulation
         self.simulation_mode = False
@@ -72,7 +172,7 @@ class SerialHandler:
         
         # Clear Data
         with self.lock:
-            self.data_history.clear()
+            self.history.clear()
 
     def send_command(self, cmd_string):
         """Sends a raw string command to the Arduino."""
@@ -81,21 +181,21 @@ class SerialHandler:
             # Simulate immediate state update for responsiveness
             if "MODE:" in cmd_string:
                 mode = cmd_string.split(":")[1].strip()
-                with self.lock: self.current_state["mode"] = mode
+                with self.lock: self._publish(mode=mode)
             if "SET_SPEED:" in cmd_string:
                 try:
                     speed = int(cmd_string.split(":")[1].strip())
-                    with self.lock: self.current_state["fan_speed"] = speed
+                    with self.lock: self._publish(fan_speed=speed)
                 except: pass
             if "SET_TEMP:" in cmd_string:
                 try:
                     val = float(cmd_string.split(":")[1].strip())
-                    with self.lock: self.current_state["target_temp"] = val
+                    with self.lock: self._publish(target_temp=val)
                 except: pass
             if "SET_HUM:" in cmd_string:
                 try:
                     val = float(cmd_string.split(":")[1].strip())
-                    with self.lock: self.current_state["target_hum"] = val
+                    with self.lock: self._publish(target_hum=val)
                 except: pass
             return
 
@@ -107,18 +207,20 @@ class SerialHandler:
                 print(f"Send Error: {e}")
 
     def _worker(self):
-        """Reads JSON lines from Serial."""
+        """Reads JSON lines from Serial: all waiting bytes in one read(), all lines in one pass."""
+        framer = LineFramer()
+        last_batch = time.time()
         while self.running and self.ser and self.ser.is_open:
             try:
-                if self.ser.in_waiting:
-                    line = self.ser.readline().decode('utf-8', errors='ignore').strip()
-                    if line.startswith('{') and line.endswith('}'):
-                        try:
-                            data = json.loads(line)
-                            self._update_state(data)
-                        except json.JSONDecodeError:
-                            pass
-                time.sleep(0.01)
+                waiting = self.ser.in_waiting
+                if not waiting:
+                    time.sleep(0.01)
+                    continue
+                messages = [data for data in map(parse_line, framer.feed(self.ser.read(waiting))) if data]
+                if messages:
+                    now = time.time()
+                    self._update_state(messages, last_batch, now)
+                    last_batch = now
             except Exception:
                 break
 
@@ -130,15 +232,17 @@ class SerialHandler:
         while self.running:
             with self.lock:
                 # Get current settings
-                target_temp = self.current_state.get("target_temp", 25.0)
-                mode = self.current_state.get("mode", "AUTO")
+                state = self.state
+                target_temp = state.target_temp
+                mode = state.mode
+                fan_speed = state.fan_speed
                 
                 # --- 1. PHYSICS SIMULATION ---
                 # Natural heating (room gets warmer)
                 temp += random.uniform(0.05, 0.15)
                 
                 # Active Cooling (if fan is running)
-                fan_cooling_factor = (self.current_state.get("fan_speed", 0) / 255.0) * 0.3
+                fan_cooling_factor = (fan_speed / 255.0) * 0.3
                 temp -= fan_cooling_factor
                 
                 # Humidity random walk
@@ -160,41 +264,63 @@ class SerialHandler:
                         
                         factor = delta / temp_range
                         # Map to [60...255]
-                        speed = int(60 + (factor * (255 - 60)))
-                        self.current_state["fan_speed"] = speed
+                        fan_speed = int(60 + (factor * (255 - 60)))
                     else:
-                        self.current_state["fan_speed"] = 0
+                        fan_speed = 0
 
                 # Update State
-                self.current_state["temp"] = round(temp, 1)
-                self.current_state["hum"] = round(hum, 1)
-                self.current_state["last_update"] = time.time()
+                self._publish(temp=round(temp, 1), hum=round(hum, 1), fan_speed=fan_speed, last_update=time.time())
                 
                 # Store History
-                self.data_history.append({
-                    "timestamp": pd.Timestamp.now(),
-                    "temp": self.current_state["temp"],
-                    "hum": self.current_state["hum"]
-                })
+                self._append_history()
             
             time.sleep(0.5)
 
-    def _update_state(self, new_data):
+    def _update_state(self, messages, start, end):
+        """Applies a batch of parsed lines under one lock acquisition.
+
+        The lines arrived some time after `start` (the previous batch), so their timestamps
+        are spread evenly up to `end`; every chart row keeps its own index.
+        """
+        step = (end - start) / len(messages)
         with self.lock:
-            # Update Current State
-            self.current_state.update(new_data)
-            self.current_state["last_update"] = time.time()
-            
-            # Append to History
-            self.data_history.append({
-                "timestamp": pd.Timestamp.now(),
-                "temp": self.current_state.get("temp", 0),
-                "hum": self.current_state.get("hum", 0)
-            })
-
-    def get_data(self):
+            for i, new_data in enumerate(messages, 1):
+                # Update Current State (unknown keys from the Arduino are ignored)
+                changes = {k: v for k, v in new_data.items() if k in LIVE_STATE_FIELDS}
+                changes["last_update"] = start + i * step
+                self._publish(**changes)
+
+                # Append to History
+                self._append_history()
+
+    def _publish(self, **changes):
+        """Swaps in a new snapshot with `changes` applied. Caller holds the lock."""
+        self.state = replace(self.state, **changes)
+
+    def _append_history(self):
+        """Writes the current temp/hum into the ring buffer. Caller holds the lock."""
+        state = self.state
+        self.history.append(state.last_update, temp=state.temp, hum=state.hum)
+
+    def get_state(self):
+        return self.state # immutable, safe to use without the lock
+
+    def get_history_since(self, cursor=None):
+        """Returns the chart points written after `cursor`, the new cursor and whether it was stale.
+
+        A cursor is (generation, seq); None means the whole buffer. A cursor from before
+        the last clear() (e.g. another session disconnected) or ahead of the buffer is
+        stale: the whole buffer comes back and the caller has to redraw, not append.
+        """
         with self.lock:
-            return self.current_state.copy(), list(self.data_history)
+            generation = self.history.generation
+            stale = cursor is not None and (cursor[0] != generation or cursor[1] > self.history.count)
+            seq = 0 if cursor is None or stale else cursor[1]
+            times, columns, count, generation = self.history.since(seq) # views, O(1) under the lock
+
+        # Copied into the DataFrame outside the lock; local wall-clock time like before
+        index = pd.to_datetime(times, unit="s", utc=True).tz_convert(LOCAL_TZ).tz_localize(None)
+        return pd.DataFrame(columns, index=index.rename("timestamp"), copy=True), (generation, count), stale
 
 # --- CACHING ---
 @st.cache_resource
@@ -239,33 +365,40 @@ with st.sidebar:
 st.title("Raumautomation Dashboard 🎛️")
 
 @st.fragment(run_every=1)
-def show_live_data():
+def show_live_data(chart):
     # Fetch latest data
-    state, history = handler.get_data()
+    state = handler.get_state()
 
     # Metrics Row
     m1, m2, m3, m4 = st.columns(4)
-    m1.metric("Temperatur", f"{state.get('temp', '--')} °C", border=True)
-    m2.metric("Luftfeuchtigkeit", f"{state.get('hum', '--')} %", border=True)
-    m3.metric("Lüfter", f"{state.get('fan_speed', 0)}", border=True)
-    m4.metric("Modus", state.get('mode', '--'), border=True)
+    m1.metric("Temperatur", f"{state.temp} °C", border=True)
+    m2.metric("Luftfeuchtigkeit", f"{state.hum} %", border=True)
+    m3.metric("Lüfter", f"{state.fan_speed}", border=True)
+    m4.metric("Modus", state.mode, border=True)
 
     # Visual Fan Speed
-    fan_val = int(state.get('fan_speed', 0))
+    fan_val = int(state.fan_speed)
     fan_pct = min(1.0, max(0.0, fan_val / 255.0))
     st.caption(f"Lüfter-Leistung: {int(fan_pct * 100)}%")
     st.progress(fan_pct)
 
-    # Charts
-    if len(history) > 0:
-        df = pd.DataFrame(history).set_index("timestamp")
-        st.line_chart(df[["temp", "hum"]], height=350)
-    else:
+    # Charts: only send the points since the last tick, the chart itself lives outside the fragment
+    new_rows, st.session_state.chart_cursor, stale = handler.get_history_since(st.session_state.chart_cursor)
+    if stale:
+        st.rerun() # history was cleared meanwhile (disconnect/reconnect), redraw the chart from scratch
+    if len(new_rows) > 0:
+        chart.add_rows(new_rows)
+    if st.session_state.chart_cursor[1] == 0:
         st.info("Warte auf Daten...")
 
 # Show the live data fragment
 if handler.running:
-    show_live_data()
+    live_area = st.container()
+    # Full reruns draw the whole buffer once, fragment reruns only append
+    history, st.session_state.chart_cursor, _ = handler.get_history_since()
+    chart = st.line_chart(history, height=350)
+    with live_area:
+        show_live_data(chart)
 else:
     st.info("Bitte verbinden Starten, um Daten zu sehen.")
 
@@ -278,10 +411,10 @@ st.subheader("⚙️ Steuerung")
 # Actually, st.fragment is best for the *output*. Controls should probably trigger updates.
 # Let's keep controls simple.
 
-state, _ = handler.get_data() # snapshot for controls
+state = handler.get_state() # snapshot for controls
 
 # Mode Toggle
-is_auto = (state.get("mode") == "AUTO")
+is_auto = (state.mode == "AUTO")
 mode_toggle = st.toggle("Automatik-Modus", value=is_auto, key="mode_toggle")
 
 if mode_toggle != is_auto:
@@ -302,7 +435,7 @@ with c1:
     # We use a key for the slider. If we want 2-way sync it's complex using st.fragment.
     # User asked for "Slider AND Number".
     
-    current_target_temp = state.get("target_temp", 25.0)
+    current_target_temp = state.target_temp
     
     # Callback to send command immediately
     def update_temp():
@@ -323,7 +456,7 @@ with c1:
 
 with c2:
     st.markdown("**Soll-Feuchtigkeit (%)**")
-    current_target_hum = state.get("target_hum", 50.0)
+    current_target_hum = state.target_hum
 
     def update_hum():
         val = st.session_state.target_hum_slider
@@ -346,7 +479,7 @@ st.markdown("### 💨 Lüftergeschwindigkeit (Manuell)")
 fan_speed = st.slider(
     "PWM Wert (0-255)", 
     0, 255, 
-    value=int(state.get("fan_speed", 0)), 
+    value=int(state.fan_speed), 
     disabled=is_auto,
     key="fan_slider"
 )
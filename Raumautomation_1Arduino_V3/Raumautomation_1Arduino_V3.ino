@@ -4,6 +4,13 @@
  * Lüftersteuerung basierend auf AM2315 Temperatur/Feuchtigkeitssensor.
  * Kommunikation über Serial mittels JSON.
  *
+ * Binärprotokoll (optional, siehe protocol.py):
+ * Auf {"proto":1} antwortet der Sketch mit {"proto":1} und sendet den Status
+ * danach als Rahmen 0x00 + COBS(0x20, Nutzdaten, CRC-16 CCITT) + 0x00:
+ * int16 temp*10, uint16 hum*10, uint8 pwm, uint8 mode, uint8 sub, int16 target.
+ * 15 statt ~50-75 Bytes je Status (bei 9600 Baud ~16 statt ~60 ms).
+ * Befehle bleiben JSON. Nach einem Reset wieder JSON, bis der Server erneut fragt.
+ *
  * Hardware:
  * - Arduino Uno
  * - AM2315 Sensor an I2C (SDA, SCL)
@@ -44,6 +51,10 @@ int manualTargetPwm = 0; // Manuell gesetzter PWM Wert
 StaticJsonDocument<300> docOut;
 StaticJsonDocument<300> docIn;
 
+// Binärprotokoll
+bool binaryMode = false; // Vom Server per {"proto":1} eingeschaltet
+const uint8_t MSG_STATUS = 0x20;
+
 void setup() {
   Serial.begin(9600);
   pinMode(FAN_PIN, OUTPUT);
@@ -154,6 +165,10 @@ void checkSerialInput() {
 
     DeserializationError error = deserializeJson(docIn, input);
     if (!error) {
+      if (docIn.containsKey("proto")) {
+        Serial.println(F("{\"proto\":1}"));
+        binaryMode = true;
+      }
       if (docIn.containsKey("mode")) {
         String m = docIn["mode"];
         if (m == "auto") {
@@ -186,6 +201,11 @@ void checkSerialInput() {
  * Sendet Status
  */
 void sendStatus() {
+  if (binaryMode) {
+    sendStatusFrame();
+    return;
+  }
+
   docOut.clear();
   docOut["temp"] = temp;
   docOut["hum"] = hum;
@@ -206,3 +226,73 @@ void sendStatus() {
   serializeJson(docOut, Serial);
   Serial.println();
 }
+
+/**
+ * CRC-16/CCITT-FALSE (Polynom 0x1021, Start 0xFFFF), wie protocol.crc16()
+ */
+uint16_t crc16(const uint8_t *data, uint8_t len) {
+  uint16_t crc = 0xFFFF;
+  for (uint8_t i = 0; i < len; i++) {
+    crc ^= (uint16_t)data[i] << 8;
+    for (uint8_t bit = 0; bit < 8; bit++)
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+  }
+  return crc;
+}
+
+/**
+ * COBS: ersetzt alle Nullbytes, damit 0x00 die Rahmen eindeutig trennt
+ */
+uint8_t cobsEncode(const uint8_t *in, uint8_t len, uint8_t *out) {
+  uint8_t codeIndex = 0;
+  uint8_t writeIndex = 1;
+  uint8_t code = 1;
+  for (uint8_t i = 0; i < len; i++) {
+    if (in[i] == 0) {
+      out[codeIndex] = code;
+      codeIndex = writeIndex++;
+      code = 1;
+    } else {
+      out[writeIndex++] = in[i];
+      code++;
+    }
+  }
+  out[codeIndex] = code;
+  return writeIndex;
+}
+
+/**
+ * Sendet Status als Binär-Rahmen (Layout siehe Kopf)
+ */
+void sendStatusFrame() {
+  uint8_t sub = 0;
+  int16_t target = manualTargetPwm;
+  if (manualSubMode == "TEMP") {
+    sub = 1;
+    target = (int16_t)round(targetTemp * 10);
+  } else if (manualSubMode == "HUM") {
+    sub = 2;
+    target = (int16_t)round(targetHum * 10);
+  }
+  int16_t t10 = (int16_t)round(temp * 10);
+  uint16_t h10 = (uint16_t)round(hum * 10);
+
+  uint8_t body[12] = {MSG_STATUS,
+                      (uint8_t)(t10 & 0xFF), (uint8_t)(t10 >> 8),
+                      (uint8_t)(h10 & 0xFF), (uint8_t)(h10 >> 8),
+                      (uint8_t)currentPwm,
+                      (uint8_t)(currentMode == "Manual" ? 1 : 0),
+                      sub,
+                      (uint8_t)(target & 0xFF), (uint8_t)(target >> 8)};
+  uint16_t crc = crc16(body, 10);
+  body[10] = crc & 0xFF;
+  body[11] = crc >> 8;
+
+  // Führendes 0x00: der COBS-Code kann wie '\n' oder '\r' aussehen,
+  // server.py erkennt den Rahmenanfang daran
+  uint8_t frame[15];
+  frame[0] = 0x00;
+  uint8_t frameLen = 1 + cobsEncode(body, 12, frame + 1);
+  frame[frameLen++] = 0x00;
+  Serial.write(frame, frameLen);
+}
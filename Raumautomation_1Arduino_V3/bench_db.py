@@ -0,0 +1,57 @@
+"""
+Micro-benchmark: rows/sec of the old per-row logging path (connect, INSERT,
+commit, close for every line) vs. the DataLogger used by serial_worker.
+
+Usage:
+    python3 bench_db.py --rows 2000
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+import server
+from server import DataLogger
+
+
+def log_per_row(db_name, temp, hum, pwm, mode):
+    # Logging path before DataLogger
+    conn = sqlite3.connect(db_name)
+    c = conn.cursor()
+    c.execute("INSERT INTO data (temperature, humidity, pwm, mode) VALUES (?, ?, ?, ?)",
+              (temp, hum, pwm, mode))
+    conn.commit()
+    conn.close()
+
+
+def fresh_db(tmpdir, name):
+    server.DB_NAME = os.path.join(tmpdir, name)
+    server.init_db()
+    return server.DB_NAME
+
+
+def bench(label, rows, log):
+    start = time.perf_counter()
+    for i in range(rows):
+        log(22.0 + (i % 10) * 0.1, 50.0, i % 256, "Auto")
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12} {rows / elapsed:10.0f} rows/s  ({elapsed * 1000 / rows:.3f} ms/row)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_name = fresh_db(tmpdir, "per_row.db")
+        bench("per-row", args.rows, lambda *row: log_per_row(db_name, *row))
+
+        logger = DataLogger(fresh_db(tmpdir, "grouped.db"))
+        bench("DataLogger", args.rows, logger.log)
+        logger.close()
+
+
+if __name__ == '__main__':
+    main()
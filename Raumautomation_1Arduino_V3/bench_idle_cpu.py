@@ -0,0 +1,61 @@
+"""
+Measures the CPU time used by serial_worker while the Arduino is quiet.
+
+A pseudo-terminal (pty) stands in for the Arduino, so no hardware is needed
+(Linux/macOS only). By default the fake device stays completely silent; use
+--report-interval 1 to mimic the once-per-second status reports.
+
+Usage:
+    python3 bench_idle_cpu.py --seconds 60
+"""
+import argparse
+import os
+import pty
+import tempfile
+import threading
+import time
+
+import serial
+
+import server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=60.0)
+    parser.add_argument('--report-interval', type=float, default=0.0,
+                        help="send a status line every N seconds (0 = silent)")
+    args = parser.parse_args()
+
+    master, slave = pty.openpty()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        server.DB_NAME = os.path.join(tmpdir, "idle.db")
+        server.init_db()
+
+        # Pre-connect so the worker skips port discovery
+        server.serial_connection = serial.Serial(os.ttyname(slave), server.SERIAL_BAUDRATE, timeout=1)
+        worker = threading.Thread(target=server.serial_worker, daemon=True)
+        worker.start()
+        time.sleep(0.5)
+
+        cpu_start = time.process_time()
+        wall_start = time.monotonic()
+        while time.monotonic() - wall_start < args.seconds:
+            if args.report_interval > 0:
+                time.sleep(args.report_interval)
+                os.write(master, b'{"temp": 22.4, "hum": 51.0, "pwm": 0, "mode": "Auto"}\n')
+            else:
+                time.sleep(min(1.0, args.seconds))
+        cpu = time.process_time() - cpu_start
+        wall = time.monotonic() - wall_start
+
+        server.stop_event.set()
+        worker.join(timeout=3)
+
+    print(f"Window:   {wall:.1f} s")
+    print(f"CPU time: {cpu:.3f} s ({cpu / wall * 100:.2f} % of one core)")
+
+
+if __name__ == '__main__':
+    main()
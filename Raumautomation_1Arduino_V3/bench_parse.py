@@ -0,0 +1,72 @@
+"""
+Benchmark: status line fast path (parse_status_line) vs. json.loads.
+
+Reads a capture of the Arduino's JSON output (default: corpus/status_lines.txt),
+splits it with the LineFramer like server.py does, checks that parse_line returns
+the same dict as the plain json.loads path for every line, then measures the
+throughput of both (best of --repeat runs).
+
+The capture has status lines in serializeJson format for Auto and all three
+Manual sub-modes, the sensor error line, the HELLO reply and a line with null
+values (NaN from the sensor).
+
+Usage:
+    python3 bench_parse.py
+    python3 bench_parse.py --corpus capture.txt --repeat 20
+"""
+import argparse
+import json
+import os
+import time
+
+from protocol import LineFramer, parse_line, parse_status_line
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus", "status_lines.txt")
+
+
+def parse_json(line):
+    """The generic path: every line through json.loads."""
+    if not line or line[0] != 0x7B: # '{'
+        return None
+    try:
+        data = json.loads(str(line, 'utf-8', 'ignore'))
+    except json.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def timed(fn, lines, repeat):
+    """Best of `repeat` runs, us per line."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for line in lines:
+            fn(line)
+        best = min(best, time.perf_counter() - start)
+    return best / len(lines) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    with open(args.corpus, 'rb') as f:
+        lines = LineFramer(max_size=1 << 30).feed(f.read())
+
+    mismatches = [bytes(line) for line in lines if parse_line(line) != parse_json(line)]
+    if mismatches:
+        raise SystemExit(f"parse_line differs from json.loads on {len(mismatches)} lines, e.g. {mismatches[0]!r}")
+    fast = sum(parse_status_line(line) is not None for line in lines)
+    print(f"{len(lines)} lines from {args.corpus}, {fast} ({fast / len(lines):.1%}) on the fast path, "
+          f"results identical to json.loads")
+
+    print("\nParse (us per line, lines/s):")
+    for name, fn in (("json.loads", parse_json), ("parse_line", parse_line)):
+        per_line = timed(fn, lines, args.repeat)
+        print(f"  {name:11} {per_line:6.2f}  {1e6 / per_line:9.0f}/s")
+
+
+if __name__ == '__main__':
+    main()
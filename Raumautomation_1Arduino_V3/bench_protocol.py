@@ -0,0 +1,100 @@
+"""
+Benchmark: JSON status lines vs. binary status frames (protocol.py).
+
+Prints bytes per status message, the resulting wire time and maximum message
+rate at SERIAL_BAUDRATE (8N1 = 10 bits per byte), and the decode time per
+message for the old readline + json.loads path and for the StreamDecoder with
+JSON lines and with frames. Each message is fed as one chunk, like a serial read;
+with --burst N, N messages arrive per read() (backlog after a stall).
+
+Usage:
+    python3 bench_protocol.py --samples 100000
+    python3 bench_protocol.py --burst 50
+"""
+import argparse
+import json
+import random
+import time
+
+from protocol import StreamDecoder, encode_status
+from server import SERIAL_BAUDRATE
+
+
+def status_json(temp, hum, pwm, mode, sub, target):
+    # Same layout as serializeJson(docOut, Serial) + Serial.println() in the sketch
+    data = {"temp": temp, "hum": hum, "pwm": pwm, "mode": mode}
+    if mode == "Manual":
+        data.update(sub=sub, target=target)
+    return json.dumps(data, separators=(",", ":")).encode("utf-8") + b"\r\n"
+
+
+def decode_old(chunks):
+    count = 0
+    for chunk in chunks:
+        for line in chunk.splitlines(): # one readline() per line
+            line = line.decode('utf-8').strip()
+            if line:
+                json.loads(line)
+                count += 1
+    return count
+
+
+def decode_stream(chunks):
+    decoder = StreamDecoder()
+    count = 0
+    for chunk in chunks:
+        count += len(decoder.feed(chunk))
+    return count
+
+
+def bursts(chunks, size):
+    return [b''.join(chunks[i:i + size]) for i in range(0, len(chunks), size)]
+
+
+def timed(fn, chunks, burst, repeat=3):
+    """Best of `repeat` runs, us per message."""
+    reads = bursts(chunks, burst)
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = fn(reads)
+        best = min(best, time.perf_counter() - start)
+        assert count == len(chunks), (count, len(chunks))
+    return best / len(chunks) * 1e6
+
+
+def random_status(rng):
+    mode = rng.choice(("Auto", "Manual"))
+    sub = rng.choice(("PWM", "TEMP", "HUM"))
+    target = {"PWM": rng.randrange(256), "TEMP": round(rng.uniform(18, 28), 1),
+              "HUM": round(rng.uniform(40, 70), 1)}[sub]
+    return round(rng.uniform(10, 35), 1), round(rng.uniform(20, 90), 1), rng.randrange(256), mode, sub, target
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--samples', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--burst', type=int, default=1, help="messages per read()")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    statuses = [random_status(rng) for _ in range(args.samples)]
+    json_chunks = [status_json(*s) for s in statuses]
+    frame_chunks = [encode_status(*s) for s in statuses]
+
+    print(f"{args.samples} status messages at {SERIAL_BAUDRATE} baud:")
+    for name, chunks in (("JSON", json_chunks), ("binary", frame_chunks)):
+        per_message = sum(map(len, chunks)) / len(chunks)
+        wire_ms = per_message * 10 / SERIAL_BAUDRATE * 1000
+        print(f"  {name:7} {per_message:5.1f} B  {wire_ms:5.1f} ms on the wire  "
+              f"max {SERIAL_BAUDRATE / 10 / per_message:4.0f} msg/s")
+
+    print(f"\nDecode (us per message, {args.burst} per read()):")
+    print(f"  readline + json.loads  {timed(decode_old, json_chunks, args.burst):6.2f}")
+    print(f"  StreamDecoder JSON     {timed(decode_stream, json_chunks, args.burst):6.2f}")
+    print(f"  StreamDecoder binary   {timed(decode_stream, frame_chunks, args.burst):6.2f}")
+
+
+if __name__ == '__main__':
+    main()
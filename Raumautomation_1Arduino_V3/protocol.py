@@ -0,0 +1,266 @@
+"""
+Compact binary status frames from the Arduino, negotiated per connection.
+
+At 9600 baud a JSON status line (~50-75 bytes) costs 50-80 ms of wire time;
+the binary frame is 15 bytes. Commands to the Arduino stay JSON, they are rare.
+
+Frame: 0x00, COBS(type + payload + CRC-16), 0x00. COBS removes every zero byte
+from the frame, so 0x00 is an unambiguous delimiter. After a 0x00 comes a frame
+(a short frame starts with a COBS code < 0x20), otherwise a text line, so both
+can share one stream (the reply to HELLO is still a JSON line). The leading 0x00
+is needed because the COBS code can be 0x0A or 0x0D.
+
+Status payload (little endian, MSG_STATUS):
+    int16  temp * 10
+    uint16 hum * 10
+    uint8  pwm
+    uint8  mode    0 = Auto, 1 = Manual
+    uint8  sub     0 = PWM, 1 = TEMP, 2 = HUM (only meaningful in Manual)
+    int16  target  PWM value, or temp/hum target * 10
+
+Negotiation: server.py writes HELLO. Firmware that knows the frames answers with
+the same line and sends frames from then on; older firmware ignores it and keeps
+sending JSON. The Arduino resets when the port is opened, so every connection
+starts with JSON again.
+"""
+import binascii
+import json
+import re
+import struct
+
+HELLO = b'{"proto":1}\n'
+MAX_HELLOS = 3 # per connection, then assume JSON-only firmware
+
+MSG_STATUS = 0x20
+STATUS = struct.Struct('<hHBBBh')
+CRC = struct.Struct('<H')
+
+MODES = ('Auto', 'Manual')
+SUB_MODES = ('PWM', 'TEMP', 'HUM')
+
+MAX_BUFFER = 4096 # bytes without any delimiter are garbage (e.g. wrong baud rate)
+
+# The status line exactly as serializeJson(docOut, Serial) prints it; any other
+# shape (sensor error, HELLO reply, null values) goes through json.loads.
+_NUMBER = rb'(-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)'
+STATUS_LINE = re.compile(rb'\{"temp":' + _NUMBER + rb',"hum":' + _NUMBER + rb',"pwm":(\d+),"mode":"(Auto|Manual)"'
+                         rb'(?:,"sub":"(PWM|TEMP|HUM)","target":' + _NUMBER + rb')?\}\r?')
+_NAMES = {name.encode(): name for name in MODES + SUB_MODES}
+
+
+def crc16(data):
+    """CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF), same as crc16() in the firmware."""
+    return binascii.crc_hqx(data, 0xFFFF)
+
+
+def cobs_encode(data):
+    out = bytearray(b'\x00')
+    code_index = 0
+    code = 1
+    for byte in data:
+        if byte:
+            out.append(byte)
+            code += 1
+        if not byte or code == 0xFF:
+            out[code_index] = code
+            code_index = len(out)
+            out.append(0)
+            code = 1
+    out[code_index] = code
+    return bytes(out)
+
+
+def cobs_decode(data):
+    out = bytearray()
+    i = 0
+    while i < len(data):
+        code = data[i]
+        if code == 0 or i + code > len(data):
+            raise ValueError("invalid COBS frame")
+        out += data[i + 1:i + code]
+        i += code
+        if code < 0xFF and i < len(data):
+            out.append(0)
+    return bytes(out)
+
+
+def encode_frame(msg_type, payload=b''):
+    body = bytes((msg_type,)) + payload
+    return b'\x00' + cobs_encode(body + CRC.pack(crc16(body))) + b'\x00'
+
+
+def decode_frame(frame):
+    """COBS frame without the trailing 0x00 -> (type, payload); None on a bad frame or CRC."""
+    try:
+        body = cobs_decode(frame)
+    except ValueError:
+        return None
+    if len(body) < 3 or CRC.unpack_from(body, len(body) - 2)[0] != crc16(body[:-2]):
+        return None
+    return body[0], body[1:-2]
+
+
+def encode_status(temp, hum, pwm, mode, sub='PWM', target=0):
+    """Status frame as sent by the firmware (used by the benchmark and for testing without hardware)."""
+    scaled_target = target if sub == 'PWM' else round(target * 10)
+    return encode_frame(MSG_STATUS, STATUS.pack(round(temp * 10), round(hum * 10), pwm,
+                                                MODES.index(mode), SUB_MODES.index(sub), scaled_target))
+
+
+def decode_status(payload):
+    """Status payload -> the same dict the JSON line would have produced."""
+    temp, hum, pwm, mode, sub, target = STATUS.unpack(payload)
+    data = {"temp": temp / 10, "hum": hum / 10, "pwm": pwm, "mode": MODES[mode]}
+    if data["mode"] == "Manual":
+        data["sub"] = SUB_MODES[sub]
+        data["target"] = target if sub == 0 else target / 10
+    return data
+
+
+def parse_status_line(line):
+    """Fast path for the firmware's status line: bytes/memoryview -> the dict json.loads
+    would return (numbers compare equal), without json.loads. None for any other shape.
+    """
+    match = STATUS_LINE.fullmatch(line)
+    if match is None:
+        return None
+    temp, hum, pwm, mode, sub, target = match.groups()
+    data = {"temp": float(temp), "hum": float(hum), "pwm": int(pwm), "mode": _NAMES[mode]}
+    if sub is not None:
+        sub = data["sub"] = _NAMES[sub]
+        data["target"] = int(target) if sub == "PWM" else float(target)
+    return data
+
+
+def parse_line(line):
+    """One JSON line (bytes/memoryview without the '\n') -> dict, None for anything else.
+
+    Status lines take the fast path. For the rest the '{' check runs on the bytes,
+    so only a candidate line is turned into a str (once); json.loads skips the
+    trailing '\r' itself.
+    """
+    data = parse_status_line(line)
+    if data is not None:
+        return data
+    if not line or line[0] != 0x7B: # '{'
+        return None
+    try:
+        data = json.loads(str(line, 'utf-8', 'ignore'))
+    except json.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+class LineFramer:
+    """Splits a byte stream at `delimiter` into units (lines or frames).
+
+    Whatever one read() returns is appended to a bytearray; feed() hands back all
+    complete units at once as memoryviews (no copy, delimiter stripped). Only the
+    incomplete tail is copied into a fresh buffer, so returned views stay valid
+    for as long as they are referenced.
+    """
+
+    def __init__(self, delimiter=b'\n', max_size=MAX_BUFFER):
+        self.delimiter = delimiter
+        self.max_size = max_size
+        self.buf = bytearray()
+        self.errors = 0
+
+    def feed(self, data):
+        buf = self.buf
+        buf += data
+        delimiter = self.delimiter
+        end = buf.find(delimiter)
+        if end == -1:
+            self._trim(0)
+            return []
+
+        view = memoryview(buf)
+        units = []
+        pos = 0
+        while end != -1:
+            units.append(view[pos:end])
+            pos = end + 1
+            end = buf.find(delimiter, pos)
+        # the views belong to the old buffer; carry on with a copy of the tail
+        self.buf = bytearray(view[pos:])
+        self._trim(0)
+        return units
+
+    def _trim(self, pos):
+        """Drop the first `pos` bytes; a tail longer than max_size without a delimiter is garbage."""
+        buf = self.buf
+        del buf[:pos]
+        if len(buf) > self.max_size:
+            self.errors += 1 # e.g. wrong baud rate
+            buf.clear()
+            self._discarded()
+
+    def _discarded(self):
+        pass
+
+
+class StreamDecoder(LineFramer):
+    """Splits the serial byte stream into messages (dicts).
+
+    JSON lines (up to '\n') and binary frames (up to 0x00) may be mixed; an
+    incomplete tail stays buffered until the next feed(). Scans the buffer in
+    one pass and parses units straight from memoryviews.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.after_zero = False
+        self.frames = 0
+        self.lines = 0
+
+    def _discarded(self):
+        self.after_zero = False
+
+    def feed(self, data):
+        buf = self.buf
+        buf += data
+        view = memoryview(buf)
+        messages = []
+        pos = 0
+        after_zero = self.after_zero
+        while pos < len(buf):
+            first = buf[pos]
+            if first == 0:
+                after_zero = True
+                pos += 1
+                continue
+            if first in b'\r\n ' and not after_zero:
+                pos += 1
+                continue
+
+            if first < 0x20:
+                # right after 0x00 a frame starts, even if its COBS code looks like '\n'/'\r'
+                end = buf.find(b'\x00', pos)
+                if end == -1:
+                    break
+                decoded = decode_frame(view[pos:end])
+                try:
+                    if not decoded or decoded[0] != MSG_STATUS:
+                        raise ValueError("unknown frame")
+                    messages.append(decode_status(decoded[1]))
+                    self.frames += 1
+                except (ValueError, IndexError, struct.error):
+                    self.errors += 1
+            else:
+                end = buf.find(b'\n', pos)
+                if end == -1:
+                    break
+                message = parse_line(view[pos:end])
+                if message is None:
+                    self.errors += 1
+                else:
+                    self.lines += 1
+                    messages.append(message)
+            after_zero = first < 0x20 # a frame ends with 0x00, a line with '\n'
+            pos = end + 1
+
+        self.after_zero = after_zero
+        view.release() # no view leaves feed(), so the buffer can be trimmed in place
+        self._trim(pos)
+        return messages
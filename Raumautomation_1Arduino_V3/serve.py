@@ -0,0 +1,49 @@
+"""
+Production entry point: serves the Flask app with waitress instead of the
+Werkzeug development server.
+
+waitress runs every request in one process with a thread pool, so there is
+still exactly one serial_worker owning the Arduino. Multi-process servers
+(gunicorn with several workers) would each try to open the serial port.
+Every open /api/stream connection holds one thread, so pick --threads at
+least as large as the number of dashboards.
+
+Usage:
+    python3 serve.py --threads 32
+"""
+import argparse
+import signal
+import sys
+import threading
+
+from waitress import serve
+
+import server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=server.PORT)
+    parser.add_argument('--threads', type=int, default=32)
+    args = parser.parse_args()
+
+    server.init_db()
+    worker = threading.Thread(target=server.serial_worker, daemon=True)
+    worker.start()
+
+    # Treat SIGTERM (e.g. from systemd) like Ctrl+C so the finally block runs
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    print(f"Server starting at http://{args.host}:{args.port} ({args.threads} threads)")
+    try:
+        serve(server.app, host=args.host, port=args.port, threads=args.threads,
+              connection_limit=max(100, args.threads * 4), channel_timeout=60)
+    finally:
+        # Let the worker commit its pending rows before exiting
+        server.stop_event.set()
+        worker.join(timeout=3)
+
+
+if __name__ == '__main__':
+    main()
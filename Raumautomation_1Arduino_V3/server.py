@@ -2,22 +2,51 @@
 import threading
 import time
 import json
+import queue
 import sqlite3
 import serial
 import serial.tools.list_ports
-from flask import Flask, jsonify, request, send_from_directory
-from datetime import datetime
+from flask import Flask, Response, jsonify, request, send_from_directory
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from protocol import HELLO, MAX_HELLOS, StreamDecoder
 
 # --- CONFIG ---
 DB_NAME = "measurements.db"
 SERIAL_BAUDRATE = 9600
+SERIAL_PROTOCOL = "auto" # "auto" negotiates binary status frames (protocol.py), "json" never asks
 PORT = 8000
+COMMIT_EVERY = 10      # rows per write transaction
+COMMIT_INTERVAL = 5.0  # max. seconds a logged row may stay uncommitted
+HISTORY_LIMIT = 300    # default number of rows/buckets for /api/history
+RESOLUTION_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+ROLLUP_RESOLUTIONS = (60, 3600, 86400)  # 1 min, 1 h, 1 day aggregate levels
+ROLLUP_INTERVAL = 60.0                  # seconds between incremental rollup runs
+RAW_RETENTION_DAYS = 7                  # raw rows older than this are pruned once rolled up
+ROLLUP_RETENTION_DAYS = {60: 30, 3600: 365, 86400: None}  # None = keep forever
 
 app = Flask(__name__)
 
 # --- STATE ---
-# Global state to hold latest data for fast API response
-latest_data = {
+@dataclass(frozen=True)
+class LiveSnapshot:
+    """One published version of the live state. Never modified, only replaced.
+
+    `data` is a fresh dict per snapshot and must be treated as read-only. The JSON
+    body and ETag are encoded once here, /api/live just sends the cached bytes.
+    """
+    seq: int # bumped on every change, used as the /api/live ETag
+    data: dict
+    body: bytes = field(init=False, repr=False, compare=False)
+    etag: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "body", json.dumps(self.data, separators=(",", ":")).encode("utf-8"))
+        object.__setattr__(self, "etag", f"live-{self.seq}")
+
+# Latest snapshot for fast API responses. The serial thread swaps in a new
+# object, request threads read whatever snapshot is current without locking.
+live = LiveSnapshot(0, {
     "temp": 0.0,
     "hum": 0.0,
     "pwm": 0,
@@ -26,11 +55,63 @@ latest_data = {
     "target": 0,
     "timestamp": None,
     "connected": False
-}
+})
 
 serial_connection = None
 stop_event = threading.Event()
 
+# --- LIVE STREAM ---
+class EventBroker:
+    """Fans each state update out to all open /api/stream connections.
+
+    The event is encoded once per update, no matter how many clients listen.
+    """
+
+    def __init__(self, max_queue=100):
+        self.max_queue = max_queue
+        self.subscribers = set()
+        self.lock = threading.Lock()
+
+    def subscribe(self):
+        q = queue.Queue(maxsize=self.max_queue)
+        with self.lock:
+            self.subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self.lock:
+            self.subscribers.discard(q)
+
+    def publish(self, event, data):
+        message = format_event(event, data)
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait(message)
+            except queue.Full:
+                pass # slow client, drop the update instead of blocking the serial thread
+
+def format_event(event, data):
+    """Encodes one SSE message; `data` may already be JSON bytes."""
+    payload = data if isinstance(data, bytes) else json.dumps(data).encode('utf-8')
+    return b"event: " + event.encode('utf-8') + b"\ndata: " + payload + b"\n\n"
+
+broker = EventBroker()
+
+def publish_live(changes):
+    """Builds the next snapshot, swaps it in and pushes it to the stream clients.
+
+    Only the serial thread calls this, so there is a single writer.
+    """
+    global live
+    live = LiveSnapshot(live.seq + 1, {**live.data, **changes})
+    broker.publish("live", live.body)
+
+def set_connected(connected):
+    if live.data["connected"] != connected:
+        publish_live({"connected": connected})
+
 # --- DATABASE ---
 def init_db():
     conn = sqlite3.connect(DB_NAME)
@@ -42,26 +123,157 @@ def init_db():
                   humidity REAL,
                   pwm INTEGER,
                   mode TEXT)''')
+    # Time range and bucket queries in /api/history filter on timestamp
+    c.execute("CREATE INDEX IF NOT EXISTS idx_data_timestamp ON data (timestamp)")
+    # Aggregates per bucket (sums instead of averages so buckets can be extended incrementally)
+    c.execute('''CREATE TABLE IF NOT EXISTS data_rollup
+                 (resolution INTEGER,
+                  bucket_start INTEGER,
+                  count INTEGER,
+                  temperature_sum REAL, temperature_min REAL, temperature_max REAL,
+                  humidity_sum REAL, humidity_min REAL, humidity_max REAL,
+                  pwm_sum REAL, pwm_min INTEGER, pwm_max INTEGER,
+                  PRIMARY KEY (resolution, bucket_start))''')
+    # High-water mark: last data.id already aggregated per level
+    c.execute('''CREATE TABLE IF NOT EXISTS rollup_state
+                 (resolution INTEGER PRIMARY KEY,
+                  last_id INTEGER NOT NULL DEFAULT 0)''')
     conn.commit()
     conn.close()
 
-def log_data(temp, hum, pwm, mode):
-    try:
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute("INSERT INTO data (temperature, humidity, pwm, mode) VALUES (?, ?, ?, ?)",
-                  (temp, hum, pwm, mode))
-        conn.commit()
-        conn.close()
-    except Exception as e:
-        print(f"DB Error: {e}")
+class DataLogger:
+    """Long-lived writer connection, owned by the serial thread.
+
+    Rows are grouped into one transaction and committed every COMMIT_EVERY rows
+    or COMMIT_INTERVAL seconds, whichever comes first. WAL mode lets the Flask
+    threads keep reading history while a write transaction is open.
+    """
+
+    def __init__(self, db_name=None, commit_every=COMMIT_EVERY, commit_interval=COMMIT_INTERVAL):
+        self.db_name = db_name or DB_NAME
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self.conn = None
+        self.pending = 0
+        self.last_commit = time.monotonic()
+        self.last_rollup = 0.0
+
+    def open(self):
+        self.conn = sqlite3.connect(self.db_name)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+
+    def log(self, temp, hum, pwm, mode):
+        try:
+            if self.conn is None:
+                self.open()
+            self.conn.execute("INSERT INTO data (temperature, humidity, pwm, mode) VALUES (?, ?, ?, ?)",
+                              (temp, hum, pwm, mode))
+            self.pending += 1
+            self.maybe_commit()
+        except Exception as e:
+            print(f"DB Error: {e}")
+
+    def maybe_commit(self):
+        if self.pending and (self.pending >= self.commit_every
+                             or time.monotonic() - self.last_commit >= self.commit_interval):
+            self.commit()
+
+    def commit(self):
+        if self.conn is not None and self.pending:
+            self.conn.commit()
+            self.pending = 0
+        self.last_commit = time.monotonic()
+
+    def maintain(self):
+        """Runs the incremental rollup and retention pruning every ROLLUP_INTERVAL seconds."""
+        if time.monotonic() - self.last_rollup < ROLLUP_INTERVAL:
+            return
+        self.last_rollup = time.monotonic()
+        try:
+            if self.conn is None:
+                self.open()
+            self.commit()
+            run_rollup(self.conn)
+            prune(self.conn)
+            self.conn.commit()
+        except Exception as e:
+            # open() itself may have failed, then there is nothing to roll back
+            if self.conn is not None:
+                self.conn.rollback()
+            print(f"Rollup Error: {e}")
+
+    def close(self):
+        if self.conn is not None:
+            self.commit()
+            self.conn.close()
+            self.conn = None
+
+UPSERT_ROLLUP = '''
+    INSERT INTO data_rollup
+    SELECT ?1, CAST(strftime('%s', timestamp) AS INTEGER) / ?1 * ?1 AS bucket, COUNT(*),
+           SUM(temperature), MIN(temperature), MAX(temperature),
+           SUM(humidity), MIN(humidity), MAX(humidity),
+           SUM(pwm), MIN(pwm), MAX(pwm)
+    FROM data
+    WHERE id > ?2 AND id <= ?3
+    GROUP BY bucket
+    ON CONFLICT (resolution, bucket_start) DO UPDATE SET
+        count = count + excluded.count,
+        temperature_sum = COALESCE(temperature_sum + excluded.temperature_sum, temperature_sum, excluded.temperature_sum),
+        temperature_min = COALESCE(MIN(temperature_min, excluded.temperature_min), temperature_min, excluded.temperature_min),
+        temperature_max = COALESCE(MAX(temperature_max, excluded.temperature_max), temperature_max, excluded.temperature_max),
+        humidity_sum = COALESCE(humidity_sum + excluded.humidity_sum, humidity_sum, excluded.humidity_sum),
+        humidity_min = COALESCE(MIN(humidity_min, excluded.humidity_min), humidity_min, excluded.humidity_min),
+        humidity_max = COALESCE(MAX(humidity_max, excluded.humidity_max), humidity_max, excluded.humidity_max),
+        pwm_sum = COALESCE(pwm_sum + excluded.pwm_sum, pwm_sum, excluded.pwm_sum),
+        pwm_min = COALESCE(MIN(pwm_min, excluded.pwm_min), pwm_min, excluded.pwm_min),
+        pwm_max = COALESCE(MAX(pwm_max, excluded.pwm_max), pwm_max, excluded.pwm_max)
+'''
+
+def high_water_mark(conn, resolution):
+    row = conn.execute("SELECT last_id FROM rollup_state WHERE resolution = ?", (resolution,)).fetchone()
+    return row[0] if row else 0
+
+def run_rollup(conn):
+    """Folds all rows newer than each level's high-water mark into data_rollup."""
+    max_id = conn.execute("SELECT MAX(id) FROM data").fetchone()[0] or 0
+    for resolution in ROLLUP_RESOLUTIONS:
+        last_id = high_water_mark(conn, resolution)
+        if last_id >= max_id:
+            continue
+        conn.execute(UPSERT_ROLLUP, (resolution, last_id, max_id))
+        conn.execute("INSERT OR REPLACE INTO rollup_state (resolution, last_id) VALUES (?, ?)", (resolution, max_id))
+
+def prune(conn):
+    """Drops raw rows and fine rollups outside their retention window."""
+    # Raw rows only go once every level has aggregated them
+    aggregated_id = min(high_water_mark(conn, r) for r in ROLLUP_RESOLUTIONS)
+    conn.execute("DELETE FROM data WHERE timestamp < datetime('now', ?) AND id <= ?",
+                 (f"-{RAW_RETENTION_DAYS} days", aggregated_id))
+    for resolution, days in ROLLUP_RETENTION_DAYS.items():
+        if days is not None:
+            conn.execute("DELETE FROM data_rollup WHERE resolution = ? AND bucket_start < strftime('%s', 'now', ?)",
+                         (resolution, f"-{days} days"))
 
 # --- SERIAL WORKER ---
 def serial_worker():
-    global serial_connection, latest_data
+    global serial_connection
     print("Background worker: Starting...")
+    db_logger = DataLogger()
+    decoder = StreamDecoder()
+    binary = False
+    hellos = 0
+
+    def negotiate():
+        nonlocal hellos
+        if SERIAL_PROTOCOL == "auto" and not binary and hellos < MAX_HELLOS:
+            hellos += 1
+            serial_connection.write(HELLO)
 
     while not stop_event.is_set():
+        db_logger.maintain()
+
         if serial_connection is None or not serial_connection.is_open:
             # Try to reconnect
             ports = [p.device for p in serial.tools.list_ports.comports() if 'usbmodem' in p.device or 'usbserial' in p.device or 'COM' in p.device]
@@ -70,42 +282,52 @@ def serial_worker():
                     print(f"Connecting to {ports[0]}...")
                     serial_connection = serial.Serial(ports[0], SERIAL_BAUDRATE, timeout=1)
                     time.sleep(2) # Wait for reset
-                    latest_data["connected"] = True
+                    decoder, binary, hellos = StreamDecoder(), False, 0 # firmware starts with JSON after reset
+                    negotiate()
+                    set_connected(True)
                     print("Connected!")
                 except Exception as e:
                     print(f"Connection failed: {e}")
                     time.sleep(2)
             else:
                 # print("No ports found, waiting...")
-                latest_data["connected"] = False
+                set_connected(False)
                 time.sleep(2)
             continue
         
+        # Commit grouped rows even if the Arduino goes quiet
+        db_logger.maybe_commit()
+
         try:
-            if serial_connection.in_waiting:
-                line = serial_connection.readline().decode('utf-8').strip()
-                if not line:
+            # Blocks until data arrives or the 1 s port timeout expires,
+            # so the thread sleeps while the Arduino is quiet
+            chunk = serial_connection.read(serial_connection.in_waiting or 1)
+            if not chunk:
+                continue
+
+            # JSON lines or binary status frames, the decoder returns the same dicts
+            for data in decoder.feed(chunk):
+                if "proto" in data:
+                    binary = True
+                    print("Arduino sends binary status frames")
                     continue
-                
-                try:
-                    data = json.loads(line)
-                    # Update global state
-                    latest_data.update(data)
-                    latest_data["timestamp"] = datetime.now().isoformat()
-                    latest_data["connected"] = True
-                    
-                    # Log to DB (only if values are valid)
-                    if "temp" in data and "hum" in data:
-                        log_data(data.get("temp", 0), data.get("hum", 0), data.get("pwm", 0), data.get("mode", "Unknown"))
-                        
-                except json.JSONDecodeError:
-                    print(f"Invalid JSON: {line}")
+
+                # Update global state
+                publish_live({**data, "timestamp": datetime.now().isoformat(), "connected": True})
+
+                # Log to DB (only if values are valid)
+                if "temp" in data and "hum" in data:
+                    db_logger.log(data.get("temp", 0), data.get("hum", 0), data.get("pwm", 0), data.get("mode", "Unknown"))
+
+                # HELLO may have been lost while the Arduino was still booting
+                negotiate()
         except Exception as e:
             print(f"Serial Error: {e}")
             serial_connection.close()
             serial_connection = None
-            latest_data["connected"] = False
+            set_connected(False)
             
+    db_logger.close()
     if serial_connection:
         serial_connection.close()
 
@@ -115,23 +337,186 @@ def serial_worker():
 def serve_index():
     return send_from_directory('.', 'index.html')
 
+def not_modified(etag):
+    """304 for a client that already has this state; nothing gets serialized."""
+    response = Response(status=304)
+    return with_etag(response, etag)
+
+def with_etag(response, etag):
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache' # may store, must revalidate with If-None-Match
+    return response
+
 @app.route('/api/live', methods=['GET'])
 def get_live():
-    return jsonify(latest_data)
+    snapshot = live # one consistent version, body and ETag were encoded when it was published
+    if request.if_none_match.contains(snapshot.etag):
+        return not_modified(snapshot.etag)
+    return with_etag(Response(snapshot.body, mimetype='application/json'), snapshot.etag)
+
+@app.route('/api/stream', methods=['GET'])
+def stream():
+    """Server-Sent Events: one 'live' event per state update from the serial thread."""
+    def generate():
+        q = broker.subscribe()
+        try:
+            yield format_event("live", live.body)
+            while True:
+                try:
+                    yield q.get(timeout=15)
+                except queue.Empty:
+                    yield b": keepalive\n\n" # keeps proxies from closing an idle stream
+        finally:
+            broker.unsubscribe(q)
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/api/history', methods=['GET'])
 def get_history():
+    resolution = request.args.get('resolution', request.args.get('bucket'))
+    try:
+        seconds = parse_resolution(resolution) if resolution else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # ETag = newest row id; open-ended bucket queries also change when the window moves on
+    etag = f"history-{newest_row_id()}"
+    if seconds and not request.args.get('to'):
+        etag += f"-{int(time.time()) // seconds}"
+    if request.if_none_match.contains(etag):
+        return not_modified(etag)
+
+    if seconds:
+        try:
+            return with_etag(jsonify(query_buckets(seconds,
+                                                   request.args.get('from'), request.args.get('to'),
+                                                   request.args.get('limit', HISTORY_LIMIT, type=int))), etag)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
     # Get last 300 entries (approx 5 minutes if logged every second)
     conn = sqlite3.connect(DB_NAME)
     conn.row_factory = sqlite3.Row
     c = conn.cursor()
-    c.execute("SELECT * FROM data ORDER BY id DESC LIMIT 300")
+    c.execute("SELECT * FROM data ORDER BY id DESC LIMIT ?", (HISTORY_LIMIT,))
     rows = c.fetchall()
     conn.close()
     
     # Reverse to have oldest first for chart
     data = [dict(row) for row in reversed(rows)]
-    return jsonify(data)
+    return with_etag(jsonify(data), etag)
+
+def newest_row_id():
+    """MAX(id) is a primary key lookup, cheap enough to run on every request."""
+    conn = sqlite3.connect(DB_NAME)
+    row = conn.execute("SELECT MAX(id) FROM data").fetchone()
+    conn.close()
+    return row[0] or 0
+
+def parse_resolution(value):
+    """'300', '5m', '1h', '1d' -> bucket width in seconds."""
+    value = value.strip().lower()
+    factor = RESOLUTION_UNITS.get(value[-1:])
+    seconds = int(value[:-1] if factor else value) * (factor or 1)
+    if seconds <= 0:
+        raise ValueError(f"invalid resolution: {value}")
+    return seconds
+
+def to_db_time(value):
+    """ISO-8601 -> 'YYYY-MM-DD HH:MM:SS' as written by CURRENT_TIMESTAMP (UTC)."""
+    ts = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts.strftime('%Y-%m-%d %H:%M:%S')
+
+def query_buckets(resolution, start=None, end=None, limit=HISTORY_LIMIT):
+    """Aggregates temperature, humidity and pwm per time bucket (min/max/avg) in SQL.
+
+    If the resolution is a multiple of a rollup level, the buckets are built from the
+    small data_rollup table plus the raw rows that have not been rolled up yet.
+    """
+    limit = max(1, min(limit, 5000))
+    end = to_db_time(end) if end else datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+    # Without 'start' the caller wants the newest buckets up to 'end'
+    newest = not start
+    if start:
+        start = to_db_time(start)
+    else:
+        start = (datetime.fromisoformat(end) - timedelta(seconds=resolution * limit)).strftime('%Y-%m-%d %H:%M:%S')
+    # Align to a bucket boundary so the first bucket is complete
+    start_epoch = int(datetime.fromisoformat(start).replace(tzinfo=timezone.utc).timestamp())
+    start_epoch -= start_epoch % resolution
+    start = datetime.fromtimestamp(start_epoch, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    end_epoch = int(datetime.fromisoformat(end).replace(tzinfo=timezone.utc).timestamp())
+
+    level = next((r for r in sorted(ROLLUP_RESOLUTIONS, reverse=True) if resolution % r == 0), None)
+    buckets = {}
+
+    conn = sqlite3.connect(DB_NAME)
+    # One read transaction, so the high-water mark, the rollups and the raw rows come from
+    # the same snapshot even if DataLogger.maintain() commits a rollup in between
+    conn.execute("BEGIN")
+    last_id = 0
+    if level is not None:
+        last_id = high_water_mark(conn, level)
+        merge_partials(buckets, conn.execute("""
+            SELECT bucket_start / ? AS bucket, SUM(count),
+                   SUM(temperature_sum), MIN(temperature_min), MAX(temperature_max),
+                   SUM(humidity_sum), MIN(humidity_min), MAX(humidity_max),
+                   SUM(pwm_sum), MIN(pwm_min), MAX(pwm_max)
+            FROM data_rollup
+            WHERE resolution = ? AND bucket_start >= ? AND bucket_start <= ?
+            GROUP BY bucket""", (resolution, level, start_epoch, end_epoch)))
+
+    merge_partials(buckets, conn.execute("""
+        SELECT CAST(strftime('%s', timestamp) AS INTEGER) / ? AS bucket, COUNT(*),
+               SUM(temperature), MIN(temperature), MAX(temperature),
+               SUM(humidity), MIN(humidity), MAX(humidity),
+               SUM(pwm), MIN(pwm), MAX(pwm)
+        FROM data
+        WHERE timestamp >= ? AND timestamp <= ? AND id > ?
+        GROUP BY bucket""", (resolution, start, end, last_id)))
+    conn.commit()
+    conn.close()
+
+    # Aligning 'start' down can add one bucket; drop it at the end the caller did not ask for
+    keys = sorted(buckets)
+    keys = keys[-limit:] if newest else keys[:limit]
+    return [bucket_to_dict(b * resolution, *buckets[b]) for b in keys]
+
+def merge_partials(buckets, rows):
+    """Combines partial aggregates (count, then sum/min/max per value) per bucket."""
+    for b, *values in rows:
+        current = buckets.get(b)
+        if current is None:
+            buckets[b] = values
+            continue
+        current[0] += values[0]
+        for i in (1, 4, 7):
+            current[i] = combine(current[i], values[i], lambda a, c: a + c)
+            current[i + 1] = combine(current[i + 1], values[i + 1], min)
+            current[i + 2] = combine(current[i + 2], values[i + 2], max)
+
+def combine(a, b, fn):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return fn(a, b)
+
+def bucket_to_dict(epoch, count, t_sum, t_min, t_max, h_sum, h_min, h_max, p_sum, p_min, p_max):
+    return {
+        "timestamp": datetime.fromtimestamp(epoch, timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+        "count": count,
+        "temperature": mean(t_sum, count, 2), "temperature_min": t_min, "temperature_max": t_max,
+        "humidity": mean(h_sum, count, 2), "humidity_min": h_min, "humidity_max": h_max,
+        "pwm": mean(p_sum, count, 1), "pwm_min": p_min, "pwm_max": p_max
+    }
+
+def mean(total, count, digits):
+    # SUM() is NULL when the sensor only reported NaN (serialized as null) in a bucket
+    return round(total / count, digits) if total is not None and count else None
 
 @app.route('/api/control', methods=['POST'])
 def send_control():
@@ -158,4 +543,8 @@ if __name__ == '__main__':
     try:
         app.run(port=PORT, debug=True, use_reloader=False) # Helper script, disable reloader to avoid double threads
     except KeyboardInterrupt:
+        pass
+    finally:
+        # Let the worker commit its pending rows before exiting
         stop_event.set()
+        t.join(timeout=3)